@@ -0,0 +1,272 @@
+import argparse, builtins, contextlib, datetime, hashlib, itertools, json, os, platform, random, sys, tempfile, time
+import function as md
+
+# ================= Benchmark =================
+# วัดเวลาของ function.py กับข้อมูลจำลองขนาดต่างๆ แล้วออกผลเป็น JSON ไว้เทียบระหว่างเวอร์ชัน
+#    python bench.py                                   → 1k, 100k, 1M records พิมพ์ JSON ออกจอ
+#    python bench.py --sizes 1000,100000 --out new.json
+#    python bench.py --compare old.json                → บอก op ที่ช้าลงเกิน threshold (exit code 1)
+#    python bench.py --format 1                        → วัดกับไฟล์ format เดิม (v1)
+#    python bench.py --columns                         → เปิด Column Store ก่อนวัด (ดู function.py)
+#    python bench.py --workers 8                       → report (View 4/5) แบบขนานด้วย process pool
+#    python bench.py --engines                         → เทียบ engine dat กับ sqlite (cars.db) ด้วยข้อมูลชุดเดียวกัน
+# แต่ละขนาดสร้างข้อมูลในโฟลเดอร์ชั่วคราวของตัวเอง (seed เดียวกัน → ไฟล์ .dat เหมือนกันทุก byte)
+# ทุก op เก็บ first (ครั้งแรก รวมการ build sidecar ที่ค้าง) และ best (เร็วสุดจาก --repeat ครั้ง)
+SIZES = (1000, 100000, 1000000)
+SEED = 68
+GEN_CHUNK = 10000
+LOOKUPS = 1000
+
+# ================= Generator =================
+MODELS = {
+    "Toyota": ["Vios", "Yaris", "Corolla", "Camry", "Fortuner", "Hilux"],
+    "Honda": ["City", "Jazz", "Civic", "Accord", "HR-V", "CR-V"],
+    "Mazda": ["2", "3", "CX-3", "CX-5", "BT-50"],
+    "Nissan": ["Almera", "Note", "Navara", "Terra"],
+    "Isuzu": ["D-Max", "MU-X"],
+    "Mitsubishi": ["Mirage", "Attrage", "Triton", "Pajero"],
+    "Ford": ["Ranger", "Everest", "Fiesta"],
+    "BMW": ["320d", "520d", "X1", "X3"],
+}
+FIRST_NAMES = ["Somchai", "Somsak", "Suda", "Malee", "Anan", "Niran", "Pim", "Kanya", "Wichai", "Ploy"]
+LAST_NAMES = ["Srisuk", "Chaiyaphum", "Thongdee", "Saelim", "Wongsawat", "Rattanakul", "Boonmee"]
+FIRST_DAY = datetime.date(2023, 1, 1)
+DATE_SPAN = 1000  # วัน
+
+def generate(n, seed=SEED, version=md.DEFAULT_FORMAT):
+    # เขียน cars_*.dat (format version ที่ระบุ) ในโฟลเดอร์ปัจจุบัน n คัน (CarID C001 ... ) ขายแล้วประมาณ 40%
+    # วันที่รับเข้า/วันขาย (เก็บได้ตั้งแต่ v3) สุ่มจาก random อีกตัว → รถทุกคันเหมือนเดิมไม่ว่าจะเป็น format ไหน
+    rng = random.Random(seed)
+    dates = random.Random(seed + 1)
+    brands = list(MODELS)
+    md.use_format(version)
+    with open(md.FILE_BASIC, "wb") as fb, open(md.FILE_STATUS, "wb") as fs, open(md.FILE_SALE, "wb") as fsl:
+        fb.write(md.file_header(md.struct_basic, n))
+        fs.write(md.file_header(md.struct_status, n))
+        fsl.write(md.file_header(md.struct_sale, n))
+        for start in range(1, n + 1, GEN_CHUNK):
+            basic, status, sale = [], [], []
+            for car_id in range(start, min(start + GEN_CHUNK, n + 1)):
+                brand = rng.choice(brands)
+                buy_price = rng.randrange(150000, 2500000, 1000)
+                sell_price = float(round(buy_price * rng.uniform(1.05, 1.3), -3))
+                if rng.random() < 0.4:
+                    final_price = sell_price - rng.randrange(0, 50000, 1000)
+                    cname = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                    cphone = f"08{rng.randrange(10 ** 8):08d}"
+                    sold = "Yes"
+                else:
+                    final_price, cname, cphone, sold = 0.0, "", "", "No"
+                acquired = FIRST_DAY + datetime.timedelta(days=dates.randrange(DATE_SPAN))
+                sold_on = (acquired + datetime.timedelta(days=dates.randrange(120))).isoformat() if sold == "Yes" else ""
+                car = md.Car(f"C{car_id:03d}", rng.randint(1995, 2025), brand, rng.choice(MODELS[brand]),
+                             rng.randrange(0, 300000, 100), buy_price, sold, sell_price, final_price, cname, cphone,
+                             acquired.isoformat(), sold_on)
+                rb, rs, rl = md.pack_car(car)
+                basic.append(rb)
+                status.append(rs)
+                sale.append(rl)
+            fb.write(b"".join(basic))
+            fs.write(b"".join(status))
+            fsl.write(b"".join(sale))
+
+def checksum():
+    h = hashlib.sha1()
+    for path in (md.FILE_BASIC, md.FILE_STATUS, md.FILE_SALE):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+# ================= Timing =================
+@contextlib.contextmanager
+def scripted(answers):
+    # ป้อนคำตอบ (iterable ใดก็ได้ เช่น itertools.repeat("") = กด Enter ตลอด) ให้ input() ตามลำดับ และทิ้งทุกอย่างที่ print ออกจอ
+    it = iter(answers)
+    real_input = builtins.input
+    builtins.input = lambda prompt="": next(it)
+    try:
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            yield
+    finally:
+        builtins.input = real_input
+
+def timed(fn, repeat, answers=()):
+    times = []
+    for _ in range(repeat):
+        with scripted(answers):
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+    return {"first_s": round(times[0], 6), "best_s": round(min(times), 6), "runs": repeat}
+
+def bench_size(n, repeat, seed, version, columns):
+    results = []
+
+    def record(op, stats, **extra):
+        results.append({"records": n, "op": op, **stats, **extra})
+        print(f"  {op:<22} first {stats['first_s']:>9.4f}s  best {stats['best_s']:>9.4f}s", file=sys.stderr)
+
+    t = time.perf_counter()
+    generate(n, seed, version)
+    t = round(time.perf_counter() - t, 6)
+    record("generate", {"first_s": t, "best_s": t, "runs": 1}, checksum=checksum())
+    if columns:
+        record("build_columns", timed(lambda: md.set_column_store(True), 1))
+    cars = md.load_all()
+    record("load_all", timed(md.load_all, repeat))
+    record("save_all", timed(lambda: md.save_all(cars), repeat))
+    ids = [f"C{random.Random(seed + i).randint(1, n):03d}" for i in range(LOOKUPS)]
+    stats = timed(lambda: [md.read_car(md.find_slot(cid)) for cid in ids], repeat)
+    record("lookup", {key: round(v / LOOKUPS, 9) if key.endswith("_s") else v for key, v in stats.items()}, per="call")
+    record("view_1_single", timed(lambda: md.View(1), repeat, (ids[0],)))
+    record("view_2_first_page", timed(lambda: md.View(2), repeat, ("q",)))
+    record("view_2_all", timed(lambda: md.View(2), repeat, itertools.repeat("")))
+    record("view_3_filter_brand", timed(lambda: md.View(3), repeat, ("1", "Toyota")))
+    record("view_4_not_sold", timed(lambda: md.View(4), repeat))
+    record("view_5_sold", timed(lambda: md.View(5), repeat))
+    record("make_table_sold", timed(lambda: md.make_table_sold(cars, "Report: Car Sold with Customer"), repeat))
+    record("make_table_not_sold", timed(lambda: md.make_table_not_sold(cars, "Report: Car Not Sale"), repeat))
+    record("make_summary", timed(lambda: md.make_summary(cars, "Overall Summary"), repeat))
+    record("summary_scan", timed(md.compute_stats, repeat))
+    record("build_sales", timed(md.build_sales, 1))
+    record("sales_report", timed(md.view_sales, repeat))
+    record("top_20_profit", timed(lambda: md.top_cars("profit", 20, True), repeat))
+    record("sorted_unsold_year", timed(lambda: sum(1 for _ in md.iter_sorted_cars("year", False)), repeat))
+    # View(6)/(7) ผ่านเมนูจริง (รวม build sidecar ของลูกค้าใน first และการเขียน report_sorted.txt)
+    record("view_6_search_name", timed(lambda: md.View(6), repeat, ("somchai",)))
+    record("view_6_search_phone", timed(lambda: md.View(6), repeat, ("0812",)))
+    record("view_7_top_profit", timed(lambda: md.View(7), repeat, ("1",)))
+    record("view_7_oldest_unsold", timed(lambda: md.View(7), repeat, ("2",)))
+    record("view_7_sorted_odometer", timed(lambda: md.View(7), repeat, ("4", "5", "1", "3", "")))
+    # op ด้านบนวัดแบบไม่มี Inventory Cache (เทียบกับผลเก่าได้) → ส่วนนี้วัดการอ่านซ้ำเมื่อ cache สดอยู่
+    md.CACHE_ENABLED = True
+    md.load_all()
+    record("load_all_cached", timed(md.load_all, repeat))
+    record("view_2_cached", timed(lambda: md.View(2), repeat, itertools.repeat("")))
+    record("view_5_cached", timed(lambda: md.View(5), repeat))
+    md.CACHE_ENABLED = False
+    md.inventory.update(stamp=None, cars={})
+    # report หลังเพิ่มรถที่ขายแล้ว 1 คัน (Incremental Reports: ต่อท้ายแถวใหม่ + summary แทนการเขียนใหม่ทั้งไฟล์)
+    # วัดท้ายสุดเพราะเพิ่มรถจริง → op ด้านบนยังวัดกับข้อมูลชุดเดิม
+    for spec in md.REPORTS:
+        md.update_report(*spec, echo=False)
+    added = itertools.count(n + 1)
+    def add_then_report():
+        md.append_car(md.Car(f"C{next(added):03d}", 2020, "Toyota", "Vios", 1000, 500000, "Yes", 550000.0, 540000.0,
+                             "Somchai Srisuk", "0812345678", md.today(), md.today()))
+        for spec in md.REPORTS:
+            md.update_report(*spec, echo=False)
+    record("reports_after_add", timed(add_then_report, repeat))
+    return results
+
+ENGINE_OPS = (
+    ("load_all", lambda ids: md.storage().load_all(), ()),
+    ("lookup", lambda ids: [md.storage().get_car(cid) for cid in ids], ()),
+    ("view_3_filter_brand", lambda ids: md.View(3), ("1", "Toyota")),
+    ("view_3_range_profit", lambda ids: md.View(3), ("5", "5", "300000", "", "")),
+    ("view_5_sold", lambda ids: md.View(5), ()),
+    ("view_6_search", lambda ids: md.View(6), ("somchai",)),
+    ("top_20_profit", lambda ids: md.View(7), ("1",)),
+    ("view_7_oldest_unsold", lambda ids: md.View(7), ("2",)),
+    ("summary", lambda ids: md.storage().summary(), ()),
+    ("sales_report", lambda ids: md.View(8), ()),
+)
+
+def bench_engines(n, repeat, seed, version):
+    # ข้อมูลชุดเดียวกันทั้งสอง engine: สร้างไฟล์ .dat แล้วคัดลอกลง cars.db (op sqlite_copy) จากนั้นวัด op เดียวกัน
+    # op ใช้ชื่อ <engine>_<op> และ add/update/delete วัดครั้งเดียว (first = best) เพราะแก้ข้อมูลจริง
+    results = []
+
+    def record(op, stats, **extra):
+        results.append({"records": n, "op": op, **stats, **extra})
+        print(f"  {op:<30} first {stats['first_s']:>9.4f}s  best {stats['best_s']:>9.4f}s", file=sys.stderr)
+
+    generate(n, seed, version)
+    record("sqlite_copy", timed(md.dat_to_sqlite, 1))
+    ids = [f"C{random.Random(seed + i).randint(1, n):03d}" for i in range(LOOKUPS)]
+    new = [md.Car(f"C{n + i + 1:03d}", 2020, "Toyota", "Vios", 1000, 500000, "No", 550000.0, 0.0, "", "", md.today(), "")
+           for i in range(LOOKUPS)]
+    try:
+        for engine in md.ENGINES:
+            md.ENGINE = engine
+            for op, fn, answers in ENGINE_OPS:
+                stats = timed(lambda: fn(ids), repeat, answers)
+                if op == "lookup":
+                    stats = {key: round(v / LOOKUPS, 9) if key.endswith("_s") else v for key, v in stats.items()}
+                record(f"{engine}_{op}", stats, **({"per": "call"} if op == "lookup" else {}))
+            record(f"{engine}_add_{LOOKUPS}", timed(lambda: [md.storage().add_car(car) for car in new], 1))
+            record(f"{engine}_update_{LOOKUPS}", timed(lambda: [md.storage().update_car(car) for car in new], 1))
+            record(f"{engine}_delete_{LOOKUPS}", timed(lambda: [md.storage().delete_car(car.car_id) for car in new], 1))
+    finally:
+        md.ENGINE = "dat"
+        md.sqlite_close()
+    return results
+
+def run(sizes, repeat, seed, version=md.DEFAULT_FORMAT, columns=False, engines=False):
+    results = []
+    cwd = os.getcwd()
+    for n in sizes:
+        print(f"{n:,} records", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix="jbgarage-bench-") as work:
+            os.chdir(work)
+            try:
+                results += bench_engines(n, repeat, seed, version) if engines else bench_size(n, repeat, seed, version, columns)
+            finally:
+                os.chdir(cwd)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "format": version,
+        "columns": columns,
+        "engines": engines,
+        "workers": md.REPORT_WORKERS,
+        "repeat": repeat,
+        "results": results,
+    }
+
+# ================= Compare =================
+def compare(old, new, threshold):
+    # คืนค่ารายการ op ที่ best ช้าลงเกิน threshold เท่า (เทียบเฉพาะ op/ขนาดที่มีทั้งสองไฟล์)
+    before = {(r["records"], r["op"]): r["best_s"] for r in old["results"]}
+    slower = []
+    for r in new["results"]:
+        base = before.get((r["records"], r["op"]))
+        if base and r["best_s"] > base * threshold:
+            slower.append((r["records"], r["op"], base, r["best_s"]))
+    return slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JB Garage benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="จำนวน records คั่นด้วย comma")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--format", type=int, choices=sorted(md.STRUCTS), default=md.DEFAULT_FORMAT,
+                        help="format ของไฟล์ข้อมูลที่สร้าง (1 = ไฟล์เดิมไม่มี header, 2 = int64 + ราคาเป็นสตางค์, 3 = 2 + วันที่)")
+    parser.add_argument("--columns", action="store_true", help="เปิด Column Store (อ่านเฉพาะ field ที่ใช้จากไฟล์แยก)")
+    parser.add_argument("--engines", action="store_true", help="เทียบ engine dat กับ sqlite แทนชุด op ปกติ")
+    parser.add_argument("--workers", type=int, default=md.REPORT_WORKERS, help="จำนวน process ของ report แบบขนาน (0 = ไม่ใช้)")
+    parser.add_argument("--out", help="เขียนผล JSON ลงไฟล์ (ค่าเริ่มต้น = ออกจอ)")
+    parser.add_argument("--compare", help="ไฟล์ผล JSON ของเวอร์ชันก่อนหน้า")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+    md.CACHE_ENABLED = False
+    md.REPORT_WORKERS = args.workers
+    report = run([int(s) for s in args.sizes.split(",")], args.repeat, args.seed, args.format, args.columns, args.engines)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            slower = compare(json.load(f), report, args.threshold)
+        for n, op, base, best in slower:
+            print(f"SLOWER: {op} @ {n:,} records {base:.4f}s → {best:.4f}s", file=sys.stderr)
+        return 1 if slower else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
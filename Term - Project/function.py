@@ -1,678 +1,3799 @@
 import struct, os, re
+import sys, json, csv, time
+import mmap, gc, zlib, threading, atexit
+import functools, operator, builtins
+import heapq, tempfile, pickle, sqlite3
+from abc import ABC, abstractmethod
+from array import array
+from contextlib import contextmanager
+from itertools import compress, chain, groupby, repeat
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from bisect import bisect_left, bisect_right
+from datetime import date
+try:
+    import fcntl
+except ImportError:  # Windows ไม่มี flock → lock ได้แค่ภายใน process เดียว
+    fcntl = None
 
 # ================= File Names =================
 FILE_BASIC = "cars_basic.dat"
 FILE_STATUS = "cars_status.dat"
 FILE_SALE = "cars_sale.dat"
 
-# =============================================
+# ================= Instrumentation =================
+# @instrumented เก็บสถิติของแต่ละ operation: จำนวนครั้ง, เวลา, จำนวน record และ bytes ที่อ่าน/เขียน
+#  - ดูได้จากเมนูลับ "stats" ใน main.py (format_op_stats)
+#  - เปิดด้วย JBGARAGE_STATS=1 (ค่าเริ่มต้นปิด → ไม่ครอบฟังก์ชันเลย overhead เป็นศูนย์)
+#  - ตั้ง JBGARAGE_TRACE=<ไฟล์> (เปิดสถิติให้ด้วย) → เขียน 1 บรรทัด JSON ต่อการเรียก 1 ครั้ง (พร้อมจำนวนรถในระบบตอนนั้น)
+#    จำนวนรถอ่านจาก header เฉพาะตอน trace เท่านั้น
+# record/bytes นับจากจุดที่อ่าน/เขียนไฟล์จริงผ่าน count_io() (นับรวมของฟังก์ชันที่เรียกซ้อนข้างใน)
+# เวลาไม่รวมช่วงที่รอผู้ใช้พิมพ์ (timed_input)
+TRACE_FILE = os.environ.get("JBGARAGE_TRACE")
+INSTRUMENT = os.environ.get("JBGARAGE_STATS", "0") != "0" or bool(TRACE_FILE)
+OP_STATS = {}
+op_lock = threading.Lock()
+io_local = threading.local()
+
+def io_counts():
+    # [records, bytes_read, bytes_written, เวลาที่รอ input] ของ thread นี้ (นับสะสม)
+    counts = getattr(io_local, "counts", None)
+    if counts is None:
+        counts = io_local.counts = [0, 0, 0, 0.0]
+    return counts
+
+def count_io(records=0, read=0, written=0):
+    counts = io_counts()
+    counts[0] += records
+    counts[1] += read
+    counts[2] += written
+
+def timed_input(prompt=""):
+    # ใช้แทน input() ทุกที่ในไฟล์นี้ → จับเวลาที่รอผู้ใช้ไว้หักออกจากเวลาของ operation
+    t = time.perf_counter()
+    try:
+        return builtins.input(prompt)
+    finally:
+        io_counts()[3] += time.perf_counter() - t
+
+def record_op(op, elapsed, before, after):
+    seconds = elapsed - (after[3] - before[3])
+    records, read, written = (after[i] - before[i] for i in range(3))
+    with op_lock:
+        st = OP_STATS.get(op)
+        if st is None:
+            st = OP_STATS[op] = {"calls": 0, "seconds": 0.0, "max_s": 0.0, "records": 0, "bytes_read": 0, "bytes_written": 0}
+        st["calls"] += 1
+        st["seconds"] += seconds
+        st["max_s"] = max(st["max_s"], seconds)
+        st["records"] += records
+        st["bytes_read"] += read
+        st["bytes_written"] += written
+    if TRACE_FILE:
+        line = {"ts": round(time.time(), 6), "op": op, "seconds": round(seconds, 6), "records": records,
+                "bytes_read": read, "bytes_written": written, "store_records": count_records()}
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line) + "\n")
+
+def instrumented(fn=None, *, label=None):
+    # @instrumented หรือ @instrumented(label=lambda n: f"View({n})") เพื่อแยกชื่อ op ตาม argument
+    if fn is None:
+        return lambda fn: instrumented(fn, label=label)
+    if not INSTRUMENT:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        counts = io_counts()
+        before = list(counts)
+        t = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record_op(label(*args, **kwargs) if label else fn.__name__, time.perf_counter() - t, before, counts)
+    return wrapper
+
+def format_op_stats():
+    lines = [f"Inventory: {count_records():,} records" + (f" (trace → {TRACE_FILE})" if TRACE_FILE else "")]
+    if not INSTRUMENT:
+        lines.append("Stats are off (set JBGARAGE_STATS=1).")
+        return "\n".join(lines)
+    if not OP_STATS:
+        lines.append("No operations recorded yet.")
+        return "\n".join(lines)
+    lines.append(f"{'Operation':<20} | {'Calls':>6} | {'Total s':>9} | {'Avg ms':>9} | {'Max ms':>9} | {'Records':>10} | {'Read KB':>10} | {'Write KB':>10}")
+    lines.append("-" * 106)
+    with op_lock:
+        rows = sorted(OP_STATS.items(), key=lambda kv: -kv[1]["seconds"])
+    for op, st in rows:
+        lines.append(f"{op:<20} | {st['calls']:>6} | {st['seconds']:>9.3f} | {st['seconds'] / st['calls'] * 1000:>9.2f} | "
+                     f"{st['max_s'] * 1000:>9.2f} | {st['records']:>10,} | {st['bytes_read'] / 1024:>10,.1f} | {st['bytes_written'] / 1024:>10,.1f}")
+    return "\n".join(lines)
 
 # ================= Structs =================
+# v1 (ไฟล์เดิม) : ไม่มี header, car_id เป็น int32, buy_price เป็น int, ราคาอื่นเป็น float32
+# v2            : header 32 bytes ต้นไฟล์ (magic, version, ขนาด record, จำนวน record, ตัวนับการเขียน)
+#                 ตัวนับการเขียน (generation) ใน cars_basic.dat เพิ่มทีละ 1 ทุก write_records/replace → เป็นส่วนหนึ่งของ data_stamp()
+#                 car_id เป็น int64 และทุกราคาเป็น int64 หน่วยสตางค์ → รวมยอดได้ตรงเป๊ะ
+# v3            : v2 + วันที่รับรถเข้า (ท้าย basic) และวันที่ขาย (ท้าย sale) เป็นเลขวันแบบ date.toordinal() (0 = ไม่รู้วัน)
+# version ดูจาก header ของ cars_basic.dat (data_format) แล้วสลับ struct_* ให้ตรงกับไฟล์ที่ใช้อยู่
+# ไฟล์ใหม่ (ยังไม่มีข้อมูลเลย) สร้างเป็น DEFAULT_FORMAT; ของเดิมแปลงด้วย migrate() (python main.py migrate)
+STRUCTS = {
+    1: (struct.Struct("<i i 20s 20s i i"), struct.Struct("<i i i f"), struct.Struct("<i f f f 30s 15s")),
+    2: (struct.Struct("<q i 20s 20s i q"), struct.Struct("<q i i q"), struct.Struct("<q q q q 30s 15s")),
+    3: (struct.Struct("<q i 20s 20s i q i"), struct.Struct("<q i i q"), struct.Struct("<q q q q 30s 15s i")),
+}
+DEFAULT_FORMAT = 3
+HEADER_MAGIC = b"JBG2"
+struct_header = struct.Struct("<4s i i q q 4x")   # magic, version, ขนาด record, จำนวน record, generation
+HEADER_COUNT_OFFSET = 12
+HEADER_GENERATION_OFFSET = 20
+format_state = {"key": ()}   # () = ยังไม่เคยตรวจ (None = ไม่มีไฟล์)
+
+def use_format(version):
+    global DATA_VERSION, HEADER_SIZE, struct_basic, struct_status, struct_sale, struct_car_id
+    DATA_VERSION = version
+    HEADER_SIZE = struct_header.size if version >= 2 else 0
+    struct_basic, struct_status, struct_sale = STRUCTS[version]
+    struct_car_id = struct.Struct("<" + struct_basic.format.lstrip("<").split()[0])
+
+use_format(1)
+
+def data_format():
+    # version ของไฟล์ชุดปัจจุบัน (อ่าน header ใหม่เฉพาะเมื่อ cars_basic.dat เป็นไฟล์ใหม่ เช่นหลัง migrate/compact)
+    try:
+        st = os.stat(FILE_BASIC)
+        key = (st.st_dev, st.st_ino, st.st_size == 0)
+    except OSError:
+        key = None
+    if key != format_state["key"]:
+        version = DEFAULT_FORMAT
+        if key is not None:
+            with open(FILE_BASIC, "rb") as f:
+                h = f.read(struct_header.size)
+            version = struct_header.unpack(h)[1] if len(h) == struct_header.size and h[:4] == HEADER_MAGIC else 1
+        use_format(version)
+        format_state["key"] = key
+    return DATA_VERSION
+
+def file_header(st, count):
+    # generation เริ่มที่ 0 (replace_data_files ตั้งให้ต่อจากไฟล์ชุดเดิม)
+    return struct_header.pack(HEADER_MAGIC, DATA_VERSION, st.size, count, 0) if HEADER_SIZE else b""
+
+def data_generation(path=FILE_BASIC):
+    # ตัวนับการเขียนใน header ของ cars_basic.dat (ไฟล์ v1/ไม่มีไฟล์ = 0 เสมอ)
+    try:
+        with open(path, "rb") as f:
+            h = f.read(struct_header.size)
+    except OSError:
+        return 0
+    return struct_header.unpack(h)[4] if len(h) == struct_header.size and h[:4] == HEADER_MAGIC else 0
+
+def generation_write():
+    # เพิ่มตัวนับการเขียน (ไปพร้อมกับ record ใน write_records เดียวกัน)
+    return (FILE_BASIC, HEADER_GENERATION_OFFSET, struct.pack("<q", data_generation() + 1))
+
+def header_counts():
+    # จำนวน record ใน header ของแต่ละไฟล์ (ไฟล์ที่ไม่มี header ไม่นับ)
+    counts = []
+    for path in (FILE_BASIC, FILE_STATUS, FILE_SALE):
+        with open(path, "rb") as f:
+            h = f.read(struct_header.size)
+        if len(h) == struct_header.size and h[:4] == HEADER_MAGIC:
+            counts.append(struct_header.unpack(h)[3])
+    return counts
+
+def header_writes(count):
+    # เขียนจำนวน record ใหม่ลง header ของทั้ง 3 ไฟล์ (ไปพร้อมกับ record ใน write_records เดียวกัน)
+    if not HEADER_SIZE:
+        return []
+    data = struct.pack("<q", count)
+    return [(path, HEADER_COUNT_OFFSET, data) for path in (FILE_BASIC, FILE_STATUS, FILE_SALE)]
+
+def init_data_files():
+    # ยังไม่มีไฟล์ข้อมูล → สร้างทั้ง 3 ไฟล์เปล่า (พร้อม header ถ้าเป็น v2)
+    if not os.path.exists(FILE_BASIC):
+        data_format()
+        for path, st in ((FILE_BASIC, struct_basic), (FILE_STATUS, struct_status), (FILE_SALE, struct_sale)):
+            with open(path, "wb") as f:
+                f.write(file_header(st, 0))
 
-# 1. Basic: เก็บข้อมูลพื้นฐานของรถแต่ละคันใน cars_basic.dat
-#    - car_id (int)         : รหัสรถ (ใช้เป็น key เชื่อมโยงทุกไฟล์)
-#    - year (int)           : ปีที่ผลิต
-#    - brand (20s)          : ยี่ห้อรถ (string 20 bytes)
-#    - model (20s)          : รุ่นรถ (string 20 bytes)
-#    - odometer (int)       : เลขไมล์
-#    - buy_price (int)      : ราคาซื้อ
-struct_basic = struct.Struct("<i i 20s 20s i i")
-
-# 2. Status: เก็บสถานะของรถแต่ละคันใน cars_status.dat
-#    - car_id (int)         : รหัสรถ (key เชื่อมโยงกับ cars_basic.dat)
-#    - active (int)         : สถานะการใช้งาน (1=active, 0=inactive)
-#    - is_sold (int)        : ขายแล้วหรือยัง (1=ขายแล้ว, 0=ยังไม่ขาย)
-#    - sell_price (float)   : ราคาขายที่ตั้งไว้
-struct_status = struct.Struct("<i i i f")
-
-# 3. Sale: เก็บข้อมูลการขายใน cars_sale.dat
-#    - car_id (int)         : รหัสรถ (key เชื่อมโยงกับทุกไฟล์)
-#    - buy_price (float)    : ราคาซื้อ (ซ้ำกับ basic เพื่อความสะดวก)
-#    - sell_price (float)   : ราคาขายที่ตั้งไว้ (ซ้ำกับ status)
-#    - final_price (float)  : ราคาขายจริง (ถ้าขายแล้ว)
-#    - customer_name (30s)  : ชื่อลูกค้า (string 30 bytes)
-#    - customer_phone (15s) : เบอร์โทรลูกค้า (string 15 bytes)
-struct_sale = struct.Struct("<i f f f 30s 15s")
+def to_satang(p):
+    return round(p * 100)
+
+def baht(satang):
+    # buy_price ของ v1 เป็น int → ถ้าไม่มีเศษสตางค์คืนค่าเป็น int ให้แสดงผลเหมือนเดิม
+    return satang // 100 if satang % 100 == 0 else satang / 100
+
+def today():
+    return date.today().isoformat()
+
+def day_number(text):
+    # "YYYY-MM-DD" → เลขวันที่เก็บในไฟล์ ("" = ไม่รู้วัน = 0)
+    return date.fromisoformat(text).toordinal() if text else 0
+
+@functools.lru_cache(maxsize=8192)
+def day_text(n):
+    return date.fromordinal(n).isoformat() if n else ""
 
 # ================= Helper =================
-def encode_str(s, size): 
-    return s.encode("utf-8")[:size].ljust(size, b'\x00')
+def encode_str(s, size):
+    # ตัดให้พอดี size โดยไม่ตัดกลางตัวอักษร (ภาษาไทย 1 ตัว = 3 bytes)
+    return s.encode("utf-8")[:size].decode("utf-8", "ignore").encode("utf-8").ljust(size, b'\x00')
 
 def decode_str(b): 
     return b.split(b'\x00',1)[0].decode("utf-8")
 
+# ================= Car =================
+# รถ 1 คัน ใช้ __slots__ แทน dict (ไม่มี __dict__ และไม่ต้องเก็บ key ซ้ำทุกคัน)
+# profit คำนวณจาก final_price - buy_price (เป็น 0 ถ้ายังไม่ขาย) จึงไม่ต้องเก็บแยก
+# acquired_on / sold_on เป็น "YYYY-MM-DD" ("" = ไม่รู้วัน; ไฟล์ v1/v2 ไม่มีที่เก็บวันที่จึงเป็น "" เสมอ)
+class Car:
+    __slots__ = ("car_id", "year", "brand", "model", "odometer", "buy_price",
+                 "status", "sell_price", "final_price", "customer_name", "customer_phone", "acquired_on", "sold_on")
+
+    def __init__(self, car_id, year, brand, model, odometer, buy_price,
+                 status="No", sell_price=0.0, final_price=0.0, customer_name="", customer_phone="",
+                 acquired_on="", sold_on=""):
+        self.car_id = car_id
+        self.year = year
+        self.brand = brand
+        self.model = model
+        self.odometer = odometer
+        self.buy_price = buy_price
+        self.status = status
+        self.sell_price = sell_price
+        self.final_price = final_price
+        self.customer_name = customer_name
+        self.customer_phone = customer_phone
+        self.acquired_on = acquired_on
+        self.sold_on = sold_on
+
+    @property
+    def profit(self):
+        return self.final_price - self.buy_price if self.final_price > 0 else 0
+
+    def __eq__(self, other):
+        return isinstance(other, Car) and all(getattr(self, f) == getattr(other, f) for f in Car.__slots__)
+
+    def __repr__(self):
+        return f"Car({self.car_id!r}, {self.brand!r}, {self.model!r}, {self.year}, status={self.status!r})"
+
 # ================= Save & Load =================
+def pack_car(c):
+    # แปลง Car เป็น bytes ของทั้ง 3 ไฟล์ (basic, status, sale)
+    car_id_int = int(c.car_id[1:])  # remove 'C' → int
+    if DATA_VERSION >= 3:
+        return (
+            struct_basic.pack(car_id_int, int(c.year), encode_str(c.brand, 20), encode_str(c.model, 20),
+                              int(c.odometer), to_satang(c.buy_price), day_number(c.acquired_on)),
+            struct_status.pack(car_id_int, 1, 1 if c.status.lower() == "yes" else 0, to_satang(c.sell_price)),
+            struct_sale.pack(car_id_int, to_satang(c.buy_price), to_satang(c.sell_price), to_satang(c.final_price),
+                             encode_str(c.customer_name, 30), encode_str(c.customer_phone, 15), day_number(c.sold_on))
+        )
+    if DATA_VERSION >= 2:
+        return (
+            struct_basic.pack(car_id_int, int(c.year), encode_str(c.brand, 20), encode_str(c.model, 20),
+                              int(c.odometer), to_satang(c.buy_price)),
+            struct_status.pack(car_id_int, 1, 1 if c.status.lower() == "yes" else 0, to_satang(c.sell_price)),
+            struct_sale.pack(car_id_int, to_satang(c.buy_price), to_satang(c.sell_price), to_satang(c.final_price),
+                             encode_str(c.customer_name, 30), encode_str(c.customer_phone, 15))
+        )
+    return (
+        struct_basic.pack(
+            car_id_int,
+            int(c.year),
+            encode_str(c.brand, 20),
+            encode_str(c.model, 20),
+            int(c.odometer),
+            int(c.buy_price)
+        ),
+        struct_status.pack(
+            car_id_int,
+            1,  # active
+            1 if c.status.lower() == "yes" else 0,
+            float(c.sell_price)
+        ),
+        struct_sale.pack(
+            car_id_int,
+            float(c.buy_price),
+            float(c.sell_price),
+            float(c.final_price),
+            encode_str(c.customer_name, 30),
+            encode_str(c.customer_phone, 15)
+        )
+    )
 
-# ...existing code...
+def unpack_car(cb, cs, cl):
+    b = struct_basic.unpack(cb)
+    s = struct_status.unpack(cs)
+    l = struct_sale.unpack(cl)
+    if DATA_VERSION >= 3:
+        return Car(f"C{b[0]:03d}", b[1], decode_str(b[2]), decode_str(b[3]), b[4], baht(b[5]),
+                   "Yes" if s[2] == 1 else "No", s[3] / 100, l[3] / 100, decode_str(l[4]), decode_str(l[5]),
+                   day_text(b[6]), day_text(l[6]))
+    if DATA_VERSION >= 2:
+        return Car(f"C{b[0]:03d}", b[1], decode_str(b[2]), decode_str(b[3]), b[4], baht(b[5]),
+                   "Yes" if s[2] == 1 else "No", s[3] / 100, l[3] / 100, decode_str(l[4]), decode_str(l[5]))
+    return Car(f"C{b[0]:03d}", b[1], decode_str(b[2]), decode_str(b[3]), b[4], b[5],
+               "Yes" if s[2] == 1 else "No", s[3], l[3], decode_str(l[4]), decode_str(l[5]))
 
+@instrumented
 def save_all(cars):
-    with open(FILE_BASIC, "wb") as fb, open(FILE_STATUS, "wb") as fs, open(FILE_SALE, "wb") as fsl:
-        for c in cars:
-            car_id_int = int(c["car_id"][1:])  # remove 'C' → int
-            # BASIC
-            fb.write(struct_basic.pack(
-                car_id_int,
-                int(c["year"]),
-                encode_str(c["brand"], 20),
-                encode_str(c["model"], 20),
-                int(c["odometer"]),
-                int(c["buy_price"])
-            ))
-            # STATUS
-            fs.write(struct_status.pack(
-                car_id_int,
-                1,  # active
-                1 if c["status"].lower() == "yes" else 0,
-                float(c["sell_price"])
-            ))
-            # SALE
-            fsl.write(struct_sale.pack(
-                car_id_int,
-                float(c["buy_price"]),
-                float(c["sell_price"]),
-                float(c["final_price"]),
-                encode_str(c["customer_name"], 30),
-                encode_str(c["customer_phone"], 15)
-            ))
-
-# ...existing code...
-
+    # เขียนใหม่ทั้งหมดลง .tmp แล้ว replace ทั้ง 3 ไฟล์พร้อมกัน (ไม่ truncate ไฟล์จริงระหว่างเขียน)
+    with replacing(), locked():
+        with open(FILE_BASIC + ".tmp", "wb") as fb, open(FILE_STATUS + ".tmp", "wb") as fs, open(FILE_SALE + ".tmp", "wb") as fsl:
+            fb.write(file_header(struct_basic, len(cars)))
+            fs.write(file_header(struct_status, len(cars)))
+            fsl.write(file_header(struct_sale, len(cars)))
+            for c in cars:
+                rb, rs, rl = pack_car(c)
+                fb.write(rb)
+                fs.write(rs)
+                fsl.write(rl)
+            count_io(records=len(cars), written=fb.tell() + fs.tell() + fsl.tell())
+        replace_data_files()
 
+@instrumented
 def load_all():
-    cars = []
-    if not (os.path.exists(FILE_BASIC) and os.path.exists(FILE_STATUS) and os.path.exists(FILE_SALE)):
-        return []
-    with open(FILE_BASIC,"rb") as fb, open(FILE_STATUS,"rb") as fs, open(FILE_SALE,"rb") as fsl:
-        while True:
-            cb = fb.read(struct_basic.size)
-            cs = fs.read(struct_status.size)
-            cl = fsl.read(struct_sale.size)
-            if not cb or not cs or not cl:
-                break
-            b = struct_basic.unpack(cb)
-            s = struct_status.unpack(cs)
-            l = struct_sale.unpack(cl)
-            car_id = f"C{b[0]:03d}"
-            cars.append({
-                "car_id": car_id,
-                "year": b[1],
-                "brand": decode_str(b[2]),
-                "model": decode_str(b[3]),
-                "odometer": b[4],
-                "buy_price": b[5],
-                "status": "Yes" if s[2] == 1 else "No",
-                "sell_price": s[3],
-                "final_price": l[3],
-                "profit": l[3] - b[5] if l[3] > 0 else 0,
-                "customer_name": decode_str(l[4]),
-                "customer_phone": decode_str(l[5])
-            })
-    return cars
+    # ข้อมูลไม่เปลี่ยนตั้งแต่ครั้งก่อน → คืนจาก Inventory Cache ไม่ต้องอ่านไฟล์
+    with locked(shared=True):
+        if cache_fresh():
+            cars = list(inventory["cars"].values())
+            count_io(records=len(cars))
+            return cars
+        stamp = cache_key()
+        cols = load_columns()
+        # สร้าง Car จำนวนมากรวดเดียว → ปิด GC ระหว่างสร้าง ไม่ให้ไล่ตรวจ object ใหม่ซ้ำๆ กลางทาง
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            cars = cars_from_columns(cols)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if CACHE_ENABLED:
+            inventory["cars"] = dict(zip(cols["slot"], cars))
+            inventory["stamp"] = stamp
+        return cars
 
-# ================= Add =================
+def cars_from_columns(cols):
+    # map(Car, คอลัมน์...) เรียก Car ตรงๆ ทีละแถว (ไม่ต้องแตก tuple ของ zip ใน Python)
+    ids = list(map("C{:03d}".format, cols["car_id"]))
+    status = list(map({1: "Yes"}.get, cols["is_sold"], repeat("No")))
+    return list(map(Car, ids, cols["year"], cols["brand"], cols["model"], cols["odometer"], cols["buy_price"],
+                    status, cols["sell_price"], cols["final_price"], cols["customer_name"], cols["customer_phone"],
+                    cols["acquired_on"], cols["sold_on"]))
 
-# ...existing code...
+# ================= Bulk Load (columnar) =================
+# mmap ทั้ง 3 ไฟล์แล้ว unpack ทุก record ในรอบเดียว (ไม่ต้อง read/unpack ทีละ record)
+# ได้ผลเป็นคอลัมน์ (ตัวเลขเก็บใน array, string เก็บใน list) ที่ report/summary ใช้ได้ตรงๆ
+#    slot, car_id, year, odometer, buy_price, is_sold : array('i')
+#    sell_price, final_price                          : array('f') (float32 เหมือนในไฟล์)
+#    (v2: car_id เป็น array('q'), sell/final_price เป็น array('d') หน่วยบาท + final_satang array('q'),
+#         buy_price เป็น list แบบเดียวกับ baht())
+#    brand, model, customer_name, customer_phone       : list ของ str
+#    acquired_on, sold_on                              : list ของ "YYYY-MM-DD" (v1/v2 ไม่มีในไฟล์ → "" ทุกแถว)
+# รถที่ถูกลบ (active = 0) จะไม่อยู่ในผลลัพธ์ → ใช้คอลัมน์ slot หาตำแหน่งจริงในไฟล์
+# fields = field ที่ต้องใช้ (ค่าเริ่มต้น = ทุก field ของ Car) → unpack/decode เฉพาะ field นั้น
+# ถ้าเปิด Column Store ไว้ จะอ่านจากไฟล์แยกของแต่ละ field แทน (ไม่ต้องอ่าน byte ของ field อื่นเลย)
+UNPACK_CHUNK = 4096  # จำนวน record ต่อการ unpack หนึ่งครั้ง
 
-def Add():
+# field → (ลำดับไฟล์ใน row_files(), ลำดับ field ใน struct)
+COLUMN_SOURCES = {
+    "car_id": (0, 0), "year": (0, 1), "brand": (0, 2), "model": (0, 3), "odometer": (0, 4), "buy_price": (0, 5),
+    "active": (1, 1), "is_sold": (1, 2), "sell_price": (1, 3),
+    "final_price": (2, 3), "customer_name": (2, 4), "customer_phone": (2, 5),
+    "acquired_on": (0, 6), "sold_on": (2, 6),
+}
+CAR_FIELDS = tuple(f for f in COLUMN_SOURCES if f != "active")
+TEXT_FIELDS = ("brand", "model", "customer_name", "customer_phone")
+DATE_FIELDS = ("acquired_on", "sold_on")
+SUMMARY_FIELDS = ("brand", "is_sold", "final_price")
+NOT_SOLD_FIELDS = tuple(f for f in CAR_FIELDS if not f.startswith("customer_") and f != "sold_on")
+
+def row_files():
+    return ((FILE_BASIC, struct_basic), (FILE_STATUS, struct_status), (FILE_SALE, struct_sale))
+
+def has_column(field):
+    # format ของไฟล์ปัจจุบันมี field นี้ไหม (วันที่มีตั้งแต่ v3)
+    i, k = COLUMN_SOURCES[field]
+    return k < len(row_files()[i][1].format.lstrip("<").split())
+
+def unpack_file(path, st, keep, first, n):
+    # คืนค่าคอลัมน์ของ field ที่อยู่ใน keep (ลำดับ field ใน struct) ของ n record เริ่มที่ slot first
+    # ใช้ Struct เดียวที่ unpack ทีละ UNPACK_CHUNK record ได้ tuple แบนๆ แล้วตัดเป็นคอลัมน์ด้วย slice
+    # field ที่ไม่ใช้แปลงเป็น padding (x) จะได้ไม่ต้องสร้าง object ทิ้ง
+    tokens = st.format.lstrip("<").split()
+    fmt = "".join(t if i in keep else f"{struct.calcsize('<' + t)}x" for i, t in enumerate(tokens))
+    cols = [[] for _ in keep]
+    if n == 0:
+        return cols
+    k = len(keep)
+    count_io(read=n * st.size)
+    chunk = struct.Struct("<" + fmt * UNPACK_CHUNK)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start in range(0, n, UNPACK_CHUNK):
+            if n - start < UNPACK_CHUNK:
+                chunk = struct.Struct("<" + fmt * (n - start))
+            flat = chunk.unpack_from(mm, HEADER_SIZE + (first + start) * st.size)
+            for j in range(k):
+                cols[j].extend(flat[j::k])
+    return cols
+
+def decode_column(raw):
+    # ค่าที่ซ้ำกัน (brand/model, ชื่อ/เบอร์ว่างของรถที่ยังไม่ขาย) decode ครั้งเดียว แล้วทุกแถวใช้ str ตัวเดียวกัน
+    # ค่าที่ไม่ซ้ำ decode ในครั้งเดียว: ต่อด้วย \n → ลบ \x00 (padding) → decode → split
+    # ถ้ามีค่าที่มี \n อยู่ข้างในหรือ utf-8 เสีย จำนวนจะไม่ตรง → ถอยไปใช้ decode_str ทีละค่า
+    unique = list(dict.fromkeys(raw))
     try:
-        cars = load_all()
-        # --- Car ID ---
-        while True:
-            car_id = input("Enter CarID (C001): ").strip().upper()
-            if any(c["car_id"] == car_id for c in cars):
-                print("Error: CarID already exists!")
-                continue
-            if not re.fullmatch(r"C\d{3}", car_id):
-                print("Error: Format must be Cxxx (e.g., C001)!")
-                continue
-            break
-        # --- Brand ---
-        while True:
-            brand = input("Brand: ").strip()
-            if brand == "":
-                print("Error: Brand cannot be empty!")
-                continue
-            break
-        # --- Model ---
-        while True:
-            model = input("Model: ").strip()
-            if model == "":
-                print("Error: Model cannot be empty!")
-                continue
-            break
-        # --- Year ---
-        while True:
-            year_inp = input("Year (YYYY): ").strip()
-            if not year_inp.isdigit():
-                print("Error: Year must be numbers only!")
-                continue
-            year = int(year_inp)
-            if year < 1900 or year > 2100:
-                print("Error: Year out of range!")
-                continue
-            break
-        # --- Odometer ---
-        while True:
-            odo = input("Odometer (km): ").strip()
-            if not odo.isdigit():
-                print("Error: Odometer must be numbers only!")
-                continue
-            odometer = int(odo)
+        out = b"\n".join(unique).translate(None, b"\x00").decode("utf-8").split("\n")
+    except UnicodeDecodeError:
+        out = None
+    if out is None or len(out) != len(unique):
+        out = [decode_str(b) for b in unique]
+    if len(unique) == len(raw):
+        return out
+    return list(map(dict(zip(unique, out)).__getitem__, raw))
+
+def unpack_columns(fields, start, n):
+    # ค่าดิบของ field ที่ขอจากไฟล์ .dat (ไฟล์ที่ไม่มี field ที่ขอจะไม่ถูกเปิดเลย)
+    raw = {}
+    for i, (path, st) in enumerate(row_files()):
+        names = sorted((COLUMN_SOURCES[f][1], f) for f in fields if COLUMN_SOURCES[f][0] == i and has_column(f))
+        if names:
+            cols = unpack_file(path, st, [k for k, _ in names], start, n)
+            raw.update(zip((f for _, f in names), cols))
+    for f in fields:
+        raw.setdefault(f, array("i", bytes(4 * n)))  # field ที่ format นี้ไม่มี → 0 ทุกแถว
+    return raw
+
+def column_values(field, raw):
+    # ค่าดิบ → คอลัมน์ตามชนิดที่อธิบายไว้ด้านบน
+    if field in TEXT_FIELDS:
+        return decode_column(raw)
+    if field in DATE_FIELDS:
+        return [day_text(x) for x in raw]
+    if DATA_VERSION >= 2:
+        # ราคาเก็บเป็นสตางค์ → คอลัมน์ราคาเป็นบาท
+        if field == "buy_price":
+            return [x // 100 if x % 100 == 0 else x / 100 for x in raw]  # เหมือน baht()
+        if field in ("sell_price", "final_price"):
+            return array("d", [x / 100 for x in raw])
+        if field == "car_id":
+            return array("q", raw)
+    elif field in ("sell_price", "final_price"):
+        return array("f", raw)
+    return array("i", raw)
+
+def load_columns(start=0, stop=None, fields=CAR_FIELDS):
+    # คอลัมน์ของรถ (ที่ active) ใน slot start ถึง stop-1 (ค่าเริ่มต้น = ทั้งไฟล์) เฉพาะ fields ที่ขอ (+ slot)
+    with locked(shared=True):
+        if stop is None:
+            stop = count_records()
+        n = max(stop - start, 0)
+        count_io(records=n)
+        wanted = ("active",) + tuple(fields)
+        if column_store_enabled():
+            ensure_fresh(columns_fresh, build_columns)
+            raw = read_columns(wanted, start, n)
+        else:
+            raw = unpack_columns(wanted, start, n)
+        active = raw.pop("active")
+        slots = range(start, start + n)
+        if 0 in active:
+            # มีรถที่ถูกลบ (active = 0) → ตัดทิ้งก่อน decode
+            raw = {f: list(compress(c, active)) for f, c in raw.items()}
+            slots = compress(slots, active)
+        cols = {"slot": array("i", slots)}
+        for field in fields:
+            cols[field] = column_values(field, raw[field])
+        if DATA_VERSION >= 2 and "final_price" in raw:
+            cols["final_satang"] = array("q", raw["final_price"])  # รวมยอดแบบไม่คลาดเคลื่อน
+        return cols
+
+STREAM_CHUNK = 16384  # จำนวน slot ต่อหนึ่งก้อนเวลาอ่านแบบ stream
+
+def iter_column_chunks(size=STREAM_CHUNK, fields=CAR_FIELDS, stop=None):
+    # อ่านทีละก้อน (คอลัมน์แบบเดียวกับ load_columns) → หน่วยความจำคงที่ไม่ว่าไฟล์จะใหญ่แค่ไหน
+    # ไม่ถือ cars.lock ตลอดการอ่าน: จำนวน record มาจาก snapshot ตอนเริ่ม (หรือ stop ที่ผู้เรียกจำไว้)
+    # แล้วแต่ละก้อนถือ shared lock ของตัวเองสั้นๆ → ผู้เขียนแทรกได้ระหว่างก้อน (ไม่ต้องรอจน report จบ)
+    # ไม่เห็น record ที่เขียนไปครึ่งเดียว, รถที่เพิ่มหลัง snapshot ไม่ถูกอ่าน, scanning() กัน compact/migrate ระหว่างทาง
+    # (ผู้เรียกถือ lock อยู่แล้ว เช่นตอน build sidecar → ทุกก้อนมาจากข้อมูลชุดเดียวกันเหมือนเดิม)
+    with scanning():
+        if stop is None:
+            with locked(shared=True):
+                stop = count_records()
+        for start in range(0, stop, size):
+            yield load_columns(start, min(start + size, stop), fields)
+
+def iter_car_slots(start=0, limit=None, predicate=None):
+    # (slot, Car) ของรถ (ที่ active) ตั้งแต่ slot start เรียงตาม slot → decode ทีละก้อนเมื่อมีคนขอเท่านั้น
+    # predicate(car) = เงื่อนไขเพิ่ม (None = ทุกคัน), limit = หยุดเมื่อได้ครบจำนวนนี้ (None = จนจบไฟล์)
+    # ก้อนแรกมีขนาดเท่า limit (หน้าแรกออกได้ทันที) แล้วขยายเท่าตัวจนถึง STREAM_CHUNK เผื่อ predicate ตรงน้อย
+    # ถือ shared lock ระหว่างที่ยังวนอยู่ → ผู้ใช้ที่ต้องรอ input ควรดึงให้ครบหน้า (list(...)) ก่อนถาม
+    if limit is not None and limit <= 0:
+        return
+    left = limit
+    with locked(shared=True):
+        if cache_fresh():
+            slots = list(inventory["cars"])
+            for slot in slots[bisect_left(slots, start):]:
+                car = inventory["cars"][slot]
+                if predicate is None or predicate(car):
+                    yield slot, copy_car(car)
+                    if left is not None:
+                        left -= 1
+                        if not left:
+                            return
+            return
+        n = count_records()
+        size = min(limit or STREAM_CHUNK, STREAM_CHUNK)
+        while start < n:
+            cols = load_columns(start, min(start + size, n))
+            for slot, car in zip(cols["slot"], cars_from_columns(cols)):
+                if predicate is None or predicate(car):
+                    yield slot, car
+                    if left is not None:
+                        left -= 1
+                        if not left:
+                            return
+            start += size
+            size = min(size * 2, STREAM_CHUNK)
+
+def iter_cars(start=0, limit=None, predicate=None):
+    # เหมือน iter_car_slots แต่คืนแค่ Car
+    for _, car in iter_car_slots(start, limit, predicate):
+        yield car
+
+def column_car(cols, i):
+    # แปลงแถวที่ i ของคอลัมน์กลับเป็น Car แบบเดียวกับ unpack_car (ข้อมูลลูกค้าที่ไม่ได้โหลดมาเป็นค่าว่าง)
+    name, phone, acquired_on, sold_on = (cols[f][i] if f in cols else ""
+                                         for f in ("customer_name", "customer_phone", "acquired_on", "sold_on"))
+    return Car(f"C{cols['car_id'][i]:03d}", cols["year"][i], cols["brand"][i], cols["model"][i],
+               cols["odometer"][i], cols["buy_price"][i], "Yes" if cols["is_sold"][i] == 1 else "No",
+               cols["sell_price"][i], cols["final_price"][i], name, phone, acquired_on, sold_on)
+
+# ================= Lock & WAL =================
+# หลาย terminal ใช้โฟลเดอร์ข้อมูลเดียวกันได้อย่างปลอดภัย
+#  - cars.lock  : flock ของทั้งโฟลเดอร์ → อ่านใช้ shared lock (อ่านพร้อมกันได้), เขียนใช้ exclusive lock
+#                 ผู้อ่านจึงไม่เห็นข้อมูลที่เขียนไปครึ่งเดียว (locked() ซ้อนกันได้ แต่ขอ exclusive ซ้อนใน shared ไม่ได้:
+#                 flock ขยับ shared → exclusive โดยปล่อย lock เดิมก่อน ผู้เขียนคนอื่นจึงแทรกเข้ามากลาง section ได้)
+#  - cars.build.lock : exclusive flock ตอน build/เขียนไฟล์เสริม (building()) ขณะถือ shared lock ของข้อมูลอยู่
+#                 → ผู้อ่านหลายคนเจอ sidecar ค้างพร้อมกัน คนเดียวได้ build ที่เหลือรอแล้วเช็คซ้ำ
+#  - cars.scan.lock : report/sort ที่อ่านทั้งไฟล์ไม่ถือ cars.lock ตลอดการอ่าน (ดู iter_column_chunks) แต่ถือ shared flock
+#                 ของไฟล์นี้ (scanning()) → ผู้เขียนปกติไม่ต้องรอ report; มีแค่ compact/migrate/save_all ที่เปลี่ยนไฟล์ทั้งชุด
+#                 (slot เลื่อน) ขอ exclusive ก่อน (replacing()) ลำดับการขอ: cars.scan.lock → cars.lock → cars.build.lock
+#  - cars.wal   : write_records() ต่อท้าย log ด้วยทุก (ไฟล์, offset, bytes) ของการเขียนครั้งนั้น แล้ว fsync log
+#                 ก่อนแตะไฟล์ .dat → ไฟดับระหว่างเขียน .dat เมื่อไหร่ก็ตาม log ที่อยู่บน disk แล้วซ่อม record ที่ขาดได้เสมอ
+#                 (entry ที่ยังไม่ถึง disk = ยังไม่ได้เขียน .dat เลย) append/update/delete หลาย thread พร้อมกันรวมเป็น
+#                 write_records() ครั้งเดียว = fsync เดียว (ดู Group Commit)
+#  - recover()  : ครั้งแรกที่ process ขอ lock → เล่น log ซ้ำ (เขียนเฉพาะ byte ที่ไม่ตรง) แล้วตัด 3 ไฟล์ .dat
+#                 ให้มีจำนวน record เท่ากัน และไม่เกินจำนวนใน header (v2+) (record ที่เขียนค้างตอนล้มจะไม่ทำให้ load_all หยุดกลางทางอีก)
+#  - checkpoint(): log ยาวเกิน WAL_CHECKPOINT_BYTES หรือ process จบปกติ → fsync ไฟล์ .dat แล้วล้าง log
+FILE_LOCK = "cars.lock"
+FILE_BUILD_LOCK = "cars.build.lock"
+FILE_SCAN_LOCK = "cars.scan.lock"
+FILE_WAL = "cars.wal"
+FILE_REPLACE = "cars.replace"
+WAL_FILES = (FILE_BASIC, FILE_STATUS, FILE_SALE)
+WAL_CHECKPOINT_BYTES = 4 << 20
+struct_wal_header = struct.Struct("<I I")    # ความยาว payload, crc32 ของ payload
+struct_wal_write = struct.Struct("<B q I")   # ลำดับไฟล์ใน WAL_FILES, offset, ความยาว (ตามด้วย bytes)
+
+LOCK_NONE, LOCK_SHARED, LOCK_EXCLUSIVE = 0, 1, 2
+lock_mutex = threading.RLock()
+lock_state = {"file": None, "flock": LOCK_NONE, "levels": [], "recovered": False, "owner": None}
+build_state = {"file": None, "depth": 0}
+scan_mutex = threading.Lock()
+scan_state = {"file": None, "depth": 0}
+
+def set_flock(level):
+    if lock_state["flock"] != level:
+        if fcntl is not None:
+            fcntl.flock(lock_state["file"], (fcntl.LOCK_UN, fcntl.LOCK_SH, fcntl.LOCK_EX)[level])
+        lock_state["flock"] = level
+
+@contextmanager
+def locked(shared=False):
+    with lock_mutex:
+        levels = lock_state["levels"]
+        if not levels:
+            lock_state["file"] = open(FILE_LOCK, "a+b")
+            lock_state["owner"] = threading.get_ident()
+            if not lock_state["recovered"]:
+                set_flock(LOCK_EXCLUSIVE)
+                recover()
+                lock_state["recovered"] = True
+            data_format()
+        if not shared and levels and max(levels) == LOCK_SHARED:
+            raise RuntimeError("exclusive lock requested inside a shared section")
+        level = max(levels + [LOCK_SHARED if shared else LOCK_EXCLUSIVE])
+        set_flock(level)
+        levels.append(level)
+        try:
+            yield
+        finally:
+            levels.pop()
+            set_flock(max(levels, default=LOCK_NONE))
+            if not levels:
+                lock_state["file"].close()
+                lock_state["file"] = None
+                lock_state["owner"] = None
+
+def holds_lock():
+    # thread นี้อยู่ใน locked() อยู่หรือไม่ (thread อื่นเข้า locked() ไม่ได้จนกว่า owner จะออก)
+    return lock_state["owner"] == threading.get_ident()
+
+@contextmanager
+def building():
+    # (ถือ lock ของข้อมูลอยู่) กันไม่ให้ process อื่น build/เขียนไฟล์เสริมพร้อมกัน; ถือ exclusive อยู่แล้วไม่ต้องขอ
+    with lock_mutex:
+        if not lock_state["levels"]:
+            raise RuntimeError("building() requires locked()")
+        if lock_state["flock"] == LOCK_EXCLUSIVE:
+            yield
+            return
+        if not build_state["depth"]:
+            build_state["file"] = open(FILE_BUILD_LOCK, "a+b")
+            if fcntl is not None:
+                fcntl.flock(build_state["file"], fcntl.LOCK_EX)
+        build_state["depth"] += 1
+        try:
+            yield
+        finally:
+            build_state["depth"] -= 1
+            if not build_state["depth"]:
+                build_state["file"].close()  # close ปล่อย flock ไปด้วย
+                build_state["file"] = None
+
+@contextmanager
+def scanning():
+    # อ่านทั้งไฟล์โดยไม่ถือ cars.lock: กันแค่ไม่ให้ไฟล์ถูกเปลี่ยนทั้งชุดระหว่างอ่าน (ทุก thread ใน process ใช้ flock เดียวกัน)
+    # ถือ cars.lock อยู่แล้ว → ไฟล์เปลี่ยนทั้งชุดไม่ได้อยู่แล้ว และขอ cars.scan.lock ตอนนี้ผิดลำดับ (deadlock กับ replacing())
+    if holds_lock():
+        yield
+        return
+    with scan_mutex:
+        if not scan_state["depth"]:
+            scan_state["file"] = open(FILE_SCAN_LOCK, "a+b")
+            if fcntl is not None:
+                fcntl.flock(scan_state["file"], fcntl.LOCK_SH)
+        scan_state["depth"] += 1
+    try:
+        yield
+    finally:
+        with scan_mutex:
+            scan_state["depth"] -= 1
+            if not scan_state["depth"]:
+                scan_state["file"].close()
+                scan_state["file"] = None
+
+@contextmanager
+def replacing():
+    # (ก่อน locked()) compact / migrate / save_all: รอ scan ที่ค้างอยู่ให้จบก่อนเปลี่ยนไฟล์ทั้งชุด
+    if holds_lock():
+        raise RuntimeError("replacing() must be entered before locked()")
+    with open(FILE_SCAN_LOCK, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+def fsync_file(path):
+    if os.path.exists(path):
+        fd = os.open(path, os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def wal_append(writes):
+    # (ถือ exclusive lock อยู่) entry ถึง disk แล้วเมื่อคืนค่า → ผู้เรียกค่อยเขียนไฟล์ .dat ต่อได้
+    payload = b"".join(struct_wal_write.pack(WAL_FILES.index(path), offset, len(data)) + data
+                       for path, offset, data in writes)
+    with open(FILE_WAL, "ab") as f:
+        f.write(struct_wal_header.pack(len(payload), zlib.crc32(payload)) + payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+def read_wal():
+    # entry ที่สมบูรณ์ทั้งหมดใน log (หยุดที่ entry แรกที่เขียนไม่ครบหรือ crc ไม่ตรง)
+    writes = []
+    if not os.path.exists(FILE_WAL):
+        return writes
+    with open(FILE_WAL, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos + struct_wal_header.size <= len(data):
+        size, crc = struct_wal_header.unpack_from(data, pos)
+        pos += struct_wal_header.size
+        payload = data[pos:pos + size]
+        if len(payload) < size or zlib.crc32(payload) != crc:
             break
-        # --- Buy Price ---
-        while True:
+        p = 0
+        while p < size:
+            no, offset, n = struct_wal_write.unpack_from(payload, p)
+            p += struct_wal_write.size
+            writes.append((WAL_FILES[no], offset, payload[p:p + n]))
+            p += n
+        pos += size
+    return writes
+
+def checkpoint():
+    # (ถือ exclusive lock อยู่) ไฟล์ .dat ลง disk ครบแล้ว → ล้าง log
+    for path in WAL_FILES:
+        fsync_file(path)
+    if os.path.exists(FILE_WAL):
+        open(FILE_WAL, "wb").close()
+
+def recover():
+    # (ถือ exclusive lock อยู่) ทำงานที่ค้างจาก process ที่ล้มไปให้เสร็จ
+    if os.path.exists(FILE_REPLACE):
+        # replace_data_files() ล้มกลางทาง: ไฟล์ .tmp เขียนครบแล้ว → replace ต่อให้ครบ
+        for path in WAL_FILES:
+            if os.path.exists(path + ".tmp"):
+                os.replace(path + ".tmp", path)
+        os.remove(FILE_REPLACE)
+    writes = read_wal()
+    if writes:
+        # เขียนเฉพาะตำแหน่งที่ยังไม่ตรงกับ log → ถ้าไม่มีอะไรเสีย mtime ไม่เปลี่ยน sidecar ไม่ต้อง build ใหม่
+        files = {}
+        try:
+            for path, offset, data in writes:
+                f = files.get(path)
+                if f is None:
+                    f = files[path] = open(path, "r+b" if os.path.exists(path) else "w+b")
+                f.seek(offset)
+                if f.read(len(data)) != data:
+                    f.seek(offset)
+                    f.write(data)
+        finally:
+            for f in files.values():
+                f.close()
+    checkpoint()
+    if all(os.path.exists(path) for path in WAL_FILES):
+        n = count_records()
+        if HEADER_SIZE:
+            # header เขียนใน entry เดียวกับ record เสมอ → record ที่เกินจำนวนใน header คือ append ที่ไม่ได้ commit
+            n = min([n] + header_counts())
+        for path, st in ((FILE_BASIC, struct_basic), (FILE_STATUS, struct_status), (FILE_SALE, struct_sale)):
+            if os.path.getsize(path) != HEADER_SIZE + n * st.size:
+                os.truncate(path, HEADER_SIZE + n * st.size)
+        if HEADER_SIZE:
+            # header ตรงอยู่แล้ว → ไม่เขียนซ้ำ (mtime ไม่เปลี่ยน sidecar ของ process ก่อนยังใช้ได้)
+            for path, offset, data in header_writes(n):
+                with open(path, "r+b") as f:
+                    f.seek(offset)
+                    if f.read(len(data)) != data:
+                        f.seek(offset)
+                        f.write(data)
+
+def replace_data_files():
+    # (ถือ exclusive lock อยู่) แทนที่ทั้ง 3 ไฟล์ด้วย <ไฟล์>.tmp ที่เขียนเสร็จแล้ว (compact / save_all)
+    # log อ้าง offset ของไฟล์ชุดเดิม → checkpoint ก่อน; ถ้าล้มระหว่าง replace, recover() จะทำต่อให้ครบ
+    checkpoint()
+    with open(FILE_BASIC + ".tmp", "r+b") as f:
+        # ไฟล์ชุดใหม่นับ generation ต่อจากชุดเดิม (stamp เปลี่ยนแน่นอนแม้ขนาด/mtime บังเอิญตรงกับของเดิม)
+        if f.read(len(HEADER_MAGIC)) == HEADER_MAGIC:
+            f.seek(HEADER_GENERATION_OFFSET)
+            f.write(struct.pack("<q", data_generation() + 1))
+    for path in WAL_FILES:
+        fsync_file(path + ".tmp")
+    open(FILE_REPLACE, "wb").close()
+    for path in WAL_FILES:
+        os.replace(path + ".tmp", path)
+    os.remove(FILE_REPLACE)
+
+def shutdown():
+    # process จบปกติ → checkpoint ไว้ process ถัดไปไม่ต้องเล่น log ซ้ำ
+    if lock_state["recovered"] and os.path.exists(FILE_WAL) and os.path.getsize(FILE_WAL):
+        with locked():
+            checkpoint()
+
+atexit.register(shutdown)
+
+# ================= Record I/O (ทีละคัน) =================
+# รถแต่ละคันอยู่ที่ slot เดียวกันในทั้ง 3 ไฟล์ → offset = header + slot * ขนาด struct
+# อ่าน/เขียนรถ 1 คันจึงเป็น O(1) ไม่ต้องเขียนทั้งไฟล์ใหม่แบบ save_all()
+STATUS_ACTIVE = 1  # ลำดับ field active ใน struct_status
+
+def slot_offset(st, slot):
+    return HEADER_SIZE + slot * st.size
+
+def field_offset(st, i):
+    # ตำแหน่ง (bytes) ของ field ที่ i ภายใน record
+    return struct.calcsize("<" + "".join(st.format.lstrip("<").split()[:i]))
+
+def count_records():
+    # จำนวน record ที่สมบูรณ์ = ไฟล์ที่สั้นที่สุด (เหมือนที่ load_all หยุดอ่าน)
+    if not (os.path.exists(FILE_BASIC) and os.path.exists(FILE_STATUS) and os.path.exists(FILE_SALE)):
+        return 0
+    data_format()
+    return min(max(os.path.getsize(FILE_BASIC) - HEADER_SIZE, 0) // struct_basic.size,
+               max(os.path.getsize(FILE_STATUS) - HEADER_SIZE, 0) // struct_status.size,
+               max(os.path.getsize(FILE_SALE) - HEADER_SIZE, 0) // struct_sale.size)
+
+def write_records(writes):
+    # writes = [(file, offset, bytes), ...] เขียนทับเฉพาะตำแหน่งที่ระบุ (เปิดแต่ละไฟล์ครั้งเดียว)
+    # ลง cars.wal และ fsync ก่อนเสมอ แล้วค่อยเขียนทับไฟล์ .dat (ดู Lock & WAL)
+    with locked():
+        if HEADER_SIZE:
+            writes = writes + [generation_write()]
+        wal_append(writes)
+        count_io(written=sum(len(data) for _, _, data in writes))
+        files = {}
+        try:
+            for path, offset, data in writes:
+                f = files.get(path)
+                if f is None:
+                    f = files[path] = open(path, "r+b" if os.path.exists(path) else "wb")
+                f.seek(offset)
+                f.write(data)
+        finally:
+            for f in files.values():
+                f.close()
+        if os.path.getsize(FILE_WAL) > WAL_CHECKPOINT_BYTES:
+            checkpoint()
+
+def read_car(slot):
+    with locked(shared=True):
+        car = cached_car(slot)
+        if car is not None:
+            count_io(records=1)
+            return car
+        count_io(records=1, read=struct_basic.size + struct_status.size + struct_sale.size)
+        with open(FILE_BASIC,"rb") as fb, open(FILE_STATUS,"rb") as fs, open(FILE_SALE,"rb") as fsl:
+            fb.seek(slot_offset(struct_basic, slot))
+            fs.seek(slot_offset(struct_status, slot))
+            fsl.seek(slot_offset(struct_sale, slot))
+            return unpack_car(fb.read(struct_basic.size), fs.read(struct_status.size), fsl.read(struct_sale.size))
+
+def read_cars(slots):
+    # อ่านหลายคันตาม slot (เรียงจากน้อยไปมาก) โดยเปิดไฟล์แค่ครั้งเดียว
+    with locked(shared=True):
+        if cache_fresh() and all(slot in inventory["cars"] for slot in slots):
+            count_io(records=len(slots))
+            return [copy_car(inventory["cars"][slot]) for slot in slots]
+        cars = []
+        with open(FILE_BASIC,"rb") as fb, open(FILE_STATUS,"rb") as fs, open(FILE_SALE,"rb") as fsl:
+            for slot in slots:
+                fb.seek(slot_offset(struct_basic, slot))
+                fs.seek(slot_offset(struct_status, slot))
+                fsl.seek(slot_offset(struct_sale, slot))
+                cars.append(unpack_car(fb.read(struct_basic.size), fs.read(struct_status.size), fsl.read(struct_sale.size)))
+        count_io(records=len(cars), read=len(cars) * (struct_basic.size + struct_status.size + struct_sale.size))
+        return cars
+
+def is_active(slot):
+    with locked(shared=True):
+        with open(FILE_STATUS, "rb") as fs:
+            fs.seek(slot_offset(struct_status, slot) + field_offset(struct_status, STATUS_ACTIVE))
+            return struct.unpack("<i", fs.read(4))[0] == 1
+
+def append_car(car, unique=False):
+    # ต่อท้ายทั้ง 3 ไฟล์ที่ slot ถัดไป แล้วคืนค่า slot ของรถคันใหม่
+    # unique=True → ValueError ถ้ามี CarID นี้อยู่แล้ว (เช็คในรอบเดียวกับที่เขียน ไม่ต้องถือ lock ครอบเอง)
+    return commit(None, prepare_append, car, unique)
+
+def delete_at(slot):
+    # soft delete: เปลี่ยน active ใน cars_status.dat เป็น 0 (เขียนแค่ 4 bytes)
+    # record ยังอยู่ในไฟล์จนกว่าจะสั่ง compact()
+    commit(slot, prepare_delete, slot)
+
+def update_car_at(slot, car):
+    # Update เปลี่ยนแค่สถานะ/ข้อมูลการขาย → เขียนทับแค่ status กับ sale ของ slot นั้น
+    commit(slot, prepare_update, slot, car)
+
+# ---------- Group Commit ----------
+# append_car / delete_at / update_car_at ไม่เขียนเองทันที แต่ต่อคิวแล้วรอผล
+#  - thread ที่เข้าคิวตอนยังไม่มี leader เป็น leader: ถือ exclusive lock แล้วดึงงานที่รออยู่ทั้งหมดมาทำเป็นรอบเดียว
+#    รวม bytes ของทุกงานเป็น write_records() ครั้งเดียว (entry เดียวใน cars.wal → fsync ครั้งเดียว → เขียนไฟล์ .dat
+#    ตามลำดับคิว) แล้วอัปเดต sidecar ทีละงาน เหมือน mark_sold_batch()
+#  - งานที่เข้าคิวระหว่างที่ leader fsync อยู่ไปรวมกันในรอบถัดไป → writer N ตัวพร้อมกันใช้ fsync น้อยกว่า N ครั้ง
+#  - ทุกงานในรอบคำนวณจากไฟล์ก่อนรอบนั้นเขียน → งานที่แตะ slot เดียวกับงานก่อนหน้าในรอบรอไปรอบถัดไป
+#    (ค่าเดิมที่ส่งให้ sidecar ต้องเป็นค่าหลังงานก่อนหน้า) ส่วน append นับ slot ต่อจากงานก่อนหน้าในรอบ
+#  - thread ที่อยู่ใน locked() อยู่แล้ว (เช่น View ที่ Update ต่อ) ทำงานของตัวเองเป็นรอบเดี่ยวทันที
+#    (รอ leader ที่กำลังรอ lock ของตัวเองอยู่ = deadlock)
+#  - งานที่ pack ไม่ได้ (struct.error ฯลฯ) ได้ exception ของตัวเองคืน ไม่กระทบงานอื่นในรอบ
+commit_cond = threading.Condition()
+commit_state = {"queue": deque(), "leader": False}
+
+def commit(slot, prepare, *args):
+    # slot = slot ที่งานนี้แก้ (None = append) → คืนค่าผลของงาน (append = slot ใหม่)
+    job = {"slot": slot, "prepare": prepare, "args": args, "done": False, "result": None, "error": None}
+    if holds_lock():
+        commit_batch([job])
+    else:
+        with commit_cond:
+            commit_state["queue"].append(job)
+            while not job["done"] and commit_state["leader"]:
+                commit_cond.wait()
+            lead = not job["done"]
+            if lead:
+                commit_state["leader"] = True
+        if lead:
             try:
-                buy_price = float(input("Buy Price: "))
-                if buy_price < 0:
-                    print("Error: Buy Price cannot be negative!")
-                    continue
+                while True:
+                    with commit_cond:
+                        jobs = list(commit_state["queue"])
+                        commit_state["queue"].clear()
+                    if not jobs:
+                        break
+                    try:
+                        left = commit_batch(jobs)
+                    except BaseException as e:
+                        # (เช่น Ctrl+C ระหว่างรอ lock) งานที่ดึงมาแล้วไม่มีใครทำต่อ → แจ้งเจ้าของงานทุกคน
+                        for other in jobs:
+                            if not other["done"]:
+                                other.update(error=e, done=True)
+                        raise
+                    with commit_cond:
+                        commit_state["queue"].extendleft(reversed(left))
+                        commit_cond.notify_all()
+            finally:
+                with commit_cond:
+                    commit_state["leader"] = False
+                    commit_cond.notify_all()
+    if job["error"] is not None:
+        raise job["error"]
+    return job["result"]
+
+def commit_batch(jobs):
+    # รอบหนึ่งของ group commit → คืนงานที่ยังไม่ได้ทำ (แตะ slot ซ้ำกับงานก่อนหน้าในรอบ)
+    with locked():
+        init_data_files()
+        fresh = fresh_sidecars()
+        batch = {"count": count_records(), "fresh": fresh, "ids": set()}
+        start, touched, writes, synced = batch["count"], set(), [], []
+        for i, job in enumerate(jobs):
+            if job["slot"] in touched:
+                left = jobs[i:]
                 break
-            except ValueError:
-                print("Error: Buy Price must be a number!")
-        # --- Sell Price ---
-        while True:
             try:
-                sell_price = float(input("Sell Price: "))
-                if sell_price < 0:
-                    print("Error: Sell Price cannot be negative!")
+                slot, job_writes, old, new = job["prepare"](batch, *job["args"])
+            except Exception as e:
+                job.update(error=e, done=True)
+                continue
+            touched.add(slot)
+            writes += job_writes
+            synced.append((job, slot, old, new))
+        else:
+            left = []
+        if batch["count"] != start:
+            writes += header_writes(batch["count"])
+        try:
+            if writes:
+                write_records(writes)
+                count_io(records=len(synced))
+            for job, slot, old, new in synced:
+                sync_sidecars(fresh, slot, old, new)
+                job.update(result=slot, done=True)
+        except Exception as e:
+            for job, _, _, _ in synced:
+                if not job["done"]:
+                    job.update(error=e, done=True)
+        return left
+
+def prepare_append(batch, car, unique):
+    if unique and (car.car_id in batch["ids"] or find_slot(car.car_id) is not None):
+        raise ValueError("CarID already exists!")
+    slot = batch["count"]
+    rb, rs, rl = pack_car(car)
+    batch["count"] += 1
+    batch["ids"].add(car.car_id)
+    writes = [
+        (FILE_BASIC, slot_offset(struct_basic, slot), rb),
+        (FILE_STATUS, slot_offset(struct_status, slot), rs),
+        (FILE_SALE, slot_offset(struct_sale, slot), rl),
+    ]
+    # sidecar ต้องเห็นค่าแบบที่เก็บจริงในไฟล์ (เช่นราคาเป็น float32) → ส่งค่าที่ decode กลับจาก bytes
+    return slot, writes, None, unpack_car(rb, rs, rl)
+
+def prepare_delete(batch, slot):
+    old = read_car(slot) if batch["fresh"] else None
+    return slot, [(FILE_STATUS, slot_offset(struct_status, slot) + field_offset(struct_status, STATUS_ACTIVE),
+                   struct.pack("<i", 0))], old, None
+
+def prepare_update(batch, slot, car):
+    old = read_car(slot) if batch["fresh"] else None
+    _, rs, rl = pack_car(car)
+    writes = [(FILE_STATUS, slot_offset(struct_status, slot), rs), (FILE_SALE, slot_offset(struct_sale, slot), rl)]
+    # cars_basic.dat ไม่ได้เขียน → sidecar ต้องเห็น basic เดิมในไฟล์ ไม่ใช่ basic ของ car ที่ส่งมา
+    return slot, writes, old, unpack_car(pack_car(old)[0], rs, rl) if batch["fresh"] else None
+
+# ================= Sidecars =================
+# ไฟล์เสริม (index ต่างๆ) ที่สร้างจากไฟล์ .dat ได้เสมอ แต่ละตัวเก็บ stamp (generation ใน header + size + mtime ของ 3 ไฟล์ .dat)
+# ไว้ตอนที่ตรงกับข้อมูลล่าสุด → ถ้า stamp ไม่ตรง (ไฟล์หาย/ถูกแก้จากที่อื่น) ถือว่าค้าง แล้ว build ใหม่ตอนใช้งาน
+# generation ทำให้การเขียนที่ขนาดไฟล์ไม่เปลี่ยนและ mtime หยาบ (เขียนซ้ำใน tick เดียวกัน) ยังเปลี่ยน stamp (format v1 ใช้แค่ size + mtime)
+# ทุกครั้งที่ append/update/delete: ตัวที่ยังสดอยู่ก่อนเขียนจะถูกอัปเดตทีละคันแล้ว stamp ใหม่
+# SIDECARS เก็บ (fresh, apply, stamp) ของแต่ละตัว โดย apply(slot, old, new) → old=None คือเพิ่ม, new=None คือลบ
+# (stamp = None ถ้า apply เขียน stamp ให้เองอยู่แล้ว)
+SIDECARS = []
+struct_stamp = struct.Struct("<7q")
+
+def data_stamp():
+    stamp = [data_generation()]
+    for path in (FILE_BASIC, FILE_STATUS, FILE_SALE):
+        if os.path.exists(path):
+            st = os.stat(path)
+            stamp += [st.st_size, st.st_mtime_ns]
+        else:
+            stamp += [0, 0]
+    return tuple(stamp)
+
+def stamp_file_fresh(path):
+    # ไฟล์ stamp ของ sidecar แบบโฟลเดอร์ (Filter Index, Column Store) ตรงกับไฟล์ .dat ปัจจุบันหรือไม่
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        data = f.read()
+    return len(data) == struct_stamp.size and struct_stamp.unpack(data) == data_stamp()
+
+def write_stamp_file(path):
+    with open(path, "wb") as f:
+        f.write(struct_stamp.pack(*data_stamp()))
+
+def fresh_sidecars():
+    return [(apply, stamp) for fresh, apply, stamp in SIDECARS if fresh()]
+
+def ensure_fresh(fresh, build):
+    # sidecar ค้าง → ขอ build lock แล้ว build ใหม่ (เช็คซ้ำเผื่อ process อื่น build ให้แล้วระหว่างรอ lock)
+    # ข้อมูลไม่เปลี่ยนระหว่างนี้เพราะถือ shared lock อยู่ → ผู้อ่านคนอื่นที่เจอ sidecar ค้างจะรอ build lock เหมือนกัน
+    if not fresh():
+        with locked(shared=True), building():
+            if not fresh():
+                build()
+
+def sync_sidecars(fresh, slot, old, new):
+    for apply, stamp in fresh:
+        apply(slot, old, new)
+        if stamp:
+            stamp()
+
+# ================= Hash Table (บนดิสก์) =================
+# hash table แบบ open addressing ที่ไฟล์ index ใช้ร่วมกัน: key (int) → value (int)
+# หา/แก้ค่าด้วยการ seek อ่านแค่ไม่กี่ entry ไม่ต้องโหลดทั้งไฟล์
+#    header : magic, capacity, count, stamp (ดู Sidecars)
+#    entry  : key (int), value (int)  → value = -1 คือช่องว่าง
+HASH_MAGIC = b"CID3"
+struct_hash_header = struct.Struct("<4s i i 7q")
+struct_hash_entry = struct.Struct("<q q")
+EMPTY_ENTRY = struct_hash_entry.pack(0, -1)
+
+def hash_bucket(key, capacity):
+    return (key * 2654435761) % capacity
+
+def read_hash_header(f):
+    f.seek(0)
+    data = f.read(struct_hash_header.size)
+    if len(data) < struct_hash_header.size:
+        return None
+    h = struct_hash_header.unpack(data)
+    if h[0] != HASH_MAGIC or h[1] <= 0:
+        return None
+    return h
+
+def hash_fresh(path):
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        h = read_hash_header(f)
+    return h is not None and tuple(h[3:]) == data_stamp()
+
+def hash_build(path, items):
+    # items = [(key, value), ...] ถ้า key ซ้ำ ตัวหลังสุดชนะ
+    items = list(items)
+    capacity = 16
+    while capacity < len(items) * 2:
+        capacity *= 2
+    table = [None] * capacity
+    count = 0
+    for key, value in items:
+        b = hash_bucket(key, capacity)
+        while table[b] is not None and table[b][0] != key:
+            b = (b + 1) % capacity
+        if table[b] is None:
+            count += 1
+        table[b] = (key, value)
+    # เขียน .tmp แล้ว replace → ผู้อ่านที่เปิดไฟล์เดิมค้างไว้ (find_slot ที่ build index ซ้ำ) ไม่เห็นไฟล์ครึ่งเดียว
+    with open(path + ".tmp", "wb") as f:
+        f.write(struct_hash_header.pack(HASH_MAGIC, capacity, count, *data_stamp()))
+        f.write(b"".join(EMPTY_ENTRY if e is None else struct_hash_entry.pack(*e) for e in table))
+    os.replace(path + ".tmp", path)
+
+def hash_stamp(path):
+    with open(path, "r+b") as f:
+        h = read_hash_header(f)
+        f.seek(0)
+        f.write(struct_hash_header.pack(HASH_MAGIC, h[1], h[2], *data_stamp()))
+
+def hash_probe(f, capacity, key):
+    # คืนค่า (ตำแหน่ง entry, value) ของ key หรือของช่องว่างแรกที่เจอ (value = -1)
+    b = hash_bucket(key, capacity)
+    while True:
+        pos = struct_hash_header.size + b * struct_hash_entry.size
+        f.seek(pos)
+        k, value = struct_hash_entry.unpack(f.read(struct_hash_entry.size))
+        if value == -1 or k == key:
+            return pos, value
+        b = (b + 1) % capacity
+
+def hash_get(path, key):
+    with open(path, "rb") as f:
+        h = read_hash_header(f)
+        _, value = hash_probe(f, h[1], key)
+    return None if value == -1 else value
+
+def hash_set(path, key, value):
+    with open(path, "r+b") as f:
+        h = read_hash_header(f)
+        capacity, count = h[1], h[2]
+        pos, old = hash_probe(f, capacity, key)
+        f.seek(pos)
+        f.write(struct_hash_entry.pack(key, value))
+        if old == -1:
+            count += 1
+        f.seek(0)
+        f.write(struct_hash_header.pack(HASH_MAGIC, capacity, count, *data_stamp()))
+    if count * 2 > capacity:
+        hash_build(path, hash_items(path))  # ตารางแน่นเกินไป → ขยายขนาดเป็น 2 เท่า
+
+def hash_items(path):
+    with open(path, "rb") as f:
+        f.seek(struct_hash_header.size)
+        data = f.read()
+    return [(k, v) for k, v in struct_hash_entry.iter_unpack(data) if v != -1]
+
+# ================= Index (car_id → slot) =================
+# cars_index.dat เป็น hash table (car_id → slot) ใช้หา slot ของรถจาก car_id
+# โดยไม่ต้อง decode รถทุกคัน
+FILE_INDEX = "cars_index.dat"
+
+def index_fresh():
+    return hash_fresh(FILE_INDEX)
+
+def stamp_index():
+    hash_stamp(FILE_INDEX)
+
+def build_index():
+    ids = []
+    if os.path.exists(FILE_BASIC):
+        with open(FILE_BASIC, "rb") as fb:
+            fb.seek(HEADER_SIZE)
+            data = fb.read(count_records() * struct_basic.size)
+        ids = [b[0] for b in struct_basic.iter_unpack(data)]
+    hash_build(FILE_INDEX, ((car_id_int, slot) for slot, car_id_int in enumerate(ids)))
+
+def index_apply(slot, old, new):
+    # ลบ: entry ยังชี้ slot เดิม แต่ find_slot() เช็ค active อยู่แล้ว
+    if new is not None and (old is None or old.car_id != new.car_id):
+        hash_set(FILE_INDEX, int(new.car_id[1:]), slot)
+
+SIDECARS.append((index_fresh, index_apply, stamp_index))
+
+def find_slot(car_id):
+    with locked(shared=True):
+        if count_records() == 0:
+            return None
+        car_id_int = int(car_id[1:])
+        if car_id_int >= 1 << 63:
+            return None
+        for attempt in range(2):
+            if attempt:
+                with locked(shared=True), building():
+                    build_index()
+            else:
+                ensure_fresh(index_fresh, build_index)
+            slot = hash_get(FILE_INDEX, car_id_int)
+            if slot is None:
+                return None
+            # ตรวจซ้ำว่า slot นี้เป็นรถคันนั้นจริง (กันกรณี index ค้างจากการแก้ไฟล์ภายนอก)
+            if slot < count_records():
+                car = inventory["cars"].get(slot) if cache_fresh() else None
+                if car is not None:
+                    # อยู่ใน Inventory Cache = ยัง active → ตรวจ car_id จาก memory ไม่ต้องอ่านไฟล์
+                    if int(car.car_id[1:]) == car_id_int:
+                        return slot
                     continue
-                break
-            except ValueError:
-                print("Error: Sell Price must be a number!")
-        # --- Status ---
-        while True:
-            status_inp = input("Sold? (Yes/No): ").strip().lower()
-            if status_inp not in ["yes", "no"]:
-                print("Error: Please enter Yes or No!")
+                with open(FILE_BASIC, "rb") as fb:
+                    fb.seek(slot_offset(struct_basic, slot))
+                    if struct_car_id.unpack(fb.read(struct_car_id.size))[0] == car_id_int:
+                        return slot if is_active(slot) else None
+        return None
+
+# ================= Filter Index (brand / model / year / status) =================
+# โฟลเดอร์ cars_filter/ เก็บ bitmap ของ slot แยกตามค่าของแต่ละ field (1 ไฟล์ต่อ 1 ค่า)
+#    ชื่อไฟล์ : <field>-<ค่าเป็น hex ของ utf-8>.bm  เช่น brand-546f796f7461.bm (Toyota)
+#    เนื้อไฟล์ : จำนวนบิตที่ตั้งอยู่ (int) ตามด้วย bitmap (bit ที่ slot = 1 ถ้ารถคันนั้นมีค่านี้)
+# Filter ใน View(3) อ่านแค่ bitmap ของค่าที่เลือกแล้วอ่านเฉพาะรถที่ตรง ส่วนรายการตัวเลือกมาจากชื่อไฟล์
+# เมื่อจำนวนบิตเหลือ 0 จะลบไฟล์ทิ้ง ค่านั้นจึงหายไปจากรายการตัวเลือกด้วย
+FILTER_DIR = "cars_filter"
+FILTER_FIELDS = ("brand", "model", "year", "status")
+struct_bitmap_header = struct.Struct("<i")
+
+def filter_keys(car):
+    return {"brand": car.brand, "model": car.model, "year": str(car.year), "status": car.status}
+
+def bitmap_path(field, value):
+    return os.path.join(FILTER_DIR, f"{field}-{value.encode('utf-8').hex()}.bm")
+
+def filter_fresh():
+    return stamp_file_fresh(os.path.join(FILTER_DIR, "stamp"))
+
+def stamp_filters():
+    write_stamp_file(os.path.join(FILTER_DIR, "stamp"))
+
+def build_filters():
+    cols = load_columns(fields=("brand", "model", "year", "is_sold"))
+    size = (count_records() + 7) // 8
+    maps = {}
+    for field, values in (("brand", cols["brand"]), ("model", cols["model"]),
+                          ("year", map(str, cols["year"])),
+                          ("status", ("Yes" if x == 1 else "No" for x in cols["is_sold"]))):
+        for slot, value in zip(cols["slot"], values):
+            bm = maps.get((field, value))
+            if bm is None:
+                bm = maps[(field, value)] = [0, bytearray(size)]
+            bm[0] += 1
+            bm[1][slot >> 3] |= 1 << (slot & 7)
+    os.makedirs(FILTER_DIR, exist_ok=True)
+    for name in os.listdir(FILTER_DIR):
+        os.remove(os.path.join(FILTER_DIR, name))
+    for (field, value), (count, bits) in maps.items():
+        with open(bitmap_path(field, value), "wb") as f:
+            f.write(struct_bitmap_header.pack(count))
+            f.write(bits)
+    stamp_filters()
+
+def bitmap_set(field, value, slot, on):
+    path = bitmap_path(field, value)
+    if not os.path.exists(path):
+        if not on:
+            return
+        with open(path, "wb") as f:
+            f.write(struct_bitmap_header.pack(0))
+    pos = struct_bitmap_header.size + (slot >> 3)
+    with open(path, "r+b") as f:
+        count = struct_bitmap_header.unpack(f.read(struct_bitmap_header.size))[0]
+        f.seek(pos)
+        old = f.read(1)
+        old = old[0] if old else 0
+        new = old | (1 << (slot & 7)) if on else old & ~(1 << (slot & 7))
+        if new == old:
+            return
+        f.seek(pos)  # เขียนเลยท้ายไฟล์ได้ ส่วนที่ว่างจะถูกเติมเป็น 0
+        f.write(bytes([new]))
+        count += 1 if on else -1
+        f.seek(0)
+        f.write(struct_bitmap_header.pack(count))
+    if count == 0:
+        os.remove(path)
+
+def filters_apply(slot, old, new):
+    before = filter_keys(old) if old is not None else {}
+    after = filter_keys(new) if new is not None else {}
+    for field in FILTER_FIELDS:
+        if before.get(field) != after.get(field):
+            if field in before:
+                bitmap_set(field, before[field], slot, False)
+            if field in after:
+                bitmap_set(field, after[field], slot, True)
+
+SIDECARS.append((filter_fresh, filters_apply, stamp_filters))
+
+def filter_values(field):
+    # ค่าทั้งหมดที่มีอยู่ของ field (ใช้แสดง Available options)
+    with locked(shared=True):
+        ensure_fresh(filter_fresh, build_filters)
+        names = os.listdir(FILTER_DIR)
+    prefix = field + "-"
+    return sorted(bytes.fromhex(name[len(prefix):-3]).decode("utf-8")
+                  for name in names if name.startswith(prefix) and name.endswith(".bm"))
+
+def bitmap_slots(bits):
+    slots = []
+    for i, byte in enumerate(bits):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    slots.append(i * 8 + bit)
+    return slots
+
+def filter_slots(field, values):
+    # slot ของรถที่ field มีค่าอยู่ใน values (เรียงตามลำดับในไฟล์)
+    slots = set()
+    with locked(shared=True):
+        ensure_fresh(filter_fresh, build_filters)
+        for value in values:
+            path = bitmap_path(field, value)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    f.seek(struct_bitmap_header.size)
+                    slots.update(bitmap_slots(f.read()))
+    return sorted(slots)
+
+# ================= Customer Index (ชื่อ / เบอร์โทรลูกค้า) =================
+# โฟลเดอร์ cars_customer/ เก็บ posting list ของ n-gram → slot ของรถที่ชื่อ/เบอร์ลูกค้ามี n-gram นั้น
+#    ชื่อไฟล์ : <n|p>-<gram เป็น hex ของ utf-8>.pl  (n = ชื่อ ตัวพิมพ์เล็กเว้นวรรคเดียว, p = เบอร์เฉพาะตัวเลข)
+#    เนื้อไฟล์ : slot (int) เรียงจากน้อยไปมาก
+#    gram     : ทุก 3 ตัวอักษรติดกัน + ต้นคำ 1-2 ตัวอักษร (มี "^" นำหน้า) สำหรับคำค้นที่สั้นกว่า 3 ตัว
+# ค้นหา = intersect posting ของทุก gram ในคำค้น แล้วอ่านเฉพาะรถที่เหลือมาตรวจว่าตรงจริง (ไม่ scan cars_sale.dat)
+#    คำค้นยาว 3 ตัวขึ้นไป → ตรงส่วนใดของชื่อ/เบอร์ก็ได้ (substring), สั้นกว่านั้น → ต้นคำ/ต้นเบอร์ (prefix)
+# คำค้นที่มีแต่ตัวเลข (เว้นวรรค - + ( ) ได้) ค้นจากเบอร์โทร นอกนั้นค้นจากชื่อ
+CUSTOMER_DIR = "cars_customer"
+GRAM = 3
+
+def customer_text(value, kind):
+    if kind == "p":
+        return "".join(ch for ch in value if ch.isdigit())
+    return " ".join(value.casefold().split())
+
+def customer_grams(value, kind):
+    text = customer_text(value, kind)
+    grams = {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+    for word in (text.split() if kind == "n" else [text] if text else []):
+        grams.update("^" + word[:k] for k in range(1, GRAM))
+    return grams
+
+def customer_keys(car):
+    return {("n", g) for g in customer_grams(car.customer_name, "n")} | {("p", g) for g in customer_grams(car.customer_phone, "p")}
+
+def posting_path(kind, gram):
+    return os.path.join(CUSTOMER_DIR, f"{kind}-{gram.encode('utf-8').hex()}.pl")
+
+def read_postings(kind, gram):
+    path = posting_path(kind, gram)
+    slots = array("i")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            slots.frombytes(f.read())
+    return slots
+
+def write_postings(path, slots):
+    if slots:
+        with open(path, "wb") as f:
+            slots.tofile(f)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def posting_set(kind, gram, slot, on):
+    path = posting_path(kind, gram)
+    if on and os.path.exists(path):
+        with open(path, "r+b") as f:
+            f.seek(-array("i").itemsize, os.SEEK_END)
+            if array("i", f.read())[0] < slot:
+                f.write(array("i", [slot]).tobytes())  # slot ใหม่มากกว่าทุกตัว (Add) → ต่อท้ายได้เลย
+                return
+    slots = read_postings(kind, gram)
+    i = bisect_left(slots, slot)
+    present = i < len(slots) and slots[i] == slot
+    if on and not present:
+        slots.insert(i, slot)
+    elif not on and present:
+        del slots[i]
+    else:
+        return
+    write_postings(path, slots)
+
+def customer_fresh():
+    return stamp_file_fresh(os.path.join(CUSTOMER_DIR, "stamp"))
+
+def stamp_customers():
+    write_stamp_file(os.path.join(CUSTOMER_DIR, "stamp"))
+
+def build_customers():
+    postings = {}
+    for cols in iter_column_chunks(fields=("customer_name", "customer_phone")):
+        for kind, values in (("n", cols["customer_name"]), ("p", cols["customer_phone"])):
+            for slot, value in zip(cols["slot"], values):
+                if value:
+                    for gram in customer_grams(value, kind):
+                        slots = postings.get((kind, gram))
+                        if slots is None:
+                            slots = postings[(kind, gram)] = array("i")
+                        slots.append(slot)
+    os.makedirs(CUSTOMER_DIR, exist_ok=True)
+    for name in os.listdir(CUSTOMER_DIR):
+        os.remove(os.path.join(CUSTOMER_DIR, name))
+    for (kind, gram), slots in postings.items():
+        write_postings(posting_path(kind, gram), slots)
+    stamp_customers()
+
+def customers_apply(slot, old, new):
+    before = customer_keys(old) if old is not None else set()
+    after = customer_keys(new) if new is not None else set()
+    for kind, gram in before - after:
+        posting_set(kind, gram, slot, False)
+    for kind, gram in after - before:
+        posting_set(kind, gram, slot, True)
+
+SIDECARS.append((customer_fresh, customers_apply, stamp_customers))
+
+def search_customers(query):
+    # รถ (เรียงตาม slot) ที่ชื่อหรือเบอร์ลูกค้าตรงกับคำค้น
+    kind = "p" if re.fullmatch(r"[\d\s()+-]+", query) else "n"
+    text = customer_text(query, kind)
+    if not text:
+        return []
+    prefix = len(text) < GRAM
+    grams = {"^" + text} if prefix else {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+    with locked(shared=True):
+        ensure_fresh(customer_fresh, build_customers)
+        slots = None
+        for postings in sorted((read_postings(kind, g) for g in grams), key=len):
+            slots = set(postings) if slots is None else slots.intersection(postings)
+            if not slots:
+                return []
+        cars = read_cars(sorted(slots))
+    field = "customer_phone" if kind == "p" else "customer_name"
+    def match(car):
+        value = customer_text(getattr(car, field), kind)
+        if prefix:
+            return any(word.startswith(text) for word in (value.split() if kind == "n" else [value]))
+        return text in value
+    return [car for car in cars if match(car)]
+
+# ================= Range Index (sell_price / final_price / odometer / year / profit) =================
+# โฟลเดอร์ cars_range/ เก็บคู่ (ค่า, slot) ของแต่ละ field เรียงตามค่า → หาช่วง [min, max] ด้วย bisect บน mmap
+#    <field>.key  : ค่า (double) เรียงจากน้อยไปมาก
+#    <field>.slot : slot ของค่าในตำแหน่งเดียวกัน
+#    <field>.log  : การเปลี่ยนแปลงหลัง build (slot, ยังมีค่าอยู่ไหม, ค่าใหม่) ต่อท้ายทีละ entry ไม่ต้องเขียนไฟล์เรียงใหม่
+# ค้นหา = ช่วงจากไฟล์เรียง (ตัด slot ที่มีใน log ออก) + slot ใน log ที่ค่าล่าสุดอยู่ในช่วง
+# log ยาวเกิน RANGE_LOG_MAX entry → ถือว่าค้าง แล้ว build ใหม่ตอนค้นครั้งถัดไป
+# final_price / profit มีเฉพาะรถที่ขายแล้ว (final_price > 0) รถที่ยังไม่ขายจะไม่ตรงช่วงของสอง field นี้
+# หลายช่วงพร้อมกัน = intersect slot ของแต่ละ field (เริ่มจากชุดที่เล็กที่สุด)
+RANGE_DIR = "cars_range"
+RANGE_FIELDS = ("sell_price", "final_price", "odometer", "year", "profit")
+RANGE_LOG_MAX = 4096
+struct_range_log = struct.Struct("<i B d")
+
+def range_keys(car):
+    keys = {"sell_price": car.sell_price, "odometer": car.odometer, "year": car.year}
+    if car.final_price > 0:
+        keys["final_price"] = car.final_price
+        keys["profit"] = car.profit
+    return keys
+
+def range_path(field, ext):
+    return os.path.join(RANGE_DIR, f"{field}.{ext}")
+
+def range_fresh():
+    if not stamp_file_fresh(os.path.join(RANGE_DIR, "stamp")):
+        return False
+    return all(os.path.getsize(range_path(f, "log")) <= RANGE_LOG_MAX * struct_range_log.size
+               for f in RANGE_FIELDS if os.path.exists(range_path(f, "log")))
+
+def stamp_ranges():
+    write_stamp_file(os.path.join(RANGE_DIR, "stamp"))
+
+def build_ranges():
+    entries = {f: (array("d"), array("i")) for f in RANGE_FIELDS}
+    for cols in iter_column_chunks(fields=("year", "odometer", "buy_price", "sell_price", "final_price")):
+        for field in ("sell_price", "odometer", "year"):
+            entries[field][0].fromlist(list(cols[field]))  # column อาจเป็น array ชนิดอื่น (int/q) หรือ list
+            entries[field][1].fromlist(list(cols["slot"]))
+        for slot, buy, final in zip(cols["slot"], cols["buy_price"], cols["final_price"]):
+            if final > 0:
+                for field, key in (("final_price", final), ("profit", final - buy)):
+                    entries[field][0].append(key)
+                    entries[field][1].append(slot)
+    os.makedirs(RANGE_DIR, exist_ok=True)
+    for name in os.listdir(RANGE_DIR):
+        os.remove(os.path.join(RANGE_DIR, name))
+    for field, (keys, slots) in entries.items():
+        order = sorted(range(len(keys)), key=keys.__getitem__)  # sort คงลำดับ slot เดิมเมื่อค่าเท่ากัน
+        with open(range_path(field, "key"), "wb") as f:
+            array("d", [keys[i] for i in order]).tofile(f)
+        with open(range_path(field, "slot"), "wb") as f:
+            array("i", [slots[i] for i in order]).tofile(f)
+    stamp_ranges()
+
+def ranges_apply(slot, old, new):
+    before = range_keys(old) if old is not None else {}
+    after = range_keys(new) if new is not None else {}
+    for field in RANGE_FIELDS:
+        if before.get(field) != after.get(field):
+            with open(range_path(field, "log"), "ab") as f:
+                f.write(struct_range_log.pack(slot, field in after, after.get(field, 0)))
+
+SIDECARS.append((range_fresh, ranges_apply, stamp_ranges))
+
+def range_log(field):
+    # {slot: ค่าล่าสุด หรือ None ถ้าไม่มีค่าแล้ว} จาก log ของ field
+    latest = {}
+    path = range_path(field, "log")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for slot, present, key in struct_range_log.iter_unpack(f.read()):
+                latest[slot] = key if present else None
+    return latest
+
+def range_lookup(field, lo=None, hi=None):
+    # set ของ slot ที่ lo <= ค่า <= hi (None = ไม่จำกัดฝั่งนั้น)
+    with locked(shared=True):
+        ensure_fresh(range_fresh, build_ranges)
+        slots = array("i")
+        with open(range_path(field, "key"), "rb") as fk:
+            n = os.fstat(fk.fileno()).st_size // 8
+            if n:
+                with mmap.mmap(fk.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    keys = memoryview(mm).cast("d")
+                    i = 0 if lo is None else bisect_left(keys, lo)
+                    j = n if hi is None else bisect_right(keys, hi)
+                    keys.release()
+                if j > i:
+                    with open(range_path(field, "slot"), "rb") as fs:
+                        fs.seek(i * slots.itemsize)
+                        slots.frombytes(fs.read((j - i) * slots.itemsize))
+                        count_io(read=(j - i) * slots.itemsize)
+        latest = range_log(field)
+    result = set(slots).difference(latest) if latest else set(slots)
+    result.update(slot for slot, key in latest.items()
+                  if key is not None and (lo is None or key >= lo) and (hi is None or key <= hi))
+    return result
+
+def range_slots(ranges):
+    # ranges = {field: (lo, hi)} → slot ของรถที่อยู่ในทุกช่วง (เรียงตามลำดับในไฟล์)
+    result = None
+    with locked(shared=True):
+        for field, (lo, hi) in ranges.items():
+            slots = range_lookup(field, lo, hi)
+            result = slots if result is None else result & slots
+            if not result:
+                return []
+    return sorted(result or ())
+
+# ================= Column Store =================
+# โฟลเดอร์ cars_columns/ (ไม่บังคับ: python main.py columns on/off) เก็บข้อมูลชุดเดียวกับ 3 ไฟล์ .dat แต่แยกเป็น 1 ไฟล์ต่อ 1 field
+#    <field>.col : ค่าของ field นั้นเรียงตาม slot (ขนาดเท่ากับใน struct ของไฟล์ .dat ไม่มี header)
+# load_columns(fields=...) อ่านแค่ไฟล์ของ field ที่ขอ: summary อ่าน brand/is_sold/final_price
+# ตัวเลขอ่านเข้า array ได้ตรงๆ (ไม่ต้อง unpack) ส่วน string ตัดตามความกว้างแล้ว decode ทั้งคอลัมน์
+# ไฟล์ .dat ยังเป็นข้อมูลหลัก (lock/WAL/recover เหมือนเดิม) โฟลเดอร์นี้เป็น sidecar แบบเดียวกับ Filter Index
+# → ปิดแล้วเปิดใหม่ หรือไฟล์ .dat ถูกแก้จากที่อื่น ก็แค่ build ใหม่จากไฟล์ .dat
+COLUMN_DIR = "cars_columns"
+
+def column_store_enabled():
+    return os.path.isdir(COLUMN_DIR)
+
+def column_path(field):
+    return os.path.join(COLUMN_DIR, field + ".col")
+
+def column_format(field):
+    # (รหัส struct, ความกว้างเป็น bytes) ของ field ตาม format ของไฟล์ .dat ปัจจุบัน
+    i, k = COLUMN_SOURCES[field]
+    code = row_files()[i][1].format.lstrip("<").split()[k]
+    return code, struct.calcsize("<" + code)
+
+def columns_fresh():
+    return stamp_file_fresh(os.path.join(COLUMN_DIR, "stamp"))
+
+def stamp_columns():
+    write_stamp_file(os.path.join(COLUMN_DIR, "stamp"))
+
+def build_columns():
+    # แยก field ของทุก record ในไฟล์ .dat ออกเป็นไฟล์ละ field (ทีละ UNPACK_CHUNK record)
+    n = count_records()
+    os.makedirs(COLUMN_DIR, exist_ok=True)
+    for i, (path, st) in enumerate(row_files()):
+        parts = [(f, field_offset(st, k), column_format(f)[1]) for f, (j, k) in COLUMN_SOURCES.items()
+                 if j == i and has_column(f)]
+        outs = [open(column_path(f) + ".tmp", "wb") for f, _, _ in parts]
+        try:
+            if n:
+                with open(path, "rb") as src:
+                    src.seek(slot_offset(st, 0))
+                    for start in range(0, n, UNPACK_CHUNK):
+                        data = src.read(min(UNPACK_CHUNK, n - start) * st.size)
+                        count_io(read=len(data))
+                        for out, (_, offset, width) in zip(outs, parts):
+                            out.write(b"".join(data[r:r + width] for r in range(offset, len(data), st.size)))
+        finally:
+            for out in outs:
+                out.close()
+        for f, _, _ in parts:
+            os.replace(column_path(f) + ".tmp", column_path(f))
+    stamp_columns()
+
+def read_columns(fields, start, n):
+    # ค่าดิบของ field ที่ขอ (แบบเดียวกับ unpack_columns) จากไฟล์ .col
+    raw = {}
+    for field in fields:
+        if not has_column(field):
+            raw[field] = array("i", bytes(4 * n))  # เหมือน unpack_columns
+            continue
+        code, width = column_format(field)
+        with open(column_path(field), "rb") as f:
+            f.seek(start * width)
+            data = f.read(n * width)
+        count_io(read=len(data))
+        if code.endswith("s"):
+            raw[field] = [data[r:r + width] for r in range(0, len(data), width)]
+        else:
+            col = array(code, data)
+            if sys.byteorder != "little":
+                col.byteswap()
+            raw[field] = col
+    return raw
+
+def columns_apply(slot, old, new):
+    # เขียนเฉพาะ field ที่เปลี่ยน (ลบ = active เป็น 0)
+    if new is None:
+        changes = {"active": struct.pack("<i", 0)}
+    else:
+        before = pack_car(old) if old is not None else None
+        after = pack_car(new)
+        changes = {}
+        for f, (i, k) in COLUMN_SOURCES.items():
+            if not has_column(f):
                 continue
-            break
-        # --- Final Price & Customer Info ---
-        if status_inp == "yes":
-            while True:
-                try:
-                    final_price = float(input("Final Price: "))
-                    if final_price < 0:
-                        print("Error: Final Price cannot be negative!")
-                        continue
-                    break
-                except ValueError:
-                    print("Error: Final Price must be a number!")
-            cname = input("Customer Name: ").strip()
-            cphone = input("Customer Phone: ").strip()
+            offset = field_offset(row_files()[i][1], k)
+            data = after[i][offset:offset + column_format(f)[1]]
+            if before is None or before[i][offset:offset + len(data)] != data:
+                changes[f] = data
+    for f, data in changes.items():
+        with open(column_path(f), "r+b") as fc:
+            fc.seek(slot * len(data))
+            fc.write(data)
+
+SIDECARS.append((columns_fresh, columns_apply, stamp_columns))
+
+def set_column_store(on):
+    # เปิด: build ไฟล์ .col ทันที / ปิด: ลบโฟลเดอร์ทิ้ง (ไฟล์ .dat ไม่ถูกแตะ)
+    with locked():
+        if on:
+            os.makedirs(COLUMN_DIR, exist_ok=True)
+            ensure_fresh(columns_fresh, build_columns)
+            print(f"Column store enabled ({COLUMN_DIR}/).")
         else:
-            final_price = 0.0
-            cname, cphone = "", ""
-        # --- Create Car Dict ---
-        car = {
-            "car_id": car_id,
-            "brand": brand,
-            "model": model,
-            "year": year,
-            "odometer": odometer,
-            "buy_price": buy_price,
-            "sell_price": sell_price,
-            "status": status_inp.capitalize(),
-            "final_price": final_price,
-            "profit": final_price - buy_price if final_price > 0 else 0,
-            "customer_name": cname,
-            "customer_phone": cphone
-        }
-        cars.append(car)
-        save_all(cars)
-        print("Car added successfully!")
-    except Exception as e:
-        print(f"Unexpected error: {e}")
+            if column_store_enabled():
+                for name in os.listdir(COLUMN_DIR):
+                    os.remove(os.path.join(COLUMN_DIR, name))
+                os.rmdir(COLUMN_DIR)
+            print("Column store disabled.")
 
-# ...existing code...
+# ================= Inventory Cache =================
+# load_all() จำรถที่ decode แล้วไว้ใน process เป็น {slot: Car} (เรียงตาม slot) คู่กับ cache_key() ตอนโหลด
+# key ยังตรง → load_all, read_car, read_cars และ report ของ View(4)/(5) ตอบจาก memory
+# cache_key() อ่านแค่ header ของ cars_basic.dat ครั้งเดียว = (inode, generation) ไม่ต้อง stat ครบ 3 ไฟล์ทุกครั้งที่เช็ค
+#    ทุก write_records เพิ่ม generation, ไฟล์ชุดใหม่ (replace) เป็น inode ใหม่ / ไฟล์ v1 ไม่มี generation → ใช้ data_stamp()
+# append/update/delete ผ่านไฟล์นี้แก้ cache ทีละคัน (ลงทะเบียนเป็น sidecar ตัวหนึ่ง) ไม่ต้องโหลดใหม่
+# ไฟล์ถูกแก้จากที่อื่น หรือ import/compact/migrate (เขียนทั้งก้อน) → stamp ไม่ตรง → load_all() ครั้งถัดไปโหลดใหม่
+# Car จาก load_all() เป็น object ตัวเดียวกับใน cache (ห้ามแก้ตรงๆ) ส่วน read_car()/read_cars() คืนสำเนา
+# cache เริ่มเก็บเมื่อมีการเรียก load_all() เท่านั้น (report ไฟล์ใหญ่ที่ไม่เคย load_all จะไม่กิน memory เพิ่ม)
+# ปิดได้ด้วย environment JBGARAGE_CACHE=0
+CACHE_ENABLED = os.environ.get("JBGARAGE_CACHE", "1") != "0"
+inventory = {"stamp": None, "cars": {}}
 
-# ================= Delete =================
-# ...existing code...
+def cache_key():
+    try:
+        with open(FILE_BASIC, "rb") as f:
+            h = f.read(struct_header.size)
+            ino = os.fstat(f.fileno()).st_ino
+    except OSError:
+        return None
+    if len(h) == struct_header.size and h[:4] == HEADER_MAGIC:
+        return ino, struct_header.unpack(h)[4]
+    return data_stamp()
 
-def Delete():
-    cars = load_all()
-    car_id = input("Enter CarID to delete: ").strip().upper()
-    new_cars = [c for c in cars if c["car_id"] != car_id]
-    if len(new_cars) < len(cars):
-        save_all(new_cars)
-        print("Deleted successfully.")
+def cache_fresh():
+    return inventory["stamp"] is not None and inventory["stamp"] == cache_key()
+
+def cache_apply(slot, old, new):
+    if new is None:
+        inventory["cars"].pop(slot, None)
     else:
-        print("Car not found.")
+        inventory["cars"][slot] = new
 
-# ...existing code...
+def stamp_cache():
+    inventory["stamp"] = cache_key()
 
-import struct, os, re
+SIDECARS.append((cache_fresh, cache_apply, stamp_cache))
 
-# ================= File Names =================
-FILE_BASIC = "cars_basic.dat"
-FILE_STATUS = "cars_status.dat"
-FILE_SALE = "cars_sale.dat"
+def copy_car(car):
+    return Car(*(getattr(car, field) for field in Car.__slots__))
 
-# ================= Structs =================
-struct_basic = struct.Struct("<i i 20s 20s i i")
-struct_status = struct.Struct("<i i i f")
-struct_sale = struct.Struct("<i f f f 30s 15s")
+def cached_car(slot):
+    # สำเนาของรถที่ slot จาก cache (None = cache ค้าง หรือ slot นี้ไม่อยู่ใน cache เช่นถูกลบแล้ว)
+    car = inventory["cars"].get(slot) if cache_fresh() else None
+    return None if car is None else copy_car(car)
 
-# ================= Helper =================
-def encode_str(s, size): 
-    return s.encode("utf-8")[:size].ljust(size, b'\x00')
+# ================= Summary Stats =================
+# cars_stats.json เก็บตัวเลขของ make_summary ไว้ล่วงหน้า อัปเดตทีละคันตอน Add/Update/Delete
+# อ่าน summary ได้ทันทีโดยไม่ต้อง scan รถทุกคัน (python main.py summary)
+#    total, sold        : จำนวนรถ (active) / ที่ขายแล้ว
+#    min, max, count    : ของ final_price ที่ไม่เป็น 0
+#    sum                : ผลรวม final_price แบบเศษส่วน (Fraction) ไม่คลาดเคลื่อนเมื่อบวก/ลบไปเรื่อยๆ
+#    brands             : {brand: [จำนวนคัน, slot แรกที่เจอ]} → เรียงตาม slot แรกให้ลำดับตรงกับ make_summary
+# cars_stats_prices.dat เป็น hash table {final_price (bits ของ float32): จำนวนคัน}
+# → ลบคันที่เป็น min/max ออกแล้วยังหาค่าใหม่ได้โดยไม่ต้อง scan รถ
+# ถ้าสงสัยว่าตัวเลขเพี้ยน ใช้ verify_stats() (python main.py summary --verify) คำนวณใหม่จากไฟล์ .dat แล้วเทียบ
+FILE_STATS = "cars_stats.json"
+FILE_STATS_PRICES = "cars_stats_prices.dat"
 
-def decode_str(b): 
-    return b.split(b'\x00',1)[0].decode("utf-8")
+def price_key(p):
+    # v1: bits ของ float32 (ค่าที่เก็บจริงในไฟล์), v2: จำนวนสตางค์
+    if DATA_VERSION >= 2:
+        return to_satang(p)
+    return struct.unpack("<i", struct.pack("<f", p))[0]
 
-# ================= Save & Load =================
-def save_all(cars):
-    with open(FILE_BASIC, "wb") as fb, open(FILE_STATUS, "wb") as fs, open(FILE_SALE, "wb") as fsl:
-        for c in cars:
-            car_id_int = int(c["car_id"][1:])  # remove 'C' → int
-            # BASIC
-            fb.write(struct_basic.pack(
-                car_id_int,
-                int(c["year"]),
-                encode_str(c["brand"], 20),
-                encode_str(c["model"], 20),
-                int(c["odometer"]),
-                int(c["buy_price"])
-            ))
-            # STATUS
-            fs.write(struct_status.pack(
-                car_id_int,
-                1,  # active
-                1 if c["status"].lower() == "yes" else 0,
-                float(c["sell_price"])
-            ))
-            # SALE
-            fsl.write(struct_sale.pack(
-                car_id_int,
-                float(c["buy_price"]),
-                float(c["sell_price"]),
-                float(c["final_price"]),
-                encode_str(c["customer_name"], 30),
-                encode_str(c["customer_phone"], 15)
-            ))
+def key_price(k):
+    if DATA_VERSION >= 2:
+        return k / 100
+    return struct.unpack("<f", struct.pack("<i", k))[0]
 
-def load_all():
-    cars = []
-    if not (os.path.exists(FILE_BASIC) and os.path.exists(FILE_STATUS) and os.path.exists(FILE_SALE)):
-        return []
-    with open(FILE_BASIC,"rb") as fb, open(FILE_STATUS,"rb") as fs, open(FILE_SALE,"rb") as fsl:
-        while True:
-            cb = fb.read(struct_basic.size)
-            cs = fs.read(struct_status.size)
-            cl = fsl.read(struct_sale.size)
-            if not cb or not cs or not cl:
-                break
-            b = struct_basic.unpack(cb)
-            s = struct_status.unpack(cs)
-            l = struct_sale.unpack(cl)
-            car_id = f"C{b[0]:03d}"
-            cars.append({
-                "car_id": car_id,
-                "year": b[1],
-                "brand": decode_str(b[2]),
-                "model": decode_str(b[3]),
-                "odometer": b[4],
-                "buy_price": b[5],
-                "status": "Yes" if s[2] == 1 else "No",
-                "sell_price": s[3],
-                "final_price": l[3],
-                "profit": l[3] - b[5] if l[3] > 0 else 0,
-                "customer_name": decode_str(l[4]),
-                "customer_phone": decode_str(l[5])
-            })
-    return cars
+def key_fraction(k):
+    # ราคาของ key แบบเศษส่วนที่ตรงเป๊ะ
+    if DATA_VERSION >= 2:
+        return Fraction(k, 100)
+    return Fraction(key_price(k))
 
-# ================= Add =================
-def Add():
+def load_stats():
     try:
-        cars = load_all()
-        # --- Car ID ---
-        while True:
-            car_id = input("Enter CarID (C001): ").strip().upper()
-            if any(c["car_id"] == car_id for c in cars):
-                print("Error: CarID already exists!")
-                continue
-            if not re.fullmatch(r"C\d{3}", car_id):
-                print("Error: Format must be Cxxx (e.g., C001)!")
-                continue
-            break
-        # --- Brand ---
-        while True:
-            brand = input("Brand: ").strip()
-            if brand == "":
-                print("Error: Brand cannot be empty!")
-                continue
-            break
-        # --- Model ---
-        while True:
-            model = input("Model: ").strip()
-            if model == "":
-                print("Error: Model cannot be empty!")
-                continue
-            break
-        # --- Year ---
-        while True:
-            year_inp = input("Year (YYYY): ").strip()
-            if not year_inp.isdigit():
-                print("Error: Year must be numbers only!")
-                continue
-            year = int(year_inp)
-            if year < 1900 or year > 2100:
-                print("Error: Year out of range!")
-                continue
-            break
-        # --- Odometer ---
-        while True:
-            odo = input("Odometer (km): ").strip()
-            if not odo.isdigit():
-                print("Error: Odometer must be numbers only!")
-                continue
-            odometer = int(odo)
-            break
-        # --- Buy Price ---
-        while True:
-            try:
-                buy_price = float(input("Buy Price: "))
-                if buy_price < 0:
-                    print("Error: Buy Price cannot be negative!")
-                    continue
-                break
-            except ValueError:
-                print("Error: Buy Price must be a number!")
-        # --- Sell Price ---
-        while True:
-            try:
-                sell_price = float(input("Sell Price: "))
-                if sell_price < 0:
-                    print("Error: Sell Price cannot be negative!")
-                    continue
-                break
-            except ValueError:
-                print("Error: Sell Price must be a number!")
-        # --- Status ---
+        with open(FILE_STATS, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_stats(doc):
+    doc["stamp"] = list(data_stamp())
+    tmp = FILE_STATS + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    os.replace(tmp, FILE_STATS)
+
+def stats_fresh():
+    doc = load_stats()
+    return doc is not None and tuple(doc.get("stamp", ())) == data_stamp() and hash_fresh(FILE_STATS_PRICES)
+
+def compute_stats():
+    # คืนค่า (doc, {price_key: จำนวนคัน}) ที่คำนวณใหม่จากไฟล์ .dat
+    doc = {"total": 0, "sold": 0, "count": 0, "min": 0, "max": 0, "sum": "0", "brands": {}}
+    prices = Counter()
+    for cols in iter_column_chunks(fields=SUMMARY_FIELDS):
+        brands = cols["brand"]
+        for brand, n in Counter(brands).items():
+            b = doc["brands"].get(brand)
+            if b is None:
+                doc["brands"][brand] = [n, cols["slot"][brands.index(brand)]]
+            else:
+                b[0] += n
+        prices.update(cols["final_satang"] if "final_satang" in cols else (price_key(p) for p in cols["final_price"] if p))
+        doc["total"] += len(cols["is_sold"])
+        doc["sold"] += cols["is_sold"].count(1)
+    prices.pop(0, None)  # final_price = 0 คือยังไม่ขาย
+    values = [key_price(k) for k in prices]
+    if values:
+        doc["min"], doc["max"] = min(values), max(values)
+    doc["count"] = sum(prices.values())
+    if DATA_VERSION >= 2:
+        doc["sum"] = str(Fraction(sum(k * c for k, c in prices.items()), 100))
+    else:
+        doc["sum"] = str(sum((key_fraction(k) * c for k, c in prices.items()), Fraction(0)))
+    return doc, prices
+
+def build_stats():
+    doc, prices = compute_stats()
+    hash_build(FILE_STATS_PRICES, prices.items())
+    save_stats(doc)
+    return doc
+
+def stats_add_price(doc, p, n):
+    key = price_key(p)
+    left = (hash_get(FILE_STATS_PRICES, key) or 0) + n
+    hash_set(FILE_STATS_PRICES, key, left)  # เหลือ 0 ก็เก็บ entry ไว้ (นับเป็น 0 คัน)
+    doc["count"] += n
+    doc["sum"] = str(Fraction(doc["sum"]) + n * key_fraction(key))
+    if n > 0:
+        doc["min"] = min(doc["min"], p) if doc["count"] > 1 else p
+        doc["max"] = max(doc["max"], p) if doc["count"] > 1 else p
+    elif not left and p in (doc["min"], doc["max"]):
+        values = [key_price(k) for k, c in hash_items(FILE_STATS_PRICES) if c > 0]
+        doc["min"], doc["max"] = (min(values), max(values)) if values else (0, 0)
+
+def stats_apply(slot, old, new):
+    doc = load_stats()
+    for car, n in ((old, -1), (new, 1)):
+        if car is None:
+            continue
+        doc["total"] += n
+        if car.status == "Yes":
+            doc["sold"] += n
+        if car.final_price:
+            stats_add_price(doc, car.final_price, n)
+    if old is None or new is None:
+        car, n = (old, -1) if new is None else (new, 1)
+        b = doc["brands"].get(car.brand)
+        if n > 0:
+            doc["brands"][car.brand] = [b[0] + 1, min(b[1], slot)] if b else [1, slot]
+        elif b[0] == 1:
+            del doc["brands"][car.brand]
+        else:
+            b[0] -= 1
+            if b[1] == slot:
+                # คันที่ลบเป็นคันแรกของยี่ห้อนี้ → หาคันถัดไปจาก Filter Index
+                b[1] = filter_slots("brand", [car.brand])[0]
+    hash_stamp(FILE_STATS_PRICES)
+    save_stats(doc)
+
+SIDECARS.append((stats_fresh, stats_apply, None))
+
+def stats_summary(doc):
+    # แปลงเป็นรูปแบบเดียวกับ summarize() เพื่อส่งให้ format_summary()
+    brands = sorted(doc["brands"].items(), key=lambda kv: kv[1][1])
+    return {
+        "total": doc["total"],
+        "sold": doc["sold"],
+        "count": doc["count"],
+        "sum": float(Fraction(doc["sum"])),
+        "min": doc["min"],
+        "max": doc["max"],
+        "brands": {brand: count for brand, (count, _) in brands}
+    }
+
+def summary_stats():
+    # summary ของรถทั้งหมดจาก cars_stats.json (build ใหม่ถ้าค้าง)
+    with locked(shared=True):
+        ensure_fresh(stats_fresh, build_stats)
+        return stats_summary(load_stats())
+
+def verify_stats():
+    # คำนวณใหม่จากไฟล์ .dat แล้วเทียบกับ cars_stats.json; ถ้าไม่ตรงเขียนทับด้วยค่าที่คำนวณใหม่
+    with locked():
+        stored = load_stats()
+        doc, prices = compute_stats()
+        if stored is None or not os.path.exists(FILE_STATS_PRICES):
+            print("Summary stats missing.")
+        else:
+            stored.pop("stamp", None)
+            stored_prices = {k: c for k, c in hash_items(FILE_STATS_PRICES) if c > 0}
+            if stored == doc and stored_prices == prices:
+                print("Summary stats OK.")
+                return True
+            for key in doc:
+                if stored.get(key) != doc[key]:
+                    print(f"Mismatch: {key}")
+            if stored_prices != prices:
+                print("Mismatch: prices")
+        hash_build(FILE_STATS_PRICES, prices.items())
+        save_stats(doc)
+        print("Summary stats rebuilt from data files.")
+        return False
+
+# ================= Sales Rollups =================
+# cars_sales.json เก็บยอดขายรายวัน/รายเดือนไว้ล่วงหน้า → รายงานตามช่วงเวลาไม่ต้อง scan ไฟล์ .dat
+#    days   : {"2026-10-18": [จำนวนคัน, ยอดขาย, กำไร]}
+#    months : {"2026-10": [จำนวนคัน, ยอดขาย, กำไร]}
+# ยอดขาย = final_price, กำไร = profit ของ Car (final_price - buy_price) เก็บเป็นสตางค์ → บวก/ลบทีละคันได้ตรงเป๊ะ
+# นับเฉพาะรถที่ขายแล้วและรู้วันขาย (sold_on มีตั้งแต่ format v3 → ไฟล์ v1/v2 ได้ rollup ว่าง, ใช้ python main.py migrate 3)
+# Add/Update/mark_sold_batch/Delete ปรับทีละคันผ่าน sidecar เหมือน Summary Stats (stamp อยู่ในไฟล์ json เดียวกัน)
+FILE_SALES = "cars_sales.json"
+TREND_MONTHS = 12
+
+def load_sales():
+    try:
+        with open(FILE_SALES, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_sales(doc):
+    doc["stamp"] = list(data_stamp())
+    tmp = FILE_SALES + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    os.replace(tmp, FILE_SALES)
+
+def sales_fresh():
+    doc = load_sales()
+    return doc is not None and tuple(doc.get("stamp", ())) == data_stamp()
+
+def add_sale(doc, day, revenue, profit, n=1):
+    # บวก (n = 1) หรือลบ (n = -1) รถ 1 คันเข้า rollup ของวันและเดือนนั้น (แถวที่เหลือ 0 คันถูกลบทิ้ง)
+    for table, key in (("days", day), ("months", day[:7])):
+        row = doc[table].setdefault(key, [0, 0, 0])
+        row[0] += n
+        row[1] += n * revenue
+        row[2] += n * profit
+        if row[0] == 0:
+            del doc[table][key]
+
+def sale_entry(car):
+    # (วันขาย, ยอดขาย, กำไร) หน่วยสตางค์ หรือ None ถ้าไม่นับ (ยังไม่ขาย/ไม่รู้วันขาย)
+    if car is None or car.status != "Yes" or not car.sold_on:
+        return None
+    revenue = to_satang(car.final_price)
+    return car.sold_on, revenue, revenue - to_satang(car.buy_price) if revenue > 0 else 0
+
+def build_sales():
+    doc = {"days": {}, "months": {}}
+    if DATA_VERSION >= 3:
+        for cols in iter_column_chunks(fields=("is_sold", "buy_price", "final_price", "sold_on")):
+            for is_sold, buy, revenue, day in zip(cols["is_sold"], cols["buy_price"], cols["final_satang"], cols["sold_on"]):
+                if is_sold == 1 and day:
+                    add_sale(doc, day, revenue, revenue - to_satang(buy) if revenue > 0 else 0)
+    save_sales(doc)
+
+def sales_apply(slot, old, new):
+    doc = load_sales()
+    for car, n in ((old, -1), (new, 1)):
+        entry = sale_entry(car)
+        if entry is not None:
+            add_sale(doc, *entry, n)
+    save_sales(doc)
+
+SIDECARS.append((sales_fresh, sales_apply, None))
+
+def sales_rollup():
+    # cars_sales.json ที่สดแล้ว (build ใหม่ถ้าค้าง)
+    with locked(shared=True):
+        ensure_fresh(sales_fresh, build_sales)
+        return load_sales()
+
+def period_sales(doc, key):
+    # (จำนวนคัน, ยอดขาย, กำไร) เป็นบาทของวัน "YYYY-MM-DD" หรือเดือน "YYYY-MM"
+    units, revenue, profit = doc["months" if len(key) == 7 else "days"].get(key, (0, 0, 0))
+    return units, revenue / 100, profit / 100
+
+def last_months(day, n=TREND_MONTHS):
+    # ["YYYY-MM", ...] ของ n เดือนล่าสุดจนถึงเดือนของ day (เก่าไปใหม่)
+    y, m = day.year, day.month
+    months = []
+    for _ in range(n):
+        months.append(f"{y:04d}-{m:02d}")
+        y, m = (y, m - 1) if m > 1 else (y - 1, 12)
+    return months[::-1]
+
+def view_sales():
+    # View(8) / python main.py sales: ยอดวันนี้, เดือนนี้ และแนวโน้มกำไร 12 เดือน จาก Sales Rollups อย่างเดียว
+    doc = storage().sales_rollup()
+    if doc is None:
+        print("Sale dates are not stored in this data format. Run: python main.py migrate 3")
+        return
+    now = date.today()
+    print(f"========= Sales Report ({now.isoformat()}) =========")
+    for label, key in (("Today", now.isoformat()), ("This month", now.isoformat()[:7])):
+        units, revenue, profit = period_sales(doc, key)
+        print(f"{label:<10} : {units:,} cars | Revenue {revenue:,.2f} | Profit {profit:,.2f}")
+    rows = [(month, *period_sales(doc, month)) for month in last_months(now)]
+    top = max(abs(row[3]) for row in rows)
+    print(f"\n--- Profit Trend (last {TREND_MONTHS} months) ---")
+    print(f"{'Month':<8} | {'Units':>6} | {'Revenue':>15} | {'Profit':>15} |")
+    print("-"*56)
+    for month, units, revenue, profit in rows:
+        bar = ("-" if profit < 0 else "#") * round(20 * abs(profit) / top) if top else ""
+        print(f"{month:<8} | {units:>6,} | {revenue:>15,.2f} | {profit:>15,.2f} | {bar}")
+    print("="*56)
+
+# ================= Validation =================
+# กฎตรวจข้อมูลรถที่ Add()/Update() และ import_cars()/mark_sold_batch() ใช้ร่วมกัน
+# แต่ละตัวรับ string → คืนค่าที่แปลงแล้ว หรือ raise ValueError พร้อมข้อความ error
+# ตัวเลขต้องเก็บลง struct ของ format ที่ใช้อยู่ได้: odometer เป็น int32 ทุก format,
+# ราคา v1 เป็น int32/float32 (จำกัดที่ int32 เท่ากันหมด) และ v2 ขึ้นไปเป็น int64 หน่วยสตางค์
+ODOMETER_MAX = 2 ** 31 - 1
+
+def price_max():
+    return 2 ** 31 - 1 if storage_format() < 2 else (2 ** 63 - 1) // 100
+
+def parse_car_id(text):
+    # v1 เก็บ car_id เป็น int32 → Cxxx เท่านั้น; v2 เป็น int64 → C ตามด้วยตัวเลข 3-18 หลัก
+    car_id = text.strip().upper()
+    if storage_format() >= 2:
+        if not re.fullmatch(r"C\d{3,18}", car_id):
+            raise ValueError("Format must be C followed by 3-18 digits (e.g., C001)!")
+        return f"C{int(car_id[1:]):03d}"
+    if not re.fullmatch(r"C\d{3}", car_id):
+        raise ValueError("Format must be Cxxx (e.g., C001)!")
+    return car_id
+
+def parse_text(text, label):
+    text = text.strip()
+    if text == "":
+        raise ValueError(f"{label} cannot be empty!")
+    return text
+
+def parse_year(text):
+    text = text.strip()
+    if not text.isdigit():
+        raise ValueError("Year must be numbers only!")
+    year = int(text)
+    if year < 1900 or year > 2100:
+        raise ValueError("Year out of range!")
+    return year
+
+def parse_odometer(text):
+    text = text.strip()
+    if not text.isdigit():
+        raise ValueError("Odometer must be numbers only!")
+    if int(text) > ODOMETER_MAX:
+        raise ValueError("Odometer out of range!")
+    return int(text)
+
+def parse_price(text, label):
+    try:
+        price = float(text)
+    except ValueError:
+        raise ValueError(f"{label} must be a number!") from None
+    if price != price or price in (float("inf"), float("-inf")):
+        raise ValueError(f"{label} must be a number!")
+    if price < 0:
+        raise ValueError(f"{label} cannot be negative!")
+    if price > price_max():
+        raise ValueError(f"{label} out of range!")
+    return price
+
+def parse_bound(text, label):
+    # ขอบของช่วงใน Range Filter: ว่าง = ไม่จำกัด, ใส่ comma คั่นหลักพันได้ (เช่น 80,000)
+    text = text.strip().replace(",", "")
+    if text == "":
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"{label} must be a number!") from None
+
+def parse_phone(text):
+    phone = text.strip()
+    if not phone.isdigit():
+        raise ValueError("Phone must contain digits only!")
+    if len(phone) < 8 or len(phone) > 15:
+        raise ValueError("Phone length must be 8–15 digits!")
+    return phone
+
+def parse_date(text, label):
+    # "YYYY-MM-DD" (ว่าง = ไม่รู้วัน)
+    text = text.strip()
+    if text == "":
+        return ""
+    try:
+        return date.fromisoformat(text).isoformat()
+    except ValueError:
+        raise ValueError(f"{label} must be YYYY-MM-DD!") from None
+
+def parse_status(text):
+    status = text.strip().lower()
+    if status not in ["yes", "no"]:
+        raise ValueError("Please enter Yes or No!")
+    return status.capitalize()
+
+def ask(prompt, parse, *args):
+    # ถามซ้ำจนกว่าค่าจะผ่าน parse
+    while True:
+        try:
+            return parse(timed_input(prompt), *args)
+        except ValueError as e:
+            print(f"Error: {e}")
+
+# ================= Add =================
+@instrumented
+def Add():
+    try:
+        # --- Car ID ---
         while True:
-            status_inp = input("Sold? (Yes/No): ").strip().lower()
-            if status_inp not in ["yes", "no"]:
-                print("Error: Please enter Yes or No!")
+            car_id = ask("Enter CarID (C001): ", parse_car_id)
+            if storage().get_car(car_id) is not None:
+                print("Error: CarID already exists!")
                 continue
             break
+        brand = ask("Brand: ", parse_text, "Brand")
+        model = ask("Model: ", parse_text, "Model")
+        year = ask("Year (YYYY): ", parse_year)
+        odometer = ask("Odometer (km): ", parse_odometer)
+        buy_price = ask("Buy Price: ", parse_price, "Buy Price")
+        sell_price = ask("Sell Price: ", parse_price, "Sell Price")
+        status = ask("Sold? (Yes/No): ", parse_status)
         # --- Final Price & Customer Info ---
-        if status_inp == "yes":
-            while True:
-                try:
-                    final_price = float(input("Final Price: "))
-                    if final_price < 0:
-                        print("Error: Final Price cannot be negative!")
-                        continue
-                    break
-                except ValueError:
-                    print("Error: Final Price must be a number!")
-            cname = input("Customer Name: ").strip()
-            cphone = input("Customer Phone: ").strip()
+        if status == "Yes":
+            final_price = ask("Final Price: ", parse_price, "Final Price")
+            cname = timed_input("Customer Name: ").strip()
+            cphone = timed_input("Customer Phone: ").strip()
         else:
             final_price = 0.0
             cname, cphone = "", ""
-        # --- Create Car Dict ---
-        car = {
-            "car_id": car_id,
-            "brand": brand,
-            "model": model,
-            "year": year,
-            "odometer": odometer,
-            "buy_price": buy_price,
-            "sell_price": sell_price,
-            "status": status_inp.capitalize(),
-            "final_price": final_price,
-            "profit": final_price - buy_price if final_price > 0 else 0,
-            "customer_name": cname,
-            "customer_phone": cphone
-        }
-        cars.append(car)
-        save_all(cars)
+        # --- Create Car --- (รับรถเข้าวันนี้ และถ้าขายแล้วก็ขายวันนี้)
+        car = Car(car_id, year, brand, model, odometer, buy_price,
+                  status, sell_price, final_price, cname, cphone, today(), today() if status == "Yes" else "")
+        if not storage().add_car(car):
+            print("Error: CarID already exists!")
+            return
         print("Car added successfully!")
     except Exception as e:
         print(f"Unexpected error: {e}")
 
+# ================= Import =================
+# นำเข้ารถทีละมากๆ จากไฟล์ CSV (แถวแรกเป็น header) หรือ JSONL (1 object ต่อบรรทัด)
+# → python main.py import cars.csv
+# ตรวจด้วยกฎเดียวกับ Add() (รวม CarID ซ้ำกับในระบบและซ้ำกันเองในไฟล์)
+# แถวที่ผ่านจะถูก pack แล้วเขียนต่อท้ายทั้ง 3 ไฟล์ในครั้งเดียว ไม่ต้อง save_all()
+# แถวที่ไม่ผ่านเขียนลง <ชื่อไฟล์>_errors.<นามสกุลเดิม> พร้อมเลขบรรทัดและสาเหตุ
+# sidecar ไม่ได้อัปเดตทีละคัน → stamp ไม่ตรงแล้วจะ build ใหม่เองตอนใช้งานครั้งถัดไป
+# acquired_on / sold_on (YYYY-MM-DD) ไม่บังคับ → ว่าง = ไม่รู้วัน (ข้อมูลย้อนหลังจะไม่ถูกนับเป็นยอดขายของวันที่ import)
+IMPORT_FIELDS = ("car_id", "year", "brand", "model", "odometer", "buy_price",
+                 "sell_price", "status", "final_price", "customer_name", "customer_phone", "acquired_on", "sold_on")
+
+def active_car_ids():
+    n = count_records()
+    if n == 0:
+        return set()
+    ids = unpack_file(FILE_BASIC, struct_basic, (0,), 0, n)[0]
+    active = unpack_file(FILE_STATUS, struct_status, (1,), 0, n)[0]
+    return set(compress(ids, active))
+
+def open_rows(f, jsonl, fieldnames):
+    # คืนค่า (fieldnames, แถวแบบ (เลขบรรทัด, row)) ของไฟล์ CSV/JSONL ที่เปิดอยู่
+    # แถวของ JSONL ยังเป็น string อยู่ → แปลงด้วย row_dict() ตอนตรวจ
+    if jsonl:
+        return fieldnames, ((line, text.strip()) for line, text in enumerate(f, 1) if text.strip())
+    reader = csv.DictReader(f)
+    return reader.fieldnames or fieldnames, ((reader.line_num, row) for row in reader)
+
+def row_dict(row):
+    if isinstance(row, dict):
+        return row
+    try:
+        row = json.loads(row)
+    except ValueError:
+        raise ValueError("Invalid JSON!") from None
+    if not isinstance(row, dict):
+        raise ValueError("Row must be a JSON object!")
+    return row
+
+def row_text(row, key):
+    value = row.get(key)
+    return "" if value is None else str(value)
+
+def errors_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}_errors{ext}"
+
+def write_rejected(path, jsonl, fieldnames, rejected):
+    # rejected = [(เลขบรรทัด, แถวเดิม, สาเหตุ), ...] → เขียนรูปแบบเดียวกับไฟล์ต้นทาง
+    err_path = errors_path(path)
+    if not rejected:
+        if os.path.exists(err_path):
+            os.remove(err_path)  # error file ของรอบก่อน
+        return
+    with open(err_path, "w", encoding="utf-8", newline="") as f:
+        if jsonl:
+            for line, row, reason in rejected:
+                f.write(json.dumps({"line": line, "error": reason, "row": row}, ensure_ascii=False) + "\n")
+        else:
+            writer = csv.DictWriter(f, ["line", "error"] + list(fieldnames), extrasaction="ignore")
+            writer.writeheader()
+            for line, row, reason in rejected:
+                writer.writerow({**row, "line": line, "error": reason})
+    print(f"Rejected rows written to {err_path}")
+
+def parse_import_row(row):
+    car_id = parse_car_id(row_text(row, "car_id"))
+    brand = parse_text(row_text(row, "brand"), "Brand")
+    model = parse_text(row_text(row, "model"), "Model")
+    year = parse_year(row_text(row, "year"))
+    odometer = parse_odometer(row_text(row, "odometer"))
+    buy_price = parse_price(row_text(row, "buy_price"), "Buy Price")
+    sell_price = parse_price(row_text(row, "sell_price"), "Sell Price")
+    status = parse_status(row_text(row, "status"))
+    acquired_on = parse_date(row_text(row, "acquired_on"), "Acquired Date")
+    if status == "Yes":
+        final_price = parse_price(row_text(row, "final_price"), "Final Price")
+        cname = row_text(row, "customer_name").strip()
+        cphone = row_text(row, "customer_phone").strip()
+        sold_on = parse_date(row_text(row, "sold_on"), "Sold Date")
+    else:
+        final_price = 0.0
+        cname, cphone, sold_on = "", "", ""
+    return Car(car_id, year, brand, model, odometer, buy_price,
+               status, sell_price, final_price, cname, cphone, acquired_on, sold_on)
+
+@instrumented
+def import_cars(path):
+    jsonl = path.lower().endswith((".jsonl", ".json"))
+    with locked():
+        init_data_files()
+        seen = active_car_ids()
+        basic, status, sale = [], [], []
+        rejected = []  # (เลขบรรทัด, แถวเดิม, สาเหตุ)
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            fieldnames, rows = open_rows(f, jsonl, IMPORT_FIELDS)
+            for line, row in rows:
+                try:
+                    row = row_dict(row)
+                    car = parse_import_row(row)
+                    car_id_int = int(car.car_id[1:])
+                    if car_id_int in seen:
+                        raise ValueError("CarID already exists!")
+                    rb, rs, rl = pack_car(car)
+                except ValueError as e:
+                    rejected.append((line, row, str(e)))
+                    continue
+                except struct.error:
+                    rejected.append((line, row, "Number out of range!"))
+                    continue
+                seen.add(car_id_int)
+                basic.append(rb)
+                status.append(rs)
+                sale.append(rl)
+        if basic:
+            slot = count_records()
+            write_records([
+                (FILE_BASIC, slot_offset(struct_basic, slot), b"".join(basic)),
+                (FILE_STATUS, slot_offset(struct_status, slot), b"".join(status)),
+                (FILE_SALE, slot_offset(struct_sale, slot), b"".join(sale)),
+            ] + header_writes(slot + len(basic)))
+            count_io(records=len(basic))
+        print(f"Imported {len(basic)} cars, rejected {len(rejected)} rows.")
+        write_rejected(path, jsonl, fieldnames, rejected)
+        return len(basic), len(rejected)
+
 # ================= Update =================
+@instrumented
 def Update():
     try:
-        cars = load_all()
-        car_id = input("Enter CarID to update: ").strip().upper()
-        found = False
-        for car in cars:
-            if car["car_id"] == car_id:
-                found = True
-                print(f"Updating {car_id}...")
-                if car["status"].lower() == "no":
-                    print("Currently not sold → mark SOLD")
-                    car["status"] = "Yes"
-                    while True:
-                        try:
-                            final_price = float(input("Final Price: "))
-                            if final_price < 0:
-                                print("Error: Final Price cannot be negative!")
-                                continue
-                            car["final_price"] = final_price
-                            break
-                        except ValueError:
-                            print("Error: Final Price must be a number!")
-                    while True:
-                        cname = input("Customer Name: ").strip()
-                        if cname == "":
-                            print("Error: Customer Name cannot be empty!")
-                            continue
-                        car["customer_name"] = cname
-                        break
-                    while True:
-                        cphone = input("Customer Phone: ").strip()
-                        if not cphone.isdigit():
-                            print("Error: Phone must contain digits only!")
-                            continue
-                        if len(cphone) < 8 or len(cphone) > 15:
-                            print("Error: Phone length must be 8–15 digits!")
-                            continue
-                        car["customer_phone"] = cphone
-                        break
+        car_id = timed_input("Enter CarID to update: ").strip().upper()
+        car = storage().get_car(car_id) if re.fullmatch(r"C\d+", car_id) else None
+        if car is None:
+            print("CarID not found!")
+            return
+        print(f"Updating {car_id}...")
+        if car.status.lower() == "no":
+            print("Currently not sold → mark SOLD")
+            car.status = "Yes"
+            car.sold_on = today()
+            car.final_price = ask("Final Price: ", parse_price, "Final Price")
+            car.customer_name = ask("Customer Name: ", parse_text, "Customer Name")
+            car.customer_phone = ask("Customer Phone: ", parse_phone)
+        else:
+            print("Already sold → update details")
+            new_price = timed_input("New Final Price (blank=keep): ").strip()
+            if new_price:
+                try:
+                    car.final_price = parse_price(new_price, "Final Price")
+                except ValueError as e:
+                    print(f"Error: {e}")
+            new_name = timed_input("New Customer Name (blank=keep): ").strip()
+            if new_name:
+                car.customer_name = new_name
+            new_phone = timed_input("New Customer Phone (blank=keep): ").strip()
+            if new_phone:
+                if new_phone.isdigit() and 8 <= len(new_phone) <= 15:
+                    car.customer_phone = new_phone
                 else:
-                    print("Already sold → update details")
-                    new_price = input("New Final Price (blank=keep): ").strip()
-                    if new_price:
-                        try:
-                            final_price = float(new_price)
-                            if final_price < 0:
-                                print("Error: Final Price cannot be negative!.")
-                            else:
-                                car["final_price"] = final_price
-                        except ValueError:
-                            print("Error: Invalid number!.")
-                    new_name = input("New Customer Name (blank=keep): ").strip()
-                    if new_name:
-                        car["customer_name"] = new_name
-                    new_phone = input("New Customer Phone (blank=keep): ").strip()
-                    if new_phone:
-                        if new_phone.isdigit() and 8 <= len(new_phone) <= 15:
-                            car["customer_phone"] = new_phone
-                        else:
-                            print("Error: Invalid phone number!.")
-                car["profit"] = car["final_price"] - car["buy_price"]
-                break
-        if not found:
+                    print("Error: Invalid phone number!.")
+        if not storage().update_car(car):
             print("CarID not found!")
             return
-        save_all(cars)
         print("Car updated successfully!")
     except Exception as e:
         print(f"Unexpected error: {e}")
 
+# ================= Batch Sold =================
+# ปิดการขายทีละมากๆ จากไฟล์ CSV/JSONL ที่มี car_id, final_price, customer_name, customer_phone
+# → python main.py sold sales.csv
+# ตรวจด้วยกฎเดียวกับ Update(): รถที่ยังไม่ขายต้องมีครบทุกช่อง, รถที่ขายแล้วช่องว่าง = คงค่าเดิม
+# sold_on (YYYY-MM-DD) ไม่บังคับ: รถที่เพิ่งปิดการขายได้วันนี้ถ้าไม่ระบุ, รถที่ขายแล้วใส่มาเพื่อแก้วันขาย
+# (car_id ซ้ำในไฟล์ → แถวหลังแก้ต่อจากแถวก่อน) ตรวจครบทุกแถวก่อนแล้วค่อยเขียน status/sale รวดเดียวเรียงตาม slot
+# แถวที่ไม่ผ่านเขียนลง error file แบบเดียวกับ import_cars()
+SALE_FIELDS = ("car_id", "final_price", "customer_name", "customer_phone")
+
+def apply_sale_row(car, row):
+    # คืนค่า Car ใหม่ที่ปิดการขายตาม row (car เดิมไม่ถูกแก้) ไม่ผ่านจะ raise ValueError
+    price, name, phone = (row_text(row, key).strip() for key in SALE_FIELDS[1:])
+    required = car.status == "No"
+    new = Car(*(getattr(car, field) for field in Car.__slots__))
+    new.status = "Yes"
+    if required or price:
+        new.final_price = parse_price(price, "Final Price")
+    if required or name:
+        new.customer_name = parse_text(name, "Customer Name")
+    if required or phone:
+        new.customer_phone = parse_phone(phone)
+    sold_on = parse_date(row_text(row, "sold_on"), "Sold Date")
+    if sold_on or required:
+        new.sold_on = sold_on or today()
+    return new
+
+@instrumented
+def mark_sold_batch(path):
+    jsonl = path.lower().endswith((".jsonl", ".json"))
+    changes = {}   # slot → (รถก่อนแก้, รถหลังแก้)
+    applied = 0
+    rejected = []  # (เลขบรรทัด, แถวเดิม, สาเหตุ)
+    with locked():
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            fieldnames, rows = open_rows(f, jsonl, SALE_FIELDS)
+            for line, row in rows:
+                try:
+                    row = row_dict(row)
+                    car_id = row_text(row, "car_id").strip().upper()
+                    slot = find_slot(car_id) if re.fullmatch(r"C\d+", car_id) else None
+                    if slot is None:
+                        raise ValueError("CarID not found!")
+                    old, car = changes.get(slot) or (read_car(slot),) * 2
+                    changes[slot] = (old, apply_sale_row(car, row))
+                    applied += 1
+                except ValueError as e:
+                    rejected.append((line, row, str(e)))
+        if changes:
+            fresh = fresh_sidecars()
+            writes, synced = [], []
+            for slot in sorted(changes):
+                old, car = changes[slot]
+                rb, rs, rl = pack_car(car)
+                writes.append((FILE_STATUS, slot_offset(struct_status, slot), rs))
+                writes.append((FILE_SALE, slot_offset(struct_sale, slot), rl))
+                synced.append((slot, old, unpack_car(rb, rs, rl)))
+            write_records(writes)
+            count_io(records=len(synced))
+            for slot, old, new in synced:
+                sync_sidecars(fresh, slot, old, new)
+        print(f"Applied {applied} rows ({len(changes)} cars), rejected {len(rejected)} rows.")
+        write_rejected(path, jsonl, fieldnames, rejected)
+        return applied, len(rejected)
+
 # ================= Delete =================
+@instrumented
 def Delete():
-    cars = load_all()
-    car_id = input("Enter CarID to delete: ").strip().upper()
-    new_cars = [c for c in cars if c["car_id"] != car_id]
-    if len(new_cars) < len(cars):
-        save_all(new_cars)
+    car_id = timed_input("Enter CarID to delete: ").strip().upper()
+    if re.fullmatch(r"C\d+", car_id) and storage().delete_car(car_id):
         print("Deleted successfully.")
     else:
         print("Car not found.")
 
+# ================= Compact =================
+# Delete() แค่ตั้ง active = 0 → record ที่ตายแล้วยังกินที่ในไฟล์
+# compact() เขียน 3 ไฟล์ใหม่โดยเก็บแค่ record ที่ active เมื่อสัดส่วน record ที่ตาย >= min_dead_ratio
+# (สั่งผ่าน `python main.py compact` ได้ เช่นตั้งเวลาให้รันนอกเวลาทำการ)
+COMPACT_DEAD_RATIO = 0.2
+
+@instrumented
+def compact(min_dead_ratio=COMPACT_DEAD_RATIO):
+    with replacing(), locked():
+        n = count_records()
+        active = unpack_file(FILE_STATUS, struct_status, (1,), 0, n)[0]
+        dead = n - active.count(1)
+        if dead == 0 or dead / n < min_dead_ratio:
+            print(f"Nothing to compact ({dead}/{n} dead records, threshold {min_dead_ratio:.0%}).")
+            return 0
+        keep = [slot for slot, a in enumerate(active) if a == 1]
+        for path, st in ((FILE_BASIC, struct_basic), (FILE_STATUS, struct_status), (FILE_SALE, struct_sale)):
+            # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อย replace ทั้ง 3 ไฟล์ → ถ้าล้มกลางทางไฟล์เดิมยังอยู่ครบ
+            with open(path, "rb") as src, mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm, open(path + ".tmp", "wb") as dst:
+                size = st.size
+                dst.write(file_header(st, len(keep)))
+                for start in range(0, len(keep), UNPACK_CHUNK):
+                    dst.write(b"".join(mm[slot_offset(st, i):slot_offset(st, i) + size] for i in keep[start:start + UNPACK_CHUNK]))
+        replace_data_files()
+        build_index()
+        print(f"Compacted: removed {dead} dead records, {len(keep)} cars kept.")
+        return dead
+
+# ================= Migrate =================
+# แปลงไฟล์ข้อมูลทั้ง 3 ไฟล์เป็น version ที่ระบุ (python main.py migrate [1|2|3]) ทีละก้อน ไม่ต้องโหลดทั้งหมด
+# slot เดิมคงอยู่ (รวม record ที่ถูกลบ) → เขียนลง .tmp แล้ว replace ทั้งชุด; sidecar จะ build ใหม่เองเพราะ stamp เปลี่ยน
+def convert_record(current, version, b, s, l):
+    # แปลง tuple ของ record 1 ชุด (basic, status, sale) จาก version current ไปเป็นของ version ที่ระบุ
+    days = (b[6], l[6]) if current >= 3 else (0, 0)
+    if current < 2 <= version:
+        b, s, l = ((b[0], b[1], b[2], b[3], b[4], b[5] * 100),
+                   (s[0], s[1], s[2], to_satang(s[3])),
+                   (l[0], to_satang(l[1]), to_satang(l[2]), to_satang(l[3]), l[4], l[5]))
+    elif version < 2 <= current:
+        b, s, l = ((b[0], b[1], b[2], b[3], b[4], b[5] // 100),
+                   (s[0], s[1], s[2], s[3] / 100),
+                   (l[0], l[1] / 100, l[2] / 100, l[3] / 100, l[4], l[5]))
+    # วันที่ (มีตั้งแต่ v3): v1/v2 → v3 ได้ 0 (ไม่รู้วัน), v3 → v1/v2 ตัดทิ้ง
+    if version >= 3:
+        return b[:6] + (days[0],), s, l[:6] + (days[1],)
+    return b[:6], s, l[:6]
+
+@instrumented
+def migrate(version=DEFAULT_FORMAT):
+    with replacing(), locked():
+        current = data_format()
+        if current == version:
+            print(f"Data files are already v{version}.")
+            return False
+        n = count_records()
+        old = list(zip((FILE_BASIC, FILE_STATUS, FILE_SALE), STRUCTS[current]))
+        old_header = HEADER_SIZE
+        new = STRUCTS[version]
+        use_format(version)
+        try:
+            with open(FILE_BASIC, "rb") as fb, open(FILE_STATUS, "rb") as fs, open(FILE_SALE, "rb") as fsl:
+                srcs = (fb, fs, fsl)
+                dsts = [open(path + ".tmp", "wb") for path, _ in old]
+                try:
+                    for dst, st in zip(dsts, new):
+                        dst.write(file_header(st, n))
+                    for start in range(0, n, UNPACK_CHUNK):
+                        k = min(UNPACK_CHUNK, n - start)
+                        rows = []
+                        for src, (_, st) in zip(srcs, old):
+                            src.seek(old_header + start * st.size)
+                            rows.append(st.iter_unpack(src.read(k * st.size)))
+                        out = ([], [], [])
+                        for b, s_, l in zip(*rows):
+                            for buf, st, rec in zip(out, new, convert_record(current, version, b, s_, l)):
+                                buf.append(st.pack(*rec))
+                        for dst, buf in zip(dsts, out):
+                            dst.write(b"".join(buf))
+                finally:
+                    for dst in dsts:
+                        dst.close()
+            replace_data_files()
+        except Exception:
+            use_format(current)
+            raise
+        format_state["key"] = ()
+        data_format()
+        print(f"Migrated {n} records from v{current} to v{version}.")
+        return True
+
 # ================= View =================
-def View(n:int):
-    cars = load_all()
-    if not cars:
+def view_single():
+    # View(1): อ่านรถคันเดียวด้วย get_car (engine dat ใช้ index หา slot) ไม่ต้อง load_all()
+    if not storage().has_cars():
         print("No cars data.")
         return
-    if n == 1:
-        cid = input("Enter CarID: ").strip().upper()
-        for c in cars:
-            if c["car_id"] == cid:
-                print("="*80)
-                print(f"CarID : {c['car_id']}")
-                print(f"Brand : {c['brand']}")
-                print(f"Model : {c['model']}")
-                print(f"Year  : {c['year']}")
-                print(f"Odometer : {c['odometer']:,} km")
-                print(f"Buy Price : {c['buy_price']:,}")
-                print(f"Sell Price: {c['sell_price']:,}")
-                print(f"Status    : {c['status']}")
-                print(f"Final Price: {c['final_price']:,}")
-                print(f"Profit     : {c['profit']:,}")
-                print(f"Customer   : {c['customer_name']} ({c['customer_phone']})")
-                print("="*80)
-                return
+    cid = timed_input("Enter CarID: ").strip().upper()
+    c = storage().get_car(cid) if re.fullmatch(r"C\d+", cid) else None
+    if c is None:
         print("Not found")
-    elif n == 2:
-        print("="*20, "All Cars", "="*20)
+        return
+    print("="*80)
+    print(f"CarID : {c.car_id}")
+    print(f"Brand : {c.brand}")
+    print(f"Model : {c.model}")
+    print(f"Year  : {c.year}")
+    print(f"Odometer : {c.odometer:,} km")
+    print(f"Buy Price : {c.buy_price:,}")
+    print(f"Sell Price: {c.sell_price:,}")
+    print(f"Status    : {c.status}")
+    print(f"Final Price: {c.final_price:,}")
+    print(f"Profit     : {c.profit:,}")
+    print(f"Customer   : {c.customer_name} ({c.customer_phone})")
+    if storage_format() >= 3:
+        print(f"Acquired   : {c.acquired_on or '-'}")
+        print(f"Sold On    : {c.sold_on or '-'}")
+    print("="*80)
+
+def view_filter():
+    # View(3): ตัวเลือกและผลลัพธ์มาจาก Filter Index → อ่านเฉพาะรถที่ตรงเงื่อนไข
+    print("===================================")
+    print("Filter Options:")
+    print("  1. Brand")
+    print("  2. Model")
+    print("  3. Year")
+    print("  4. Status (Yes/No)")
+    print("  5. Range (Price / Odometer / Year / Profit)")
+    choice = timed_input("Enter choice: ").strip()
+    filtered = []
+    title = ""
+    if choice == "1":
+        brands = storage().filter_values("brand")
+        print("\nAvailable Brand options:", ", ".join(brands))
+        print("-"*50)
+        brand = timed_input("Enter Brand: ").strip().lower()
+        filtered = storage().filter_cars("brand", [b for b in brands if b.lower() == brand])
+        title = f"Cars Filtered by Brand = {brand.capitalize()}"
+    elif choice == "2":
+        models = storage().filter_values("model")
+        print("\nAvailable Model options:", ", ".join(models))
+        print("-"*50)
+        model = timed_input("Enter Model: ").strip().lower()
+        filtered = storage().filter_cars("model", [m for m in models if m.lower() == model])
+        title = f"Cars Filtered by Model = {model.capitalize()}"
+    elif choice == "3":
+        years = storage().filter_values("year")
+        print("\nAvailable Year options:", ", ".join(years))
+        print("-"*50)
+        year = timed_input("Enter Year (YYYY): ").strip()
+        filtered = storage().filter_cars("year", [year])
+        title = f"Cars Filtered by Year = {year}"
+    elif choice == "4":
+        print("\nAvailable Status options: Yes, No")
+        print("-"*50)
+        status = timed_input("Enter Status (Yes/No): ").strip().lower()
+        filtered = storage().filter_cars("status", [s for s in ("Yes", "No") if s.lower() == status])
+        title = f"Cars Filtered by Status = {status.capitalize()}"
+    elif choice == "5":
+        ranges = ask_ranges()
+        if not ranges:
+            print("No range entered.")
+            return
+        filtered = storage().range_cars(ranges)
+        title = "Cars Filtered by " + range_title(ranges)
+    else:
+        print("Invalid option!")
+        return
+    if filtered:
+        print(f"\n========= {title} =========")
         print(f"{'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Year':<6} | {'Status'}")
         print("-"*50)
-        for c in cars:
-            print(f"{c['car_id']:<6} | {c['brand']:<10} | {c['model']:<10} | {c['year']:<6} | {c['status']}")
+        for c in filtered:
+            print(f"{c.car_id:<6} | {c.brand:<10} | {c.model:<10} | {c.year:<6} | {c.status}")
         print("="*50)
-    elif n == 3:
-        print("===================================")
-        print("Filter Options:")
-        print("  1. Brand")
-        print("  2. Model")
-        print("  3. Year")
-        print("  4. Status (Yes/No)")
-        choice = input("Enter choice: ").strip()
-        filtered = []
-        title = ""
-        if choice == "1":
-            brands = sorted(set(c['brand'] for c in cars))
-            print("\nAvailable Brand options:", ", ".join(brands))
-            print("-"*50)
-            brand = input("Enter Brand: ").strip().lower()
-            filtered = [c for c in cars if c['brand'].lower() == brand]
-            title = f"Cars Filtered by Brand = {brand.capitalize()}"
-        elif choice == "2":
-            models = sorted(set(c['model'] for c in cars))
-            print("\nAvailable Model options:", ", ".join(models))
-            print("-"*50)
-            model = input("Enter Model: ").strip().lower()
-            filtered = [c for c in cars if c['model'].lower() == model]
-            title = f"Cars Filtered by Model = {model.capitalize()}"
-        elif choice == "3":
-            years = sorted(set(str(c['year']) for c in cars))
-            print("\nAvailable Year options:", ", ".join(years))
-            print("-"*50)
-            year = input("Enter Year (YYYY): ").strip()
-            filtered = [c for c in cars if str(c['year']) == year]
-            title = f"Cars Filtered by Year = {year}"
-        elif choice == "4":
-            print("\nAvailable Status options: Yes, No")
-            print("-"*50)
-            status = input("Enter Status (Yes/No): ").strip().lower()
-            filtered = [c for c in cars if c['status'].lower() == status]
-            title = f"Cars Filtered by Status = {status.capitalize()}"
-        else:
+    else:
+        print("No cars found with this filter.")
+
+def ask_ranges():
+    # ถามทีละ field จนกด Enter ว่าง → {field: (min, max)} (ทุกช่วงต้องตรงพร้อมกัน)
+    ranges = {}
+    while True:
+        print("\nRange fields:", ", ".join(f"{i}. {f}" for i, f in enumerate(RANGE_FIELDS, 1)))
+        choice = timed_input("Enter field (blank = search): ").strip()
+        if choice == "":
+            return ranges
+        if not (choice.isdigit() and 1 <= int(choice) <= len(RANGE_FIELDS)):
+            print("Invalid option!")
+            continue
+        field = RANGE_FIELDS[int(choice) - 1]
+        lo = ask(f"Min {field} (blank = no limit): ", parse_bound, "Min")
+        hi = ask(f"Max {field} (blank = no limit): ", parse_bound, "Max")
+        if lo is None and hi is None:
+            continue
+        ranges[field] = (lo, hi)
+
+def range_title(ranges):
+    # {"year": (2018, None), "odometer": (None, 80000)} → "year ≥ 2018, odometer ≤ 80,000"
+    def show(field, x):
+        return f"{x:g}" if field == "year" else f"{x:,.2f}".rstrip("0").rstrip(".")
+    parts = []
+    for field, (lo, hi) in ranges.items():
+        bounds = [f"≥ {show(field, lo)}"] if lo is not None else []
+        bounds += [f"≤ {show(field, hi)}"] if hi is not None else []
+        parts.append(f"{field} {' and '.join(bounds)}")
+    return ", ".join(parts)
+
+# รายงานสำเร็จรูปของ View(7): (ชื่อ, field, sold, มากไปน้อย, top n)
+# field เป็นวันที่แต่ข้อมูลยังเป็น format v1/v2 (ไม่มีวันที่) → ใช้ year แทน
+SORT_PRESETS = (
+    ("Top 20 Most Profitable Sales", "profit", True, True, 20),
+    ("Oldest Unsold Stock", "acquired_on", False, False, None),
+    ("Top 20 Highest-Mileage Cars", "odometer", None, True, 20),
+)
+
+def parse_top(text):
+    # จำนวนอันดับของ Top-N: ว่าง = ทุกคัน (เรียงทั้งหมด)
+    text = text.strip()
+    if text == "":
+        return None
+    if not text.isdigit() or int(text) <= 0:
+        raise ValueError("Top N must be a positive number!")
+    return int(text)
+
+def view_sorted():
+    # View(7): รายงานเรียงตาม field / Top-N → ออกจอและไฟล์ report_sorted.txt
+    print("Sorted Report Options:")
+    for i, (name, *_) in enumerate(SORT_PRESETS, 1):
+        print(f"  {i}. {name}")
+    print(f"  {len(SORT_PRESETS) + 1}. Custom")
+    choice = timed_input("Enter choice: ").strip()
+    if choice.isdigit() and 1 <= int(choice) <= len(SORT_PRESETS):
+        name, field, sold, descending, n = SORT_PRESETS[int(choice) - 1]
+        if field in DATE_FIELDS and storage_format() < 3:
+            field = "year"
+        title = f"Report: {name}"
+    elif choice == str(len(SORT_PRESETS) + 1):
+        print("Sort by:", ", ".join(f"{i}. {f}" for i, f in enumerate(SORT_FIELDS, 1)))
+        field = timed_input("Enter field: ").strip()
+        if not (field.isdigit() and 1 <= int(field) <= len(SORT_FIELDS)):
             print("Invalid option!")
             return
-        if filtered:
-            print(f"\n========= {title} =========")
-            print(f"{'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Year':<6} | {'Status'}")
-            print("-"*50)
-            for c in filtered:
-                print(f"{c['car_id']:<6} | {c['brand']:<10} | {c['model']:<10} | {c['year']:<6} | {c['status']}")
-            print("="*50)
-        else:
-            print("No cars found with this filter.")
+        field = SORT_FIELDS[int(field) - 1]
+        descending = timed_input("Order (1 = highest first, 2 = lowest first): ").strip() != "2"
+        sold = {"1": True, "2": False}.get(timed_input("Cars (1 = Sold, 2 = Not sold, 3 = All): ").strip())
+        n = ask("Top N (blank = all): ", parse_top)
+        which = {True: "Sold Cars", False: "Unsold Cars", None: "Cars"}[sold]
+        order = "highest first" if descending else "lowest first"
+        title = f"Report: {'Top ' + str(n) + ' ' if n else ''}{which} by {field} ({order})"
+    else:
+        print("Invalid option!")
+        return
+    if not stream_report(iter_sorted_report(field, sold, title, descending, n), "report_sorted.txt"):
+        print("No cars to report.")
+        return
+    print("report_sorted.txt generated.")
+
+PAGE_SIZE = 20  # จำนวนรถต่อหน้าของ View(2)
+
+def view_all():
+    # View(2): แสดงทีละ PAGE_SIZE คัน แล้วถามก่อนไปหน้าถัดไป (ไม่ถือ lock ระหว่างรอ input)
+    # อ่านล่วงหน้าด้วย page_cars (engine dat = iter_car_slots) เป็นก้อน (เริ่มหนึ่งหน้า แล้วขยายเท่าตัวจนถึง STREAM_CHUNK)
+    # → หน้าแรกออกทันที, เปิดดูจนจบก็ไม่ต้องอ่านไฟล์ทีละหน้า และ memory ไม่เกินหนึ่งก้อน
+    # ข้อมูลถูกแก้ระหว่างรอ (stamp เปลี่ยน) → ทิ้งที่อ่านล่วงหน้าไว้ แล้วอ่านใหม่ตั้งแต่คันถัดไป
+    print("="*20, "All Cars", "="*20)
+    print(f"{'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Year':<6} | {'Status'}")
+    print("-"*50)
+    ahead, stamp, start, size, done, shown = deque(), None, 0, PAGE_SIZE + 1, False, 0
+    while True:
+        if ahead and storage().stamp() != stamp:
+            start, done = ahead[0][0], False
+            ahead.clear()
+        while len(ahead) <= PAGE_SIZE and not done:
+            stamp, more = storage().page_cars(start, size)
+            ahead.extend(more)
+            done = len(more) < size
+            if more:
+                start = more[-1][0] + 1
+            size = min(size * 2, STREAM_CHUNK)
+        for _ in range(min(PAGE_SIZE, len(ahead))):
+            c = ahead.popleft()[1]
+            print(f"{c.car_id:<6} | {c.brand:<10} | {c.model:<10} | {c.year:<6} | {c.status}")
+            shown += 1
+        if not ahead:
+            break
+        if timed_input(f"-- {shown} cars shown (Enter = next page, q = stop): ").strip().lower() == "q":
+            break
+    print("="*50)
+
+def view_customer():
+    # View(6): ค้นจากชื่อหรือเบอร์โทรลูกค้าผ่าน Customer Index
+    query = timed_input("Enter customer name or phone: ").strip()
+    cars = storage().search_customers(query) if query else []
+    if cars:
+        print(f"\n========= Customer Search = {query} =========")
+        print(f"{'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Customer Name':<18} | {'Customer Phone':<15} | {'Final Price':>13}")
+        print("-"*86)
+        for c in cars:
+            print(f"{c.car_id:<6} | {c.brand:<10} | {c.model:<10} | {c.customer_name:<18} | {c.customer_phone:<15} | {c.final_price:>13,.2f}")
+        print("="*86)
+    else:
+        print("No customer matches.")
+
+@instrumented(label=lambda n: f"View({n})")
+def View(n:int):
+    if n == 1:
+        view_single()
+        return
+    if not storage().has_cars():
+        print("No cars data.")
+        return
+    if n == 3:
+        view_filter()
+        return
+    if n == 6:
+        view_customer()
+        return
+    if n == 7:
+        view_sorted()
+        return
+    if n == 8:
+        view_sales()
+        return
+    if n == 2:
+        view_all()
     elif n == 4:
-        notsold = [c for c in cars if c['status'].lower() == "no"]
-        if not notsold:
+        if not storage().write_report(*REPORTS[0]):
             print("No unsold cars.")
             return
-        print(make_table_not_sold(notsold, "Report: Car Not Sale"))
-        print(make_summary(cars, "Overall Summary"))
-        report = make_table_not_sold(notsold, "Report: Car Not Sale")
-        report += "\n" + make_summary(cars, "Overall Summary")
-        with open("report_not_sale.txt", "w", encoding="utf-8") as f:
-            f.write(report)
         print("report_not_sale.txt generated.")
     elif n == 5:
-        sold = [c for c in cars if c['status'].lower() == "yes"]
-        if not sold:
+        if not storage().write_report(*REPORTS[1]):
             print("No sold cars.")
             return
-        print(make_table_sold(sold, "Report: Car Sold with Customer"))
-        print(make_summary(cars, "Sold Car Summary"))
-        report = make_table_sold(sold, "Report: Car Sold with Customer")
-        report += "\n" + make_summary(cars, "Sold Car Summary")
-        with open("report_sold.txt", "w", encoding="utf-8") as f:
-            f.write(report)
         print("report_sold.txt generated.")
 
 # หมายเหตุ: ต้องมีฟังก์ชัน make_table_not_sold, make_table_sold, make_summary ในไฟล์นี้ด้วย
 
 # ---------- Reports ----------
-def make_table_not_sold(cars, title):
+# ตารางสร้างทีละบรรทัดด้วย generator (iter_table_*) → ใช้ stream ออกจอ/ไฟล์ได้โดยไม่ต้องต่อ string ทั้งก้อน
+# make_table_* ยังคืนค่าเป็น string เหมือนเดิม
+def iter_table_not_sold(cars, title):
     line = "+" + "-"*8 + "+" + "-"*12 + "+" + "-"*12 + "+" + "-"*8 + "+" + "-"*16 + "+" + "-"*15 + "+" + "-"*15 + "+" + "-"*7 + "+"
-    header = (
-        f"\n{title}\n{line}\n"
-        f"| {'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Year':<6} | {'Odometer(km)':>14} | {'Buy Price':>13} | {'Sell Price':>13} | {'Sold':<5} |\n"
-        f"{line}"
-    )
-    rows = ""
+    yield ""
+    yield title
+    yield line
+    yield f"| {'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Year':<6} | {'Odometer(km)':>14} | {'Buy Price':>13} | {'Sell Price':>13} | {'Sold':<5} |"
+    yield line
     for car in cars:
-        rows += (
-            f"\n| {car['car_id']:<6} | {car['brand']:<10} | {car['model']:<10} | {car['year']:<6} | "
-            f"{car['odometer']:>14,} | {car['buy_price']:>13,.2f} | {car['sell_price']:>13,.2f} | {car['status']:<5} |"
+        yield (
+            f"| {car.car_id:<6} | {car.brand:<10} | {car.model:<10} | {car.year:<6} | "
+            f"{car.odometer:>14,} | {car.buy_price:>13,.2f} | {car.sell_price:>13,.2f} | {car.status:<5} |"
         )
-    return header + rows + f"\n{line}"
+    yield line
 
-def make_table_sold(cars, title):
+def iter_table_sold(cars, title):
     line = "+" + "-"*8 + "+" + "-"*12 + "+" + "-"*12 + "+" + "-"*8 + "+" + "-"*16 + "+" + "-"*15 + "+" + "-"*15 + "+" + "-"*7 + "+" + "-"*15 + "+" + "-"*15 + "+" + "-"*20 + "+" + "-"*17 + "+"
-    header = (
-        f"\n{title}\n{line}\n"
-        f"| {'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Year':<6} | {'Odometer(km)':>14} | {'Buy Price':>13} | {'Sell Price':>13} | {'Sold':<5} | {'Final Price':>13} | {'Profit':>13} | {'Customer Name':<18} | {'Customer Phone':<15} |\n"
-        f"{line}"
-    )
-    rows = ""
+    yield ""
+    yield title
+    yield line
+    yield f"| {'CarID':<6} | {'Brand':<10} | {'Model':<10} | {'Year':<6} | {'Odometer(km)':>14} | {'Buy Price':>13} | {'Sell Price':>13} | {'Sold':<5} | {'Final Price':>13} | {'Profit':>13} | {'Customer Name':<18} | {'Customer Phone':<15} |"
+    yield line
     for car in cars:
-        rows += (
-            f"\n| {car['car_id']:<6} | {car['brand']:<10} | {car['model']:<10} | {car['year']:<6} | "
-            f"{car['odometer']:>14,} | {car['buy_price']:>13,.2f} | {car['sell_price']:>13,.2f} | {car['status']:<5} | "
-            f"{car['final_price']:>13,.2f} | {car['profit']:>13,.2f} | {car['customer_name']:<18} | {car['customer_phone']:<15} |"
+        yield (
+            f"| {car.car_id:<6} | {car.brand:<10} | {car.model:<10} | {car.year:<6} | "
+            f"{car.odometer:>14,} | {car.buy_price:>13,.2f} | {car.sell_price:>13,.2f} | {car.status:<5} | "
+            f"{car.final_price:>13,.2f} | {car.profit:>13,.2f} | {car.customer_name:<18} | {car.customer_phone:<15} |"
         )
-    return header + rows + f"\n{line}"
+    yield line
 
-def make_summary(cars, title="Summary"):
-    total = len(cars)
-    sold = len([c for c in cars if c["status"].lower() == "yes"])
-    available = total - sold
-    prices = [c["final_price"] for c in cars if c["final_price"]]
+@instrumented
+def make_table_not_sold(cars, title):
+    count_io(records=len(cars))
+    return "\n".join(iter_table_not_sold(cars, title))
+
+@instrumented
+def make_table_sold(cars, title):
+    count_io(records=len(cars))
+    return "\n".join(iter_table_sold(cars, title))
+
+# ---------- Sorted / Top-N Reports ----------
+# เรียงรถตาม field ใน SORT_FIELDS โดยอ่านทีละก้อนแบบเดียวกับ iter_report (ไม่ใช้ load_all)
+#  - top_cars          : n คันแรกด้วย heap ขนาด n → ไม่ sort ทั้งหมด และสร้าง Car เฉพาะคันที่ติดอันดับ
+#  - iter_sorted_cars  : ทุกคันแบบ external merge sort → สะสมทีละ SORT_RUN คัน sort แล้วเขียนลงไฟล์ชั่วคราว (run)
+#                        แล้ว heapq.merge ทุก run ที่อ่านกลับทีละ SORT_BLOCK entry → memory ไม่เกินประมาณหนึ่ง run
+#                        (run เก็บเป็น pickle ของ (key, slot, ค่าทุก field) ทีละ block → เขียน/อ่านเร็วกว่า pack_car มาก
+#                         และเป็นไฟล์ชั่วคราวของ process เองเท่านั้น)
+# sold = True (ขายแล้ว) / False (ยังไม่ขาย) / None (ทุกคัน), ค่าเท่ากัน → คันที่อยู่ก่อนในไฟล์มาก่อนเสมอ
+# acquired_on เรียงตามวันที่ รถที่ไม่รู้วันอยู่ท้ายสุดเสมอไม่ว่าจะเรียงทางไหน
+SORT_FIELDS = ("profit", "final_price", "sell_price", "buy_price", "odometer", "year", "acquired_on")
+SORT_RUN = 4 * STREAM_CHUNK
+SORT_BLOCK = 1024
+car_fields = operator.attrgetter(*Car.__slots__)
+
+def sort_keys(cols, field):
+    if field == "profit":
+        return [final - buy if final > 0 else 0 for buy, final in zip(cols["buy_price"], cols["final_price"])]
+    if field in DATE_FIELDS:
+        return [day_number(day) for day in cols[field]]
+    return cols[field]
+
+def iter_sort_rows(field, sold, sign, missing=float("inf")):
+    # (sign * key, slot, cols, i) ของรถที่ตรง sold ทีละคันตามลำดับในไฟล์
+    # รถที่ไม่รู้วัน (field วันที่) ได้ key = missing (ไม่คูณ sign) → ผู้เรียกเลือกให้ไปอยู่ท้ายลำดับของตัวเอง
+    # รถที่ยังไม่ขายไม่มีข้อมูลลูกค้า → ไม่ต้องอ่าน field ลูกค้า
+    dated = field in DATE_FIELDS
+    for cols in iter_column_chunks(fields=NOT_SOLD_FIELDS if sold is False else CAR_FIELDS):
+        for i, (key, slot, is_sold) in enumerate(zip(sort_keys(cols, field), cols["slot"], cols["is_sold"])):
+            if sold is None or (is_sold == 1) == sold:
+                yield missing if dated and not key else sign * key, slot, cols, i
+
+def top_cars(field, n, sold=None, largest=True):
+    # heap เก็บ ((key, -slot), Car) ขนาดไม่เกิน n โดยตัวที่แย่ที่สุดอยู่ที่ heap[0] → คันใหม่ต้องดีกว่าถึงจะได้เข้า
+    heap = []
+    if n <= 0:
+        return []
+    for key, slot, cols, i in iter_sort_rows(field, sold, 1 if largest else -1, float("-inf")):
+        rank = (key, -slot)
+        if len(heap) < n:
+            heapq.heappush(heap, (rank, column_car(cols, i)))
+        elif rank > heap[0][0]:
+            heapq.heapreplace(heap, (rank, column_car(cols, i)))
+    count_io(records=len(heap))
+    return [car for _, car in sorted(heap, key=lambda item: item[0], reverse=True)]
+
+def spill_run(run):
+    # sort run (key กลับเครื่องหมายแล้วถ้าเรียงจากมากไปน้อย, slot, Car) แล้วเขียนลงไฟล์ชั่วคราวทีละ SORT_BLOCK entry
+    run.sort(key=lambda item: item[:2])
+    f = tempfile.TemporaryFile(prefix="jbgarage-sort-")
+    for i in range(0, len(run), SORT_BLOCK):
+        pickle.dump([(key, slot, car_fields(car)) for key, slot, car in run[i:i + SORT_BLOCK]], f, pickle.HIGHEST_PROTOCOL)
+    count_io(written=f.tell())
+    return f
+
+def read_run(f):
+    f.seek(0)
+    while True:
+        try:
+            block = pickle.load(f)
+        except EOFError:
+            break
+        for key, slot, fields in block:
+            yield key, slot, Car(*fields)
+    count_io(read=f.tell())
+
+def iter_sorted_cars(field, sold=None, descending=False):
+    sign = -1 if descending else 1
+    run, spills = [], []
+    try:
+        for key, slot, cols, i in iter_sort_rows(field, sold, sign):
+            run.append((key, slot, column_car(cols, i)))
+            if len(run) >= SORT_RUN:
+                spills.append(spill_run(run))
+                run = []
+        if not spills:
+            # ทั้งหมดอยู่ใน run เดียว → sort ใน memory ได้เลย ไม่ต้องเขียนไฟล์
+            run.sort(key=lambda item: item[:2])
+            for _, _, car in run:
+                yield car
+            return
+        if run:
+            spills.append(spill_run(run))
+        run = []
+        for _, _, car in heapq.merge(*(read_run(f) for f in spills), key=lambda item: item[:2]):
+            yield car
+    finally:
+        for f in spills:
+            f.close()
+
+def iter_sorted_report(field, sold, title, descending=False, n=None):
+    # บรรทัดของตาราง (ตารางขายแล้วถ้า sold=True) เรียงตาม field, n = เอาแค่ n อันดับแรก (None = ทุกคัน)
+    # ไม่มีรถที่ตรงเลย → ไม่ yield อะไร (เหมือน iter_report)
+    table = iter_table_sold if sold else iter_table_not_sold
+    cars = storage().sorted_cars(field, sold, descending, n)
+    first = next(cars, None)
+    if first is None:
+        return
+    yield from table(chain([first], cars), title)
+
+def iter_report(table, sold, title, summary_title, fields=CAR_FIELDS, stop=None):
+    # อ่านรถทีละก้อน: แถวที่ตรง (ขายแล้ว/ยังไม่ขาย) ส่งเข้าตาราง พร้อมสะสมตัวเลข summary ของรถทุกคันไปในรอบเดียวกัน
+    # fields = field ที่ตารางใช้ (อ่านแค่นั้น) ถ้าไม่มีรถที่ตรงเลยจะไม่ yield อะไร
+    # stop = อ่านแค่ slot ก่อนหน้านี้ (snapshot ของผู้เรียก; None = จำนวน record ตอนเริ่ม) → ไม่ถือ cars.lock ระหว่างอ่าน
+    # Inventory Cache ยังสด → ใช้รถใน memory, ตั้ง REPORT_WORKERS ไว้และรถมากพอ → ทำแบบขนาน (ผลเหมือนกันทุก byte)
+    with scanning():
+        with locked(shared=True):
+            if stop is None:
+                stop = count_records()
+            # cache_apply แทนที่ Car ทั้งคัน (ไม่แก้ในที่) → รายการ (slot, Car) ตอนนี้คือ snapshot
+            cached = [item for item in inventory["cars"].items() if item[0] < stop] if cache_fresh() else None
+        if cached is not None:
+            yield from iter_report_cached(table, sold, title, summary_title, cached)
+            return
+        if REPORT_WORKERS > 1 and stop >= PARALLEL_MIN_RECORDS:
+            yield from iter_report_parallel(table, sold, title, summary_title, fields, stop=stop)
+            return
+        yield from iter_report_chunks(table, sold, title, summary_title, fields, stop)
+
+def iter_report_chunks(table, sold, title, summary_title, fields, stop):
+    stats = new_stats()
+    def rows():
+        for cols in iter_column_chunks(fields=fields, stop=stop):
+            add_column_stats(stats, cols)
+            for i, is_sold in enumerate(cols["is_sold"]):
+                if (is_sold == 1) == sold:
+                    yield column_car(cols, i)
+    cars = rows()
+    first = next(cars, None)
+    if first is None:
+        return
+    yield from table(chain([first], cars), title)
+    yield from format_summary(stats, summary_title).split("\n")
+
+def iter_report_cached(table, sold, title, summary_title, items):
+    # เหมือน iter_report แต่อ่านจาก (slot, Car) ของ Inventory Cache: summary สะสมเป็นก้อนตามช่วง slot เดียวกับ iter_column_chunks
+    stats = new_stats()
+    def rows():
+        for _, group in groupby(items, key=lambda item: item[0] // STREAM_CHUNK):
+            cars = [car for _, car in group]
+            merge_stats(stats, car_stats_part(cars))
+            yield from (car for car in cars if (car.status == "Yes") == sold)
+    cars = rows()
+    first = next(cars, None)
+    if first is None:
+        return
+    yield from table(chain([first], cars), title)
+    yield from format_summary(stats, summary_title).split("\n")
+
+# ---------- Parallel Reports ----------
+# แบ่ง slot ของไฟล์ .dat เป็นช่วงละ PARALLEL_PART record ให้ process pool อ่าน/decode/จัดบรรทัดตาราง
+# แต่ละช่วงคืน (บรรทัดของแถวที่ตรงต่อกันเป็นก้อนเดียว, summary ย่อยทีละ STREAM_CHUNK) แล้วรวมตามลำดับช่วง
+# summary ย่อยแบ่งตรงกับ iter_column_chunks และรวมด้วย merge_stats ตัวเดียวกัน → ผลลัพธ์และไฟล์ report เหมือนแบบทีละก้อนทุก byte
+# เปิดใช้ด้วย environment JBGARAGE_WORKERS=<จำนวน process> (0 หรือ 1 = ไม่ใช้ pool)
+REPORT_WORKERS = int(os.environ.get("JBGARAGE_WORKERS", "0") or 0)
+PARALLEL_PART = 4 * STREAM_CHUNK
+PARALLEL_MIN_RECORDS = 2 * PARALLEL_PART  # น้อยกว่านี้ ค่าเริ่ม process แพงกว่างานที่แบ่งได้
+
+def pool_init():
+    # (process ลูก) ผู้เรียก recover และถือ cars.scan.lock ไว้แล้ว → ลูกขอแค่ shared lock ของตัวเองทีละช่วงและไม่ checkpoint ตอนจบ
+    global lock_mutex, scan_mutex
+    lock_mutex = threading.RLock()
+    scan_mutex = threading.Lock()
+    lock_state.update(file=None, flock=LOCK_NONE, levels=[], recovered=True, owner=None)
+    build_state.update(file=None, depth=0)
+    scan_state.update(file=None, depth=0)
+    atexit.unregister(shutdown)
+
+def table_rows(table, cars):
+    # เฉพาะบรรทัดของแถวรถ (ตัดหัวตารางและเส้นปิดท้ายที่ table สร้างออก)
+    head = len(list(table((), ""))) - 1
+    return list(table(cars, ""))[head:-1]
+
+def report_part(table, sold, fields, start, stop):
+    rows, parts = [], []
+    for first in range(start, stop, STREAM_CHUNK):
+        cols = load_columns(first, min(first + STREAM_CHUNK, stop), fields)
+        parts.append(column_stats_part(cols))
+        rows += table_rows(table, [column_car(cols, i) for i, is_sold in enumerate(cols["is_sold"]) if (is_sold == 1) == sold])
+    return "\n".join(rows), parts
+
+def ordered_results(pool, fn, jobs, window):
+    # เหมือน pool.map แต่ส่งงานค้างไว้ไม่เกิน window ก้อน → หน่วยความจำไม่โตตามขนาดไฟล์
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, *job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def iter_report_parallel(table, sold, title, summary_title, fields=CAR_FIELDS, workers=None, stop=None):
+    # process ลูกถือ shared lock ของตัวเองทีละช่วง (load_columns) → ผู้เขียนแทรกได้ระหว่างช่วงเหมือน iter_column_chunks
+    workers = workers or REPORT_WORKERS
+    frame = list(table((), title))  # หัวตาราง + เส้นปิดท้าย
+    stats = new_stats()
+    started = False
+    with scanning():
+        with locked(shared=True):
+            if column_store_enabled():
+                ensure_fresh(columns_fresh, build_columns)  # build ก่อน process ลูกแต่ละตัวจะได้ไม่ต้อง build ซ้ำ
+            n = count_records() if stop is None else stop
+        jobs = ((table, sold, fields, start, min(start + PARALLEL_PART, n)) for start in range(0, n, PARALLEL_PART))
+        with ProcessPoolExecutor(workers, initializer=pool_init) as pool:
+            for block, parts in ordered_results(pool, report_part, jobs, 2 * workers):
+                for part in parts:
+                    merge_stats(stats, part)
+                if block:
+                    if not started:
+                        yield from frame[:-1]
+                        started = True
+                    yield block  # หลายบรรทัดในก้อนเดียว (stream_report ต่อด้วย \n เหมือนกัน)
+    if started:
+        yield frame[-1]
+        yield from format_summary(stats, summary_title).split("\n")
+
+@instrumented
+def stream_report(lines, path, echo=True):
+    # เขียนแต่ละบรรทัดออกจอและลงไฟล์พร้อมกัน (ผลเหมือน print(table); print(summary) และไฟล์ = table + "\n" + summary)
+    # ไฟล์จะถูกสร้างเมื่อมีบรรทัดแรก → คืนค่า False ถ้าไม่มีอะไรให้เขียน (echo=False = เขียนลงไฟล์อย่างเดียว)
+    f = None
+    try:
+        for line in lines:
+            if f is None:
+                f = open(path, "w", encoding="utf-8")
+            else:
+                line = "\n" + line
+            f.write(line)
+            if echo:
+                sys.stdout.write(line)
+    finally:
+        if f is not None:
+            count_io(written=f.tell())
+            f.close()
+            if echo:
+                sys.stdout.write("\n")
+    return f is not None
+
+# ---------- Change Log ----------
+# โฟลเดอร์ cars_changes/ นับลำดับการเปลี่ยนแปลง (change sequence number) ของรถ
+#    log   : epoch (int64) ตามด้วย (slot, mask) ต่อท้ายทีละ entry ทุกครั้งที่ append/update/delete
+#    stamp : stamp ของไฟล์ .dat (ดู Sidecars)
+# mask บอกว่าการเปลี่ยนแปลงนั้นแตะแถวของ report ไหน (คันเดิมหรือคันใหม่ ขายแล้ว/ยังไม่ขาย)
+# seq = (epoch, จำนวน entry) → build ใหม่ (ค้างเพราะ import/compact/migrate หรือ log ยาวเกิน CHANGE_LOG_MAX) ได้ epoch ใหม่
+# ผู้ใช้ seq เก่าที่ epoch ไม่ตรงจึงรู้ว่าประวัติขาดช่วง ต้องเริ่มใหม่ทั้งหมด
+CHANGES_DIR = "cars_changes"
+CHANGE_LOG_MAX = 65536
+CHANGE_SOLD, CHANGE_NOT_SOLD = 1, 2
+struct_change_head = struct.Struct("<q")
+struct_change = struct.Struct("<i B")
+
+def change_mask(car):
+    if car is None:
+        return 0
+    return CHANGE_SOLD if car.status == "Yes" else CHANGE_NOT_SOLD
+
+def changes_path():
+    return os.path.join(CHANGES_DIR, "log")
+
+def changes_fresh():
+    if not stamp_file_fresh(os.path.join(CHANGES_DIR, "stamp")) or not os.path.exists(changes_path()):
+        return False
+    return os.path.getsize(changes_path()) <= struct_change_head.size + CHANGE_LOG_MAX * struct_change.size
+
+def stamp_changes():
+    write_stamp_file(os.path.join(CHANGES_DIR, "stamp"))
+
+def build_changes():
+    os.makedirs(CHANGES_DIR, exist_ok=True)
+    with open(changes_path(), "wb") as f:
+        f.write(struct_change_head.pack(time.time_ns()))
+    stamp_changes()
+
+def changes_apply(slot, old, new):
+    with open(changes_path(), "ab") as f:
+        f.write(struct_change.pack(slot, change_mask(old) | change_mask(new)))
+
+SIDECARS.append((changes_fresh, changes_apply, stamp_changes))
+
+def change_seq():
+    # (epoch, จำนวนการเปลี่ยนแปลง) ล่าสุด (ผู้เรียกถือ lock และ log สดแล้ว)
+    with open(changes_path(), "rb") as f:
+        epoch, = struct_change_head.unpack(f.read(struct_change_head.size))
+    return epoch, (os.path.getsize(changes_path()) - struct_change_head.size) // struct_change.size
+
+def changes_since(n):
+    # [(slot, mask), ...] ของการเปลี่ยนแปลงตั้งแต่ entry ที่ n (อ่านเฉพาะส่วนท้ายของ log)
+    with open(changes_path(), "rb") as f:
+        f.seek(struct_change_head.size + n * struct_change.size)
+        return list(struct_change.iter_unpack(f.read()))
+
+# ---------- Incremental Reports ----------
+# View(4)/(5) และ python main.py reports เขียน report ใหม่เฉพาะเมื่อข้อมูลที่ใช้เปลี่ยน
+# cars_reports.json จำของแต่ละไฟล์: seq ของ Change Log ตอนเขียน, size/mtime ของไฟล์, slot ของแถวสุดท้าย
+# และตำแหน่ง (byte) ที่ส่วนท้าย (เส้นปิดตาราง + summary) เริ่ม
+#  - seq ไม่เปลี่ยน                               → ใช้ไฟล์เดิม (unchanged)
+#  - แถวที่เปลี่ยนอยู่หลังแถวสุดท้ายทั้งหมด (เช่น Add)  → ตัดส่วนท้ายทิ้ง ต่อท้ายเฉพาะแถวใหม่ แล้วเขียนส่วนท้ายใหม่จาก summary_stats() (appended)
+#  - นอกนั้น (แก้/ลบแถวที่มีอยู่แล้ว, epoch ไม่ตรง, ไฟล์ถูกแก้, format v1) → เขียนใหม่ทั้งไฟล์ (generated)
+# format v1 ไม่ต่อท้าย เพราะผลรวม float ใน summary_stats() อาจต่างจากการบวกทีละคันของ iter_report ในหลักสุดท้าย
+# เช็ค/ต่อท้าย/บันทึก cars_reports.json ทำใต้ building() → terminal อื่นที่ถือ shared lock พร้อมกันไม่เขียนชนกัน
+# เขียนใหม่ทั้งไฟล์ไม่ถือ cars.lock ระหว่างอ่าน: จำ seq + จำนวน record (snapshot) ไว้ใต้ lock แล้วอ่านแค่ slot ก่อนหน้านั้น
+# ลง .tmp ของตัวเอง แล้วค่อยขอ lock อีกครั้งเพื่อ replace (ผู้อ่านไม่เห็น report ครึ่งเดียว) การเขียนที่แทรกเข้ามาระหว่างอ่าน
+# อยู่หลัง seq ที่จำไว้ → update_report ครั้งถัดไปเห็นเป็นการเปลี่ยนแปลงตามปกติ
+FILE_REPORTS = "cars_reports.json"
+REPORTS = (
+    ("report_not_sale.txt", iter_table_not_sold, False, "Report: Car Not Sale", "Overall Summary", NOT_SOLD_FIELDS),
+    ("report_sold.txt", iter_table_sold, True, "Report: Car Sold with Customer", "Sold Car Summary", CAR_FIELDS),
+)
+
+def load_reports():
+    try:
+        with open(FILE_REPORTS, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_reports(doc):
+    tmp = FILE_REPORTS + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f)
+    os.replace(tmp, FILE_REPORTS)
+
+def report_file_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def echo_file(path):
+    # ออกจอเหมือนตอน stream_report เขียนไฟล์นี้
+    with open(path, encoding="utf-8") as f:
+        for block in iter(lambda: f.read(1 << 20), ""):
+            sys.stdout.write(block)
+    sys.stdout.write("\n")
+    count_io(read=os.path.getsize(path))
+
+def append_report(path, table, sold, summary_title, state):
+    # ต่อท้ายแถวใหม่ + เขียนส่วนท้ายใหม่ → คืนค่า False ถ้าทำไม่ได้ (มีแถวเดิมที่เปลี่ยน) ต้องเขียนใหม่ทั้งไฟล์
+    mask = CHANGE_SOLD if sold else CHANGE_NOT_SOLD
+    dirty = [slot for slot, m in changes_since(state["seq"][1]) if m & mask]
+    if any(slot <= state["last"] for slot in dirty):
+        return False
+    cars = list(iter_car_slots(state["last"] + 1, predicate=lambda c: (c.status == "Yes") == sold)) if dirty else []
+    rows = table_rows(table, [car for _, car in cars])
+    body = "".join("\n" + row for row in rows).encode("utf-8")
+    closing = list(table((), ""))[-1]
+    tail = "\n" + "\n".join([closing] + format_summary(summary_stats(), summary_title).split("\n"))
+    with open(path, "r+b") as f:
+        f.seek(state["footer"])
+        f.truncate()
+        f.write(body + tail.encode("utf-8"))
+    count_io(records=len(rows), written=len(body) + len(tail))
+    state["footer"] += len(body)
+    if cars:
+        state["last"] = cars[-1][0]
+    return True
+
+@instrumented
+def update_report(path, table, sold, title, summary_title, fields=CAR_FIELDS, echo=True):
+    # คืนค่า "unchanged" / "appended" / "generated" หรือ None ถ้าไม่มีรถที่ตรงเลย (ไม่เขียนไฟล์ เหมือนเดิม)
+    with scanning():
+        with locked(shared=True), building():
+            ensure_fresh(changes_fresh, build_changes)
+            seq, n = change_seq(), count_records()
+            states = load_reports()
+            state = states.get(path)
+            status = None
+            if (state and state["seq"][0] == seq[0] and state["file"] == report_file_key(path)
+                    and state["title"] == [title, summary_title] and state["format"] == DATA_VERSION):
+                if state["seq"][1] == seq[1]:
+                    status = "unchanged"
+                elif state["footer"] is not None and append_report(path, table, sold, summary_title, state):
+                    status = "appended"
+            if status is not None:
+                if echo:
+                    echo_file(path)
+                state.update(seq=list(seq), file=report_file_key(path))
+                states[path] = state
+                save_reports(states)
+                return status
+        closing, mark = list(table((), ""))[-1], {}
+        def track(lines):
+            # จำตำแหน่ง (byte) ของเส้นปิดตารางเส้นสุดท้าย (= ส่วนท้าย) และแถวก่อนหน้านั้น (= แถวสุดท้าย)
+            pos, prev = -1, None
+            for line in lines:
+                if line == closing:
+                    mark.update(footer=pos, last=prev)
+                pos += 1 + (len(line) if line.isascii() else len(line.encode("utf-8")))
+                prev = line
+                yield line
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            written = stream_report(track(iter_report(table, sold, title, summary_title, fields, stop=n)), tmp, echo)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with locked(shared=True), building():
+            states = load_reports()
+            if not written:
+                if states.pop(path, None) is not None:
+                    save_reports(states)
+                return None
+            os.replace(tmp, path)
+            last_row = mark["last"].rsplit("\n", 1)[-1]  # แบบขนานส่งแถวมาเป็นก้อนหลายบรรทัด
+            last = find_slot(last_row.split("|")[1].strip())
+            # รถคันสุดท้ายถูกลบ (หรือลบแล้วเพิ่มใหม่หลัง snapshot) ระหว่างอ่าน → ไม่รู้ slot ของแถวสุดท้าย ครั้งหน้าเขียนใหม่ทั้งไฟล์
+            known = last is not None and last < n and DATA_VERSION >= 2
+            states[path] = {
+                "title": [title, summary_title],
+                "format": DATA_VERSION,
+                "last": last,
+                "footer": mark["footer"] if known else None,
+                "seq": list(seq),
+                "file": report_file_key(path),
+            }
+            save_reports(states)
+            return "generated"
+
+def update_reports():
+    # python main.py reports: อัปเดต report ทุกไฟล์โดยไม่ออกจอ (เช่น งานกลางคืน) แล้วบอกว่าแต่ละไฟล์ทำอะไรไป
+    for spec in REPORTS:
+        status = storage().write_report(*spec, echo=False)
+        print(f"{spec[0]}: {status or 'no cars'}")
+
+def summarize(cars):
+    # ตัวเลขที่ make_summary ต้องใช้ (คำนวณจาก list ของ Car)
     brands = {}
     for c in cars:
-        brands[c["brand"]] = brands.get(c["brand"], 0) + 1
+        brands[c.brand] = brands.get(c.brand, 0) + 1
+    prices = [c.final_price for c in cars if c.final_price]
+    return {
+        "total": len(cars),
+        "sold": len([c for c in cars if c.status.lower() == "yes"]),
+        "count": len(prices),
+        "sum": sum(prices),
+        "min": min(prices) if prices else 0,
+        "max": max(prices) if prices else 0,
+        "brands": brands
+    }
+
+def new_stats():
+    return {"total": 0, "sold": 0, "count": 0, "sum": 0, "min": 0, "max": 0, "brands": {}}
+
+def column_stats_part(cols):
+    # ตัวเลข summary ของคอลัมน์ก้อนเดียว (ขนาดเล็ก ส่งข้าม process ได้) → รวมเข้า stats ด้วย merge_stats
+    part = {"total": len(cols["is_sold"]), "sold": cols["is_sold"].count(1), "brands": Counter(cols["brand"])}
+    if "final_satang" in cols:
+        # v2: รวมเป็นจำนวนเต็มสตางค์ (ไม่คลาดเคลื่อน) แล้วค่อยแปลงเป็นบาท
+        prices = [p for p in cols["final_satang"] if p]
+        part["satang"] = (len(prices), min(prices), max(prices), sum(prices)) if prices else None
+    else:
+        # v1: เก็บราคาไว้ทั้งหมด → merge_stats บวก float ต่อกันลำดับเดิม ได้ผลรวมเท่ากันทุก bit
+        part["prices"] = array("d", (p for p in cols["final_price"] if p))
+    return part
+
+def car_stats_part(cars):
+    # เหมือน column_stats_part แต่จาก list ของ Car (ค่าเดียวกับที่เก็บในไฟล์ → ได้ผลเท่ากันทุก bit)
+    part = {"total": len(cars), "sold": sum(1 for c in cars if c.status == "Yes"), "brands": Counter(c.brand for c in cars)}
+    if DATA_VERSION >= 2:
+        prices = [to_satang(c.final_price) for c in cars if c.final_price]
+        part["satang"] = (len(prices), min(prices), max(prices), sum(prices)) if prices else None
+    else:
+        part["prices"] = array("d", (c.final_price for c in cars if c.final_price))
+    return part
+
+def merge_stats(stats, part):
+    # sum บวกต่อจากค่าเดิมตามลำดับ → รวมทีละก้อนได้ค่าเท่ากับรวมทีเดียว
+    brands = stats["brands"]
+    for b, n in part["brands"].items():
+        brands[b] = brands.get(b, 0) + n
+    if "satang" in part:
+        if part["satang"]:
+            n, lo, hi, total = part["satang"]
+            lo, hi = lo / 100, hi / 100
+            stats["min"] = min(stats["min"], lo) if stats["count"] else lo
+            stats["max"] = max(stats["max"], hi) if stats["count"] else hi
+            stats["satang"] = stats.get("satang", 0) + total
+            stats["sum"] = stats["satang"] / 100
+            stats["count"] += n
+    else:
+        prices = part["prices"]
+        if prices:
+            lo, hi = min(prices), max(prices)
+            stats["min"] = min(stats["min"], lo) if stats["count"] else lo
+            stats["max"] = max(stats["max"], hi) if stats["count"] else hi
+            stats["sum"] = sum(prices, stats["sum"])
+            stats["count"] += len(prices)
+    stats["total"] += part["total"]
+    stats["sold"] += part["sold"]
+    return stats
+
+def add_column_stats(stats, cols):
+    # สะสมคอลัมน์ (ทั้งไฟล์หรือทีละก้อน) เข้าไปใน stats
+    return merge_stats(stats, column_stats_part(cols))
+
+def format_summary(stats, title="Summary"):
     summary = []
     summary.append(f"\n{title}")
-    summary.append(f"* Total Cars : {total}")
-    summary.append(f"* Sold Cars  : {sold}")
-    summary.append(f"* Available  : {available}\n")
-    if prices:
+    summary.append(f"* Total Cars : {stats['total']}")
+    summary.append(f"* Sold Cars  : {stats['sold']}")
+    summary.append(f"* Available  : {stats['total'] - stats['sold']}\n")
+    if stats["count"]:
         summary.append("Price Statistics (Final Price, THB)")
-        summary.append(f"* Min : {min(prices):,.2f}")
-        summary.append(f"* Max : {max(prices):,.2f}")
-        summary.append(f"* Avg : {sum(prices)/len(prices):,.2f}\n")
+        summary.append(f"* Min : {stats['min']:,.2f}")
+        summary.append(f"* Max : {stats['max']:,.2f}")
+        summary.append(f"* Avg : {stats['sum']/stats['count']:,.2f}\n")
     summary.append("Cars by Brand")
-    for brand, count in brands.items():
+    for brand, count in stats["brands"].items():
         summary.append(f"* {brand:<8}: {count}")
     return "\n".join(summary)
+
+@instrumented
+def make_summary(cars, title="Summary"):
+    count_io(records=len(cars))
+    return format_summary(summarize(cars), title)
+
+# ================= SQLite Engine =================
+# เก็บรถทั้งหมดในตาราง cars ของ cars.db (sqlite3 ใน standard library) แทน 3 ไฟล์ .dat
+#  - WAL mode + synchronous=FULL → ผู้อ่านไม่รอผู้เขียน และ commit แล้วไม่หายเหมือน cars.wal ของไฟล์ .dat
+#  - pos (AUTOINCREMENT) = ลำดับที่เพิ่มรถ ใช้แทน slot → ทุกรายการเรียงเหมือน engine dat
+#  - ราคาเก็บเป็นสตางค์ (แบบ format v2/v3) และ string ตัดความยาวเท่ากับใน struct → ผลลัพธ์ตรงกับ engine dat
+#  - index: car_id (UNIQUE), brand, model, year, is_sold, ราคา, odometer, profit (expression index), sold_on
+#    → View(3), summary, Top-N และยอดขายรายวันเป็น SQL query ที่ใช้ index แทนการ scan ใน Python
+#  - name_key / phone_key = ชื่อ/เบอร์ที่ normalize แบบ Customer Index (ค้นด้วย instr ไม่มี index)
+# คัดลอกข้อมูลจากไฟล์ .dat: python main.py to-sqlite แล้วตั้ง JBGARAGE_ENGINE=sqlite
+SQLITE_FILE = "cars.db"
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cars (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    car_id INTEGER NOT NULL UNIQUE,
+    year INTEGER NOT NULL,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    odometer INTEGER NOT NULL,
+    buy_price INTEGER NOT NULL,
+    is_sold INTEGER NOT NULL,
+    sell_price INTEGER NOT NULL,
+    final_price INTEGER NOT NULL,
+    customer_name TEXT NOT NULL,
+    customer_phone TEXT NOT NULL,
+    acquired_on TEXT NOT NULL,
+    sold_on TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    phone_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cars_brand ON cars(brand);
+CREATE INDEX IF NOT EXISTS cars_model ON cars(model);
+CREATE INDEX IF NOT EXISTS cars_year ON cars(year);
+CREATE INDEX IF NOT EXISTS cars_is_sold ON cars(is_sold);
+CREATE INDEX IF NOT EXISTS cars_sell_price ON cars(sell_price);
+CREATE INDEX IF NOT EXISTS cars_final_price ON cars(final_price);
+CREATE INDEX IF NOT EXISTS cars_odometer ON cars(odometer);
+CREATE INDEX IF NOT EXISTS cars_profit ON cars(final_price - buy_price) WHERE final_price > 0;
+CREATE INDEX IF NOT EXISTS cars_sold_on ON cars(sold_on) WHERE sold_on != '';
+"""
+SQLITE_INSERT = ("INSERT INTO cars (car_id, year, brand, model, odometer, buy_price, is_sold, sell_price, final_price, "
+                 "customer_name, customer_phone, acquired_on, sold_on, name_key, phone_key) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+SQLITE_SELECT = ("SELECT pos, car_id, year, brand, model, odometer, buy_price, is_sold, sell_price, final_price, "
+                 "customer_name, customer_phone, acquired_on, sold_on FROM cars")
+# field ของ View(3) / Range / Sorted → expression ใน SQL (ราคาเป็นสตางค์)
+SQLITE_FILTERS = {"brand": "brand", "model": "model", "year": "year", "status": "is_sold"}
+SQLITE_KEYS = {
+    "sell_price": "sell_price", "final_price": "final_price", "buy_price": "buy_price",
+    "odometer": "odometer", "year": "year", "profit": "final_price - buy_price",
+}
+SQLITE_MONEY = ("sell_price", "final_price", "buy_price", "profit")
+sqlite_state = {"conn": None}
+
+def sqlite_conn():
+    # connection เดียวต่อ process (autocommit; คำสั่งที่ต้องทำหลายอย่างพร้อมกันใช้ sqlite_tx)
+    conn = sqlite_state["conn"]
+    if conn is None:
+        conn = sqlite3.connect(SQLITE_FILE, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript(SQLITE_SCHEMA)
+        sqlite_state["conn"] = conn
+    return conn
+
+def sqlite_close():
+    if sqlite_state["conn"] is not None:
+        sqlite_state["conn"].close()
+        sqlite_state["conn"] = None
+
+@contextmanager
+def sqlite_tx():
+    conn = sqlite_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def fit_str(s, size):
+    # ตัด string แบบเดียวกับที่ encode_str เก็บลงไฟล์ .dat
+    return decode_str(encode_str(s, size))
+
+def sqlite_row(car):
+    name, phone = fit_str(car.customer_name, 30), fit_str(car.customer_phone, 15)
+    return (int(car.car_id[1:]), int(car.year), fit_str(car.brand, 20), fit_str(car.model, 20), int(car.odometer),
+            to_satang(car.buy_price), 1 if car.status.lower() == "yes" else 0, to_satang(car.sell_price),
+            to_satang(car.final_price), name, phone, car.acquired_on, car.sold_on,
+            customer_text(name, "n"), customer_text(phone, "p"))
+
+def sqlite_car(row):
+    return Car(f"C{row[1]:03d}", row[2], row[3], row[4], row[5], baht(row[6]), "Yes" if row[7] == 1 else "No",
+               row[8] / 100, row[9] / 100, row[10], row[11], row[12], row[13])
+
+def sqlite_cars(sql, params=()):
+    cars = [sqlite_car(row) for row in sqlite_conn().execute(sql, params)]
+    count_io(records=len(cars))
+    return cars
+
+@instrumented
+def sqlite_load_all():
+    return sqlite_cars(SQLITE_SELECT + " ORDER BY pos")
+
+@instrumented
+def sqlite_save_all(cars):
+    with sqlite_tx() as conn:
+        conn.execute("DELETE FROM cars")
+        conn.executemany(SQLITE_INSERT, map(sqlite_row, cars))
+    count_io(records=len(cars))
+
+def sqlite_count():
+    return sqlite_conn().execute("SELECT COUNT(*) FROM cars").fetchone()[0]
+
+def sqlite_has_cars():
+    return sqlite_conn().execute("SELECT EXISTS (SELECT 1 FROM cars)").fetchone()[0] == 1
+
+def sqlite_get_car(car_id):
+    cars = sqlite_cars(SQLITE_SELECT + " WHERE car_id = ?", (int(car_id[1:]),))
+    return cars[0] if cars else None
+
+def sqlite_add_car(car):
+    try:
+        sqlite_conn().execute(SQLITE_INSERT, sqlite_row(car))
+    except sqlite3.IntegrityError:
+        return False  # car_id ซ้ำ
+    count_io(records=1)
+    return True
+
+def sqlite_update_car(car):
+    # เหมือน update_car_at(): เขียนแค่สถานะ/ข้อมูลการขาย
+    row = sqlite_row(car)
+    cur = sqlite_conn().execute(
+        "UPDATE cars SET is_sold = ?, sell_price = ?, final_price = ?, customer_name = ?, customer_phone = ?, "
+        "sold_on = ?, name_key = ?, phone_key = ? WHERE car_id = ?", row[6:9] + row[9:11] + row[12:13] + row[13:] + row[:1])
+    count_io(records=cur.rowcount)
+    return cur.rowcount > 0
+
+def sqlite_delete_car(car_id):
+    return sqlite_conn().execute("DELETE FROM cars WHERE car_id = ?", (int(car_id[1:]),)).rowcount > 0
+
+def sqlite_stamp():
+    # data_version เปลี่ยนเมื่อ connection อื่น commit, total_changes เมื่อ connection นี้เขียนเอง
+    conn = sqlite_conn()
+    return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+def sqlite_page_cars(start, limit):
+    rows = list(sqlite_conn().execute(SQLITE_SELECT + " WHERE pos >= ? ORDER BY pos LIMIT ?", (start, limit)))
+    count_io(records=len(rows))
+    return sqlite_stamp(), [(row[0], sqlite_car(row)) for row in rows]
+
+def sqlite_filter_values(field):
+    values = (v for (v,) in sqlite_conn().execute(f"SELECT DISTINCT {SQLITE_FILTERS[field]} FROM cars"))
+    if field == "status":
+        return sorted("Yes" if v == 1 else "No" for v in values)
+    return sorted(str(v) for v in values)
+
+def sqlite_filter_cars(field, values):
+    if field == "status":
+        values = [1 if v == "Yes" else 0 for v in values]
+    elif field == "year":
+        values = [int(v) for v in values if v.isdigit()]
+    marks = ", ".join("?" * len(values))
+    return sqlite_cars(SQLITE_SELECT + f" WHERE {SQLITE_FILTERS[field]} IN ({marks}) ORDER BY pos", values)
+
+def sqlite_range_cars(ranges):
+    # ทุกช่วงรวมเป็น WHERE เดียว (final_price / profit นับเฉพาะรถที่ขายแล้ว เหมือน Range Index)
+    where, params = [], []
+    for field, (lo, hi) in ranges.items():
+        expr = SQLITE_KEYS[field]
+        scale = 100 if field in SQLITE_MONEY else 1
+        if field in ("final_price", "profit"):
+            where.append("final_price > 0")
+        if lo is not None:
+            where.append(f"{expr} >= ?")
+            params.append(lo * scale)
+        if hi is not None:
+            where.append(f"{expr} <= ?")
+            params.append(hi * scale)
+    return sqlite_cars(SQLITE_SELECT + f" WHERE {' AND '.join(where) or '1'} ORDER BY pos", params)
+
+def sqlite_summary():
+    # ตัวเลขแบบเดียวกับ summarize() ด้วย aggregate ของ SQL (ยี่ห้อเรียงตามคันแรกที่เพิ่ม)
+    conn = sqlite_conn()
+    total, sold = conn.execute("SELECT COUNT(*), COALESCE(SUM(is_sold = 1), 0) FROM cars").fetchone()
+    count, lo, hi, total_price = conn.execute(
+        "SELECT COUNT(*), MIN(final_price), MAX(final_price), SUM(final_price) FROM cars WHERE final_price != 0").fetchone()
+    brands = conn.execute("SELECT brand, COUNT(*) FROM cars GROUP BY brand ORDER BY MIN(pos)").fetchall()
+    return {
+        "total": total,
+        "sold": sold,
+        "count": count,
+        "sum": (total_price or 0) / 100,
+        "min": (lo or 0) / 100,
+        "max": (hi or 0) / 100,
+        "brands": dict(brands),
+    }
+
+def sqlite_report(table, sold, title, summary_title, fields=CAR_FIELDS):
+    # เหมือน iter_report: ตารางของรถที่ขายแล้ว/ยังไม่ขาย (อ่านทีละแถวจาก cursor) ตามด้วย summary ของรถทุกคัน
+    rows = sqlite_conn().execute(SQLITE_SELECT + " WHERE is_sold = ? ORDER BY pos", (1 if sold else 0,))
+    cars = map(sqlite_car, rows)
+    first = next(cars, None)
+    if first is None:
+        return
+    yield from table(chain([first], cars), title)
+    yield from format_summary(sqlite_summary(), summary_title).split("\n")
+
+def sqlite_write_report(path, table, sold, title, summary_title, fields=CAR_FIELDS, echo=True):
+    # engine sqlite ไม่มี Change Log → เขียนใหม่ทั้งไฟล์ทุกครั้ง
+    return "generated" if stream_report(sqlite_report(table, sold, title, summary_title, fields), path, echo) else None
+
+def sqlite_search_customers(query):
+    # กติกาเดียวกับ search_customers(): สั้นกว่า GRAM ตัว = ขึ้นต้นคำ, ยาวกว่านั้น = มีอยู่ตรงไหนก็ได้
+    kind = "p" if re.fullmatch(r"[\d\s()+-]+", query) else "n"
+    text = customer_text(query, kind)
+    if not text:
+        return []
+    column = "phone_key" if kind == "p" else "name_key"
+    if len(text) >= GRAM:
+        where = f"instr({column}, ?) > 0"
+    elif kind == "n":
+        where, text = "instr(' ' || name_key, ?) > 0", " " + text
+    else:
+        where = "instr(phone_key, ?) = 1"
+    return sqlite_cars(SQLITE_SELECT + f" WHERE {where} ORDER BY pos", (text,))
+
+def sqlite_sorted_cars(field, sold=None, descending=False, n=None):
+    # ORDER BY ใน SQL (ค่าเท่ากัน → pos น้อยก่อน เหมือน top_cars / iter_sorted_cars) อ่านทีละแถวจาก cursor
+    # วันที่เป็นข้อความ YYYY-MM-DD (เรียงแบบข้อความได้) → '' (ไม่รู้วัน) ไปไว้ท้ายสุดก่อน
+    if field in DATE_FIELDS:
+        expr = f"{field} = '', {field}"
+    else:
+        expr = "CASE WHEN final_price > 0 THEN final_price - buy_price ELSE 0 END" if field == "profit" else SQLITE_KEYS[field]
+    where = "" if sold is None else f" WHERE is_sold = {1 if sold else 0}"
+    rows = sqlite_conn().execute(SQLITE_SELECT + f"{where} ORDER BY {expr} {'DESC' if descending else 'ASC'}, pos LIMIT ?",
+                                 (-1 if n is None else n,))
+    return map(sqlite_car, rows)
+
+def sqlite_sales_rollup():
+    # rollup แบบเดียวกับ cars_sales.json จาก GROUP BY sold_on (ใช้ index cars_sold_on)
+    doc = {"days": {}, "months": {}}
+    for day, units, revenue, profit in sqlite_conn().execute(
+            "SELECT sold_on, COUNT(*), SUM(final_price), SUM(CASE WHEN final_price > 0 THEN final_price - buy_price ELSE 0 END) "
+            "FROM cars WHERE sold_on != '' AND is_sold = 1 GROUP BY sold_on"):
+        for table, key in (("days", day), ("months", day[:7])):
+            row = doc[table].setdefault(key, [0, 0, 0])
+            row[0] += units
+            row[1] += revenue
+            row[2] += profit
+    return doc
+
+@instrumented
+def dat_to_sqlite():
+    # python main.py to-sqlite: แทนที่ข้อมูลใน cars.db ด้วยรถทุกคันจากไฟล์ .dat (อ่านทีละก้อน, commit ครั้งเดียว)
+    n = 0
+    with locked(shared=True), sqlite_tx() as conn:
+        conn.execute("DELETE FROM cars")
+        for cols in iter_column_chunks():
+            rows = [sqlite_row(car) for car in cars_from_columns(cols)]
+            conn.executemany(SQLITE_INSERT, rows)
+            n += len(rows)
+    count_io(records=n)
+    print(f"Copied {n} cars to {SQLITE_FILE}.")
+    return n
+
+# ================= Storage Engines =================
+# เมนู (Add/Update/Delete/View) อ่านและเขียนรถผ่าน storage() → เลือก engine ต่อ deployment ด้วย
+# environment JBGARAGE_ENGINE = dat (3 ไฟล์ .dat + sidecar ทั้งหมด, ค่าเริ่มต้น) หรือ sqlite (cars.db)
+# ทุก engine สืบจาก StorageEngine → ลืม method ไหนไปจะสร้าง engine ไม่ได้ตั้งแต่ import (ไม่ใช่ตอนเมนูเรียกใช้)
+# คำสั่งที่ผูกกับไฟล์ .dat (import, sold, compact, migrate, columns, serve) ใช้ได้เฉพาะ engine dat
+def dat_count():
+    # จำนวนรถที่ยัง active จาก cars_stats.json (ไม่ต้องไล่อ่านไฟล์ .dat; record ที่ถูกลบแล้วไม่นับ)
+    return summary_stats()["total"] if count_records() else 0
+
+def dat_has_cars():
+    # มีรถ active อย่างน้อย 1 คันไหม (ใช้เช็ค "No cars data." ของ View): ไม่ build summary stats
+    # อ่านเฉพาะ field active ของ cars_status.dat ทีละ UNPACK_CHUNK record จากท้ายไฟล์ แล้วหยุดที่คันแรกที่เจอ
+    # (รถที่เพิ่งเพิ่มมักยังไม่ถูกลบ → ปกติอ่านแค่ก้อนเดียว)
+    with locked(shared=True):
+        if cache_fresh():
+            return bool(inventory["cars"])
+        for stop in range(count_records(), 0, -UNPACK_CHUNK):
+            start = max(stop - UNPACK_CHUNK, 0)
+            if any(unpack_file(FILE_STATUS, struct_status, (STATUS_ACTIVE,), start, stop - start)[0]):
+                return True
+        return False
+
+def dat_get_car(car_id):
+    slot = find_slot(car_id)
+    return None if slot is None else read_car(slot)
+
+def dat_add_car(car):
+    with locked():
+        # ตรวจซ้ำตอนเขียน เผื่อ terminal อื่นเพิ่ม CarID เดียวกันไประหว่างกรอกข้อมูล
+        if find_slot(car.car_id) is not None:
+            return False
+        append_car(car)
+        return True
+
+def dat_update_car(car):
+    with locked():
+        # ระหว่างกรอกข้อมูล terminal อื่นอาจลบ/compact ไปแล้ว → หา slot ใหม่ตอนเขียน
+        slot = find_slot(car.car_id)
+        if slot is None:
+            return False
+        update_car_at(slot, car)
+        return True
+
+def dat_delete_car(car_id):
+    with locked():
+        slot = find_slot(car_id)
+        if slot is None:
+            return False
+        delete_at(slot)
+        return True
+
+def dat_page_cars(start, limit):
+    with locked(shared=True):
+        return data_stamp(), list(iter_car_slots(start, limit))
+
+def dat_sorted_cars(field, sold=None, descending=False, n=None):
+    return iter(top_cars(field, n, sold, descending)) if n is not None else iter_sorted_cars(field, sold, descending)
+
+def dat_sales_rollup():
+    if data_format() < 3:
+        return None
+    doc = sales_rollup()
+    return {"days": doc["days"], "months": doc["months"]}  # ไม่ส่ง stamp ของ sidecar ออกไป (ตรงกับ engine sqlite)
+
+class StorageEngine(ABC):
+    @abstractmethod
+    def load_all(self):
+        # รถทุกคัน (เรียงตามตำแหน่ง)
+        ...
+
+    @abstractmethod
+    def save_all(self, cars):
+        # เขียนทับทั้งหมด
+        ...
+
+    @abstractmethod
+    def count(self):
+        # จำนวนรถ (เฉพาะคันที่ยังไม่ถูกลบ)
+        ...
+
+    @abstractmethod
+    def has_cars(self):
+        # มีรถที่ยังไม่ถูกลบอย่างน้อย 1 คันไหม (ต้องถูกกว่า count)
+        ...
+
+    @abstractmethod
+    def get_car(self, car_id):
+        # Car หรือ None
+        ...
+
+    @abstractmethod
+    def add_car(self, car):
+        # False ถ้า CarID ซ้ำ
+        ...
+
+    @abstractmethod
+    def update_car(self, car):
+        # เขียนสถานะ/ข้อมูลการขายของ car.car_id, False ถ้าไม่พบ
+        ...
+
+    @abstractmethod
+    def delete_car(self, car_id):
+        # False ถ้าไม่พบ
+        ...
+
+    @abstractmethod
+    def page_cars(self, start, limit):
+        # (stamp, [(ตำแหน่ง, Car)]) ตั้งแต่ตำแหน่ง start (View 2)
+        ...
+
+    @abstractmethod
+    def stamp(self):
+        # เปลี่ยนเมื่อข้อมูลเปลี่ยน
+        ...
+
+    @abstractmethod
+    def filter_values(self, field):
+        # View(3): ค่าทั้งหมดที่มีอยู่ของ field (เรียงแล้ว)
+        ...
+
+    @abstractmethod
+    def filter_cars(self, field, values):
+        # View(3): รถที่ field ตรงกับค่าใดค่าหนึ่งใน values
+        ...
+
+    @abstractmethod
+    def range_cars(self, ranges):
+        # View(3): รถที่อยู่ในทุกช่วง {field: (lo, hi)}
+        ...
+
+    @abstractmethod
+    def summary(self):
+        # ตัวเลขแบบ summarize() ของรถทุกคัน (make_summary)
+        ...
+
+    @abstractmethod
+    def report(self, table, sold, title, summary_title, fields=CAR_FIELDS):
+        # บรรทัดของ View(4)/(5)
+        ...
+
+    @abstractmethod
+    def write_report(self, path, table, sold, title, summary_title, fields=CAR_FIELDS, echo=True):
+        # เขียนไฟล์ report (ดู Incremental Reports)
+        ...
+
+    @abstractmethod
+    def search_customers(self, query):
+        # View(6)
+        ...
+
+    @abstractmethod
+    def sorted_cars(self, field, sold=None, descending=False, n=None):
+        # View(7)
+        ...
+
+    @abstractmethod
+    def sales_rollup(self):
+        # {"days", "months"} ของ View(8) หรือ None ถ้าที่เก็บข้อมูลไม่มีวันขาย
+        ...
+
+    @abstractmethod
+    def format_version(self):
+        # ความสามารถของที่เก็บข้อมูลแบบ format version (มีวันที่ตั้งแต่ 3)
+        ...
+
+class DatEngine(StorageEngine):
+    def load_all(self):
+        return load_all()
+
+    def save_all(self, cars):
+        return save_all(cars)
+
+    def count(self):
+        return dat_count()
+
+    def has_cars(self):
+        return dat_has_cars()
+
+    def get_car(self, car_id):
+        return dat_get_car(car_id)
+
+    def add_car(self, car):
+        return dat_add_car(car)
+
+    def update_car(self, car):
+        return dat_update_car(car)
+
+    def delete_car(self, car_id):
+        return dat_delete_car(car_id)
+
+    def page_cars(self, start, limit):
+        return dat_page_cars(start, limit)
+
+    def stamp(self):
+        return data_stamp()
+
+    def filter_values(self, field):
+        return filter_values(field)
+
+    def filter_cars(self, field, values):
+        return read_cars(filter_slots(field, values))
+
+    def range_cars(self, ranges):
+        return read_cars(range_slots(ranges))
+
+    def summary(self):
+        return summary_stats()
+
+    def report(self, table, sold, title, summary_title, fields=CAR_FIELDS):
+        return iter_report(table, sold, title, summary_title, fields)
+
+    def write_report(self, path, table, sold, title, summary_title, fields=CAR_FIELDS, echo=True):
+        return update_report(path, table, sold, title, summary_title, fields, echo)
+
+    def search_customers(self, query):
+        return search_customers(query)
+
+    def sorted_cars(self, field, sold=None, descending=False, n=None):
+        return dat_sorted_cars(field, sold, descending, n)
+
+    def sales_rollup(self):
+        return dat_sales_rollup()
+
+    def format_version(self):
+        return data_format()
+
+class SqliteEngine(StorageEngine):
+    def load_all(self):
+        return sqlite_load_all()
+
+    def save_all(self, cars):
+        return sqlite_save_all(cars)
+
+    def count(self):
+        return sqlite_count()
+
+    def has_cars(self):
+        return sqlite_has_cars()
+
+    def get_car(self, car_id):
+        return sqlite_get_car(car_id)
+
+    def add_car(self, car):
+        return sqlite_add_car(car)
+
+    def update_car(self, car):
+        return sqlite_update_car(car)
+
+    def delete_car(self, car_id):
+        return sqlite_delete_car(car_id)
+
+    def page_cars(self, start, limit):
+        return sqlite_page_cars(start, limit)
+
+    def stamp(self):
+        return sqlite_stamp()
+
+    def filter_values(self, field):
+        return sqlite_filter_values(field)
+
+    def filter_cars(self, field, values):
+        return sqlite_filter_cars(field, values)
+
+    def range_cars(self, ranges):
+        return sqlite_range_cars(ranges)
+
+    def summary(self):
+        return sqlite_summary()
+
+    def report(self, table, sold, title, summary_title, fields=CAR_FIELDS):
+        return sqlite_report(table, sold, title, summary_title, fields)
+
+    def write_report(self, path, table, sold, title, summary_title, fields=CAR_FIELDS, echo=True):
+        return sqlite_write_report(path, table, sold, title, summary_title, fields, echo)
+
+    def search_customers(self, query):
+        return sqlite_search_customers(query)
+
+    def sorted_cars(self, field, sold=None, descending=False, n=None):
+        return sqlite_sorted_cars(field, sold, descending, n)
+
+    def sales_rollup(self):
+        return sqlite_sales_rollup()
+
+    def format_version(self):
+        # cars.db เก็บได้เท่า format ล่าสุด (CarID int64, สตางค์, วันที่)
+        return DEFAULT_FORMAT
+
+ENGINES = {"dat": DatEngine(), "sqlite": SqliteEngine()}
+ENGINE = os.environ.get("JBGARAGE_ENGINE", "dat")
+
+def storage():
+    return ENGINES[ENGINE]
+
+def storage_format():
+    return storage().format_version()
@@ -1,3 +1,4 @@
+import sys
 import function as md
 
 def main():
@@ -12,7 +13,7 @@ def main():
     Enter : ''')
             print('------------------------------------------------')
 
-            if Choice not in ['1','2','3','4','5']:
+            if Choice not in ['1','2','3','4','5','stats']:
                 print(' Error: ValueError!!')
                 continue  
 
@@ -21,6 +22,9 @@ def main():
             continue
 
         match Choice:
+            case 'stats':
+                # เมนูลับ: สถิติเวลา/จำนวน record/bytes ของแต่ละ operation ตั้งแต่เปิดโปรแกรม
+                print(md.format_op_stats())
             case '1':
                 md.Add()
             case '2':
@@ -36,12 +40,15 @@ def main():
     3.Filter
     4.Car not sale + Summary
     5.Sold Car (with customer + Summary)
-    6.Exit
+    6.Search Customer
+    7.Sorted / Top-N Report
+    8.Sales Report (today / month / 12-month trend)
+    9.Exit
     Enter : ''')
                         print('------------------------------------------------')
-                        if view_choice in ['1','2','3','4','5']:
+                        if view_choice in ['1','2','3','4','5','6','7','8']:
                             md.View(int(view_choice))
-                        elif view_choice == '6': 
+                        elif view_choice == '9': 
                             break
                         else:
                             print(' Error: ValueError!!')
@@ -52,5 +59,48 @@ def main():
                 print(' Thank you for using JB Garage Used Car System')
                 break
 
+# คำสั่งที่แก้/อ่านไฟล์ .dat โดยตรง (engine sqlite ใช้ไม่ได้; to-sqlite อ่าน .dat ได้เสมอ)
+DAT_ONLY = ('import', 'sold', 'compact', 'serve', 'columns', 'migrate')
+
+def command(args):
+    # ใช้งานแบบไม่ต้องเข้าเมนู เช่น python main.py compact 0.3
+    if args[0] in DAT_ONLY and md.ENGINE != 'dat':
+        print(f' Error: {args[0]!r} works on the .dat files only (JBGARAGE_ENGINE={md.ENGINE})')
+        return
+    match args[0]:
+        case 'import' if len(args) > 1:
+            md.import_cars(args[1])
+        case 'sold' if len(args) > 1:
+            md.mark_sold_batch(args[1])
+        case 'compact':
+            ratio = float(args[1]) if len(args) > 1 else md.COMPACT_DEAD_RATIO
+            md.compact(ratio)
+        case 'serve':
+            import server
+            server.serve(port=int(args[1]) if len(args) > 1 else 8080)
+        case 'columns' if len(args) > 1 and args[1] in ('on', 'off'):
+            md.set_column_store(args[1] == 'on')
+        case 'search' if len(args) > 1:
+            for c in md.storage().search_customers(' '.join(args[1:])):
+                print(f'{c.car_id} | {c.brand} {c.model} | {c.customer_name} | {c.customer_phone}')
+        case 'sales':
+            md.view_sales()
+        case 'reports':
+            md.update_reports()
+        case 'migrate':
+            md.migrate(int(args[1]) if len(args) > 1 else md.DEFAULT_FORMAT)
+        case 'to-sqlite':
+            md.dat_to_sqlite()
+        case 'summary':
+            if '--verify' in args and md.ENGINE == 'dat':
+                md.verify_stats()
+            print(md.format_summary(md.storage().summary(), 'Overall Summary'))
+        case _:
+            print(f' Error: Unknown command {args[0]!r}')
+            print(' Usage: python main.py [import file.csv|file.jsonl | sold file.csv|file.jsonl | compact [dead_ratio] | migrate [1|2|3] | to-sqlite | columns on|off | search text | sales | reports | serve [port] | summary [--verify]]')
+
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1:
+        command(sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,200 @@
+import asyncio, json, struct, time
+from urllib.parse import urlsplit, parse_qs
+import function as md
+
+# ================= Cache =================
+# โหลดรถทั้งหมดครั้งเดียวเก็บใน dict (car_id → Car เรียงตาม slot) แล้วตอบทุก request จาก memory
+# เขียน (Add/Update/Delete) ผ่าน function.py ลงไฟล์ .dat ใน thread แยก: cache ลงทะเบียนเป็น sidecar ตัวหนึ่ง
+# → leader ของ group commit แก้ cache ทีละงานตามลำดับที่เขียนลงไฟล์ (ลำดับใน cache ตรงกับในไฟล์)
+# และ POST หลายตัวพร้อมกันรวมเป็นรอบเดียว = fsync cars.wal ครั้งเดียว (PATCH/DELETE ถือ lock ครอบการอ่าน-แก้-เขียนเอง
+# จึงเป็นรอบเดี่ยว)
+# ถ้า terminal อื่นแก้ไฟล์ (key ของ md.cache_key() ไม่ตรง) → โหลดใหม่ทั้งหมดก่อนตอบ
+# GET เช็ค header ของ cars_basic.dat อย่างมากครั้งเดียวต่อ CHECK_INTERVAL วินาที (ระหว่างนั้นตอบจาก cache เลย)
+# → ที่แก้จาก terminal อื่นเห็นช้าได้ไม่เกินช่วงนี้ ส่วนที่เขียนผ่าน server เห็นทันทีเพราะ cache ถูกแก้ตามไปด้วย
+CHECK_INTERVAL = 0.05
+cache = {"cars": {}, "stamp": None, "writing": 0, "checked": 0.0}
+reload_lock = asyncio.Lock()
+
+def load_cache():
+    with md.locked(shared=True):
+        cache["cars"] = {c.car_id: c for c in md.load_all()}
+        cache["stamp"] = md.cache_key()
+        cache["checked"] = time.monotonic()
+
+def cache_cars():
+    # snapshot ของรถทั้งหมด (list(...) ทำในครั้งเดียว ไม่ชนกับ thread ที่กำลังแก้ dict)
+    return list(cache["cars"].values())
+
+async def fresh_cache():
+    if cache["writing"] or (time.monotonic() < cache["checked"] + CHECK_INTERVAL and not reload_lock.locked()):
+        return
+    async with reload_lock:
+        if time.monotonic() >= cache["checked"] + CHECK_INTERVAL:
+            cache["checked"] = time.monotonic()
+            if md.cache_key() != cache["stamp"]:
+                await asyncio.to_thread(load_cache)
+
+def cache_fresh():
+    return cache["stamp"] is not None and cache["stamp"] == md.cache_key()
+
+def cache_apply(slot, old, new):
+    # (ถือ exclusive lock อยู่) แก้ cache ตามที่เพิ่งเขียน; new = None คือลบ (แก้คันเดิม → ตำแหน่งใน dict เดิม)
+    # ถ้า cache ค้างอยู่แล้วก่อนเขียน function.py ไม่เรียกตัวนี้ → request ถัดไปจะโหลดใหม่ทั้งหมด
+    if new is None:
+        cache["cars"].pop(old.car_id, None)
+    else:
+        cache["cars"][new.car_id] = new
+
+def stamp_cache():
+    cache["stamp"] = md.cache_key()
+
+md.SIDECARS.append((cache_fresh, cache_apply, stamp_cache))
+
+# ================= Write =================
+def find_car(car_id):
+    slot = md.find_slot(car_id)
+    if slot is None:
+        raise KeyError(car_id)
+    return slot
+
+def add_car(row):
+    # วันที่ไม่ได้ส่งมา → ใช้ค่าเริ่มต้นเดียวกับ Add(): รับเข้าวันนี้ และขายวันนี้ถ้าขายแล้ว
+    car = md.parse_import_row(row)
+    car.acquired_on = car.acquired_on or md.today()
+    if car.status == "Yes":
+        car.sold_on = car.sold_on or md.today()
+    return md.read_car(md.append_car(car, unique=True))
+
+def update_car(car_id, row):
+    # กฎเดียวกับ Update() / mark_sold_batch()
+    with md.locked():
+        slot = find_car(car_id)
+        md.update_car_at(slot, md.apply_sale_row(md.read_car(slot), row))
+        return md.read_car(slot)
+
+def delete_car(car_id):
+    with md.locked():
+        md.delete_at(find_car(car_id))
+
+async def write(fn, *args):
+    cache["writing"] += 1
+    try:
+        return await asyncio.to_thread(fn, *args)
+    finally:
+        cache["writing"] -= 1
+
+# ================= Routes =================
+# GET    /cars/C001                          → รถ 1 คัน
+# GET    /cars?brand=&model=&year=&status=   → รถที่ตรงทุกเงื่อนไข (ไม่สนตัวพิมพ์เล็ก/ใหญ่ เหมือน View(3))
+# POST   /cars                               → เพิ่มรถ (body เหมือน 1 แถวของ import_cars)
+# PATCH  /cars/C001                          → ปิดการขาย/แก้ข้อมูลการขาย (final_price, customer_name, customer_phone)
+# DELETE /cars/C001                          → ลบรถ
+# GET    /summary, /reports/sold, /reports/not-sold
+FILTERS = ("brand", "model", "year", "status")
+
+def car_dict(car):
+    d = {field: getattr(car, field) for field in md.Car.__slots__}
+    d["profit"] = car.profit
+    return d
+
+def filter_cars(cars, query):
+    for field in FILTERS:
+        if field in query:
+            value = query[field][-1].strip().lower()
+            cars = [c for c in cars if str(getattr(c, field)).lower() == value]
+    return cars
+
+def report(cars, sold):
+    # summary เป็นของรถทุกคัน เหมือนส่วนท้ายของ View(4)/(5)
+    rows = [car_dict(c) for c in cars if (c.status == "Yes") == sold]
+    return {"cars": rows, "summary": md.summarize(cars)}
+
+async def dispatch(method, target, body):
+    url = urlsplit(target)
+    parts = [p for p in url.path.split("/") if p]
+    try:
+        if len(parts) == 2 and parts[0] == "cars":
+            # CarID ใน path ผ่านกฎเดียวกับเมนู (C0042 = C042)
+            parts[1] = md.parse_car_id(parts[1])
+        if method == "GET":
+            await fresh_cache()
+        match method, parts:
+            case "GET", ["cars"]:
+                cars = filter_cars(cache_cars(), parse_qs(url.query))
+                return 200, {"cars": [car_dict(c) for c in cars]}
+            case "GET", ["cars", car_id]:
+                car = cache["cars"].get(car_id)
+                if car is None:
+                    raise KeyError(car_id)
+                return 200, car_dict(car)
+            case "POST", ["cars"]:
+                return 201, car_dict(await write(add_car, md.row_dict(body.decode("utf-8"))))
+            case "PATCH", ["cars", car_id]:
+                return 200, car_dict(await write(update_car, car_id, md.row_dict(body.decode("utf-8"))))
+            case "DELETE", ["cars", car_id]:
+                await write(delete_car, car_id)
+                return 200, {"deleted": car_id}
+            case "GET", ["summary"]:
+                return 200, md.summarize(cache_cars())
+            case "GET", ["reports", "sold"]:
+                return 200, report(cache_cars(), True)
+            case "GET", ["reports", "not-sold"]:
+                return 200, report(cache_cars(), False)
+            case _:
+                return 404, {"error": "Not found"}
+    except KeyError:
+        return 404, {"error": "CarID not found!"}
+    except (ValueError, UnicodeDecodeError, struct.error) as e:
+        # struct.error = ค่าที่ผ่านการตรวจแต่ยังเก็บลงไฟล์ไม่ได้ → ตอบ 400 แทนที่จะปิด connection
+        return 400, {"error": str(e)}
+    except Exception as e:
+        # bug/ไฟล์เสีย → ตอบ 500 (connection และ server ยังอยู่) เหมือน "Unexpected error" ของเมนู
+        return 500, {"error": f"Unexpected error: {e}"}
+
+# ================= HTTP =================
+# HTTP/1.1 แบบง่าย (keep-alive, body ตาม Content-Length) พอสำหรับ tablet / widget ที่เรียก JSON
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+async def handle(reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            method, target, version = line.decode("latin-1").split()
+            headers = {}
+            while True:
+                h = await reader.readline()
+                if h in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = h.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length") or 0))
+            status, payload = await dispatch(method, target, body)
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                          f"Content-Type: application/json; charset=utf-8\r\n"
+                          f"Content-Length: {len(data)}\r\n"
+                          f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n").encode("latin-1") + data)
+            await writer.drain()
+            if not keep:
+                break
+    except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+        pass  # request เสีย/client ปิดไปก่อน → ปิด connection
+    finally:
+        writer.close()
+
+def serve(host="127.0.0.1", port=8080):
+    load_cache()
+
+    async def run():
+        server = await asyncio.start_server(handle, host, port, backlog=1024)
+        print(f"Serving JB Garage on http://{host}:{port} ({len(cache['cars'])} cars cached)")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print(" Server stopped.")
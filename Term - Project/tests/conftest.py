@@ -0,0 +1,42 @@
+import os, sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import function as md
+
+
+def new_process():
+    # ล้าง state ระดับ process ของ function.py เหมือนเปิดโปรแกรมใหม่ในโฟลเดอร์เดิม
+    md.sqlite_close()
+    md.lock_state.update(file=None, flock=md.LOCK_NONE, levels=[], recovered=False, owner=None)
+    md.build_state.update(file=None, depth=0)
+    md.scan_state.update(file=None, depth=0)
+    md.format_state["key"] = ()
+    md.inventory.update(stamp=None, cars={})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # โฟลเดอร์ข้อมูลว่างของแต่ละ test (ไฟล์ทั้งหมดของ function.py เป็น path แบบ relative)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(md, "ENGINE", "dat")
+    monkeypatch.setattr(md, "REPORT_WORKERS", 0)
+    new_process()
+    yield tmp_path
+    new_process()
+
+
+def make_car(n, sold=False, brand="Toyota", acquired_on="2024-01-05"):
+    return md.Car(f"C{n:03d}", 2015 + n % 10, brand, "Vios", 1000 * n, 300000 + n, "Yes" if sold else "No", 350000.0,
+                  340000.5 if sold else 0.0, "Somchai Srisuk" if sold else "", "0812345678" if sold else "",
+                  acquired_on, "2024-02-01" if sold else "")
+
+
+def fill(n, sold_every=0, checkpoint=False):
+    # รถ C001 ... C<n> (คันที่เลขหาร sold_every ลงตัวเป็นรถขายแล้ว, 0 = ยังไม่ขายทุกคัน)
+    # checkpoint=True → เล่น cars.wal ลงไฟล์ .dat ให้เสร็จก่อน (test เริ่มจาก log ว่าง)
+    for i in range(1, n + 1):
+        md.append_car(make_car(i, sold=bool(sold_every) and i % sold_every == 0))
+    if checkpoint:
+        with md.locked():
+            md.checkpoint()
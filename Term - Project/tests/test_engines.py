@@ -0,0 +1,55 @@
+import pytest
+import function as md
+from conftest import make_car
+
+
+class Incomplete(md.StorageEngine):
+    def load_all(self):
+        return []
+
+
+def test_engine_must_implement_every_operation():
+    with pytest.raises(TypeError):
+        Incomplete()
+    for engine in md.ENGINES.values():
+        assert isinstance(engine, md.StorageEngine)
+
+
+def snapshot(engine):
+    e = md.ENGINES[engine]
+    return {
+        "cars": e.load_all(),
+        "count": e.count(),
+        "has": e.has_cars(),
+        "get": [e.get_car(cid) for cid in ("C001", "C004", "C999")],
+        "values": [e.filter_values(f) for f in ("brand", "model", "year", "status")],
+        "filter": [e.filter_cars("brand", ["Kia"]), e.filter_cars("status", ["Yes"])],
+        "range": e.range_cars({"odometer": (2000, 9000), "sell_price": (None, 400000)}),
+        "summary": md.format_summary(e.summary(), "S"),
+        "reports": [list(e.report(table, sold, title, summary, fields))
+                    for _, table, sold, title, summary, fields in md.REPORTS],
+        "search": [e.search_customers(q) for q in ("som", "ann", "0812", "zzz")],
+        "sorted": [list(e.sorted_cars(field, sold, descending, n))
+                   for field in md.SORT_FIELDS for sold, descending, n in ((None, False, None), (True, True, 3))],
+        "sales": e.sales_rollup(),
+        "format": e.format_version(),
+    }
+
+
+def test_dat_and_sqlite_agree(store, monkeypatch):
+    for i in range(1, 13):
+        md.append_car(make_car(i, sold=i % 3 == 0, brand="Kia" if i % 4 == 0 else "Toyota",
+                               acquired_on="" if i == 5 else f"2024-01-{i:02d}"))
+    md.delete_at(md.find_slot("C007"))
+    md.dat_to_sqlite()
+    assert snapshot("dat") == snapshot("sqlite")
+    sold = make_car(4, sold=True, brand="Kia")
+    sold.customer_name = "Ann Boonmee"
+    for engine in md.ENGINES.values():
+        assert engine.add_car(make_car(20, brand="Kia")) is True
+        assert engine.add_car(make_car(20)) is False
+        assert engine.update_car(sold) is True
+        assert engine.update_car(make_car(7)) is False
+        assert engine.delete_car("C002") is True
+        assert engine.delete_car("C002") is False
+    assert snapshot("dat") == snapshot("sqlite")
@@ -0,0 +1,82 @@
+import csv
+import json
+import function as md
+from conftest import make_car
+
+
+def row(car_id, **fields):
+    out = {"car_id": car_id, "year": "2020", "brand": "Honda", "model": "City", "odometer": "1000",
+           "buy_price": "300000", "sell_price": "350000", "status": "No"}
+    out.update(fields)
+    return out
+
+
+ROWS = [
+    row("C010"),
+    row("C011", year="20x0"),
+    row("C001"),
+    row("C012", status="Yes", final_price="340000", customer_name="Ann", customer_phone="0812345678",
+        acquired_on="2024-03-01", sold_on="2024-03-09"),
+    row("C010"),
+    row("C013", buy_price="-5"),
+    row("C014", status="Yes", final_price=""),
+    row("C015", odometer="99999999999"),
+    row("C016", acquired_on="2024-13-01"),
+    row("C0017", brand="Kia"),
+]
+REASONS = [
+    (3, "Year must be numbers only!"),
+    (4, "CarID already exists!"),
+    (6, "CarID already exists!"),
+    (7, "Buy Price cannot be negative!"),
+    (8, "Final Price must be a number!"),
+    (9, "Odometer out of range!"),
+    (10, "Acquired Date must be YYYY-MM-DD!"),
+]
+
+
+def check_applied():
+    cars = {c.car_id: c for c in md.load_all()}
+    assert list(cars) == ["C001", "C010", "C012", "C017"]
+    assert cars["C012"].status == "Yes" and cars["C012"].customer_name == "Ann" and cars["C012"].sold_on == "2024-03-09"
+    assert cars["C017"].brand == "Kia" and md.find_slot("C017") == 3
+
+
+def test_import_csv_skips_bad_rows_and_writes_them_out(store, capsys):
+    md.append_car(make_car(1))
+    with open("cars.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, md.IMPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(ROWS)
+    assert md.import_cars("cars.csv") == (3, 7)
+    assert "Imported 3 cars, rejected 7 rows." in capsys.readouterr().out
+    check_applied()
+    with open("cars_errors.csv", encoding="utf-8", newline="") as f:
+        errors = list(csv.DictReader(f))
+    assert [(int(e["line"]), e["error"]) for e in errors] == REASONS
+    assert [e["car_id"] for e in errors] == ["C011", "C001", "C010", "C013", "C014", "C015", "C016"]
+    # แถวที่แก้แล้ว import ซ้ำได้ และ error file ของรอบก่อนถูกลบ
+    with open("cars.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, md.IMPORT_FIELDS)
+        writer.writeheader()
+        writer.writerow(row("C011"))
+    assert md.import_cars("cars.csv") == (1, 0)
+    assert not md.os.path.exists("cars_errors.csv")
+    assert md.find_slot("C011") == 4
+
+
+def test_import_jsonl_reports_unparsable_lines(store, capsys):
+    md.append_car(make_car(1))
+    with open("cars.jsonl", "w", encoding="utf-8") as f:
+        for r in ROWS:
+            f.write(json.dumps(r) + "\n")
+        f.write("{not json\n\n[1, 2]\n")
+        f.write(json.dumps(row("C018", year=2021, odometer=5)) + "\n")
+    assert md.import_cars("cars.jsonl") == (4, 9)
+    capsys.readouterr()
+    assert md.find_slot("C018") == 4 and md.read_car(4).year == 2021
+    with open("cars_errors.jsonl", encoding="utf-8") as f:
+        errors = [json.loads(line) for line in f]
+    assert [(e["line"], e["error"]) for e in errors] == [(line - 1, reason) for line, reason in REASONS] + [
+        (11, "Invalid JSON!"), (13, "Row must be a JSON object!")]
+    assert errors[0]["row"] == ROWS[1] and errors[-1]["row"] == "[1, 2]"
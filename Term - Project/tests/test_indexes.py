@@ -0,0 +1,151 @@
+import random
+import function as md
+from conftest import make_car
+
+# index ทุกตัวเป็น sidecar → เทียบผลค้นกับการกรอง load_all() ตรงๆ หลังทุก add / update / delete / compact
+BRANDS = ("Toyota", "Kia", "สยาม")
+NAMES = ("Somchai Srisuk", "Ann  Boonmee", "ANN som")
+PHONES = ("0812345678", "0899 111 222", "021234567")
+
+
+def sell(rng, car):
+    # สุ่มสถานะ/ข้อมูลการขายใหม่ (update_car_at เขียนแค่ cars_status.dat กับ cars_sale.dat)
+    car.sell_price = rng.choice((199000.0, 350000.0, 420000.5))
+    if rng.random() < 0.5:
+        car.status, car.final_price = "Yes", rng.choice((150000.0, 340000.5, 500000.0))
+        car.customer_name, car.customer_phone = rng.choice(NAMES), rng.choice(PHONES)
+        car.sold_on = rng.choice(("2024-01-31", "2024-02-01", "2024-02-15", ""))
+    else:
+        car.status, car.final_price, car.customer_name, car.customer_phone, car.sold_on = "No", 0.0, "", "", ""
+    return car
+
+
+def random_car(rng, n):
+    car = make_car(n, brand=rng.choice(BRANDS))
+    car.model = rng.choice(("Vios", "Yaris", "Rio"))
+    car.year = rng.randint(2010, 2024)
+    car.odometer = rng.randint(0, 200000)
+    return sell(rng, car)
+
+
+def churn(rng, steps=80):
+    # สุ่มแก้ข้อมูลทีละครั้งแล้ว yield ให้ test ค้นทันที → sidecar สดอยู่ตลอด
+    # add/update/delete จึงผ่าน *_apply ทีละคัน ส่วน compact เลื่อน slot ทั้งไฟล์ → build ใหม่
+    n = 0
+    for _ in range(steps):
+        slots = list(md.load_columns(fields=())["slot"])
+        r = rng.random()
+        if r < 0.45 or not slots:
+            n += 1
+            md.append_car(random_car(rng, n))
+        elif r < 0.7:
+            slot = rng.choice(slots)
+            md.update_car_at(slot, sell(rng, md.read_car(slot)))
+        elif r < 0.9:
+            md.delete_at(rng.choice(slots))
+        else:
+            md.compact(0)
+        yield
+
+
+def test_filter_bitmaps_match_brute_force(store):
+    rng = random.Random(6)
+    for _ in churn(rng):
+        cars = md.load_all()
+        for field in md.FILTER_FIELDS:
+            values = sorted({md.filter_keys(c)[field] for c in cars})
+            assert md.filter_values(field) == values
+            picked = rng.sample(values, min(len(values), 2)) + ["missing"]
+            assert md.storage().filter_cars(field, picked) == [c for c in cars if md.filter_keys(c)[field] in picked]
+
+
+def brute_search(cars, query):
+    # ตัวเลขล้วน → ค้นเบอร์ (เฉพาะตัวเลข) นอกนั้นค้นชื่อ (ไม่สนตัวพิมพ์/เว้นวรรคซ้ำ)
+    phone = set(query) <= set("0123456789 ()+-")
+    norm = (lambda s: "".join(ch for ch in s if ch.isdigit())) if phone else (lambda s: " ".join(s.casefold().split()))
+    text = norm(query)
+    if not text:
+        return []
+
+    def match(car):
+        value = norm(car.customer_phone if phone else car.customer_name)
+        if len(text) >= md.GRAM:
+            return text in value
+        return any(word.startswith(text) for word in ([value] if phone else value.split()))  # คำค้นสั้น = ต้นคำ
+    return [c for c in cars if match(c)]
+
+
+def test_customer_ngrams_match_brute_force(store):
+    rng = random.Random(19)
+    queries = ("som", "ann", "Ann Boon", "an", "s", "0812", "081", "99 111", "2345", "0", "zzz", "  ")
+    for _ in churn(rng):
+        cars = md.load_all()
+        for query in rng.sample(queries, 4):
+            assert md.search_customers(query) == brute_search(cars, query), query
+
+
+def range_value(car, field):
+    # final_price / profit มีค่าเฉพาะรถที่ขายแล้ว (final_price > 0)
+    if field in ("final_price", "profit") and car.final_price <= 0:
+        return None
+    return getattr(car, field)
+
+
+def test_range_index_matches_brute_force(store, monkeypatch):
+    monkeypatch.setattr(md, "RANGE_LOG_MAX", 16)  # log เต็มบ่อยๆ → ได้ทั้งทางอ่าน log และ build ใหม่
+    rng = random.Random(20)
+    for _ in churn(rng):
+        cars = md.load_all()
+        ranges = {}
+        for field in rng.sample(md.RANGE_FIELDS, rng.randint(1, 2)):
+            values = [v for v in (range_value(c, field) for c in cars) if v is not None] or [0]
+            lo = rng.choice(values + [None])
+            ranges[field] = (lo, rng.choice([v for v in values if lo is None or v >= lo] + [None]))
+        expect = [c for c in cars if all(range_value(c, f) is not None and (lo is None or range_value(c, f) >= lo)
+                                         and (hi is None or range_value(c, f) <= hi) for f, (lo, hi) in ranges.items())]
+        assert md.storage().range_cars(ranges) == expect, ranges
+
+
+def test_column_store_matches_dat_files(store, monkeypatch):
+    monkeypatch.setattr(md, "CACHE_ENABLED", False)  # load_all ต้องอ่านจาก cars_columns/ ทุกครั้ง
+    md.set_column_store(True)
+    rng = random.Random(16)
+    for _ in churn(rng):
+        slots = [slot for slot in range(md.count_records()) if md.is_active(slot)]
+        expect = [md.read_car(slot) for slot in slots]  # อ่านจากไฟล์ .dat ทีละคัน
+        assert md.load_all() == expect
+        assert md.column_store_enabled() and md.columns_fresh()
+        start = rng.randrange(md.count_records() + 1)
+        cols = md.load_columns(start, fields=("brand", "final_price", "sold_on"))
+        assert list(cols["slot"]) == [s for s in slots if s >= start]
+        assert list(zip(cols["brand"], cols["final_price"], cols["sold_on"])) == [
+            (c.brand, c.final_price, c.sold_on) for s, c in zip(slots, expect) if s >= start]
+
+
+def test_iter_cars_matches_brute_force(store, monkeypatch):
+    monkeypatch.setattr(md, "STREAM_CHUNK", 8)  # หลายก้อน → ได้ทางขยายขนาดก้อนและหยุดกลางก้อน
+    rng = random.Random(21)
+    predicates = (None, lambda c: c.status == "Yes", lambda c: c.brand == "Kia" and c.year >= 2015, lambda c: False)
+    for _ in churn(rng):
+        slots = list(md.load_columns(fields=())["slot"])
+        cars = md.load_all()
+        start, limit = rng.randrange(md.count_records() + 1), rng.choice((None, 1, 3, 10))
+        predicate = rng.choice(predicates)
+        expect = [c for s, c in zip(slots, cars) if s >= start and (predicate is None or predicate(c))][:limit]
+        assert list(md.iter_cars(start, limit, predicate)) == expect  # จาก Inventory Cache
+        md.inventory.update(stamp=None, cars={})
+        assert list(md.iter_cars(start, limit, predicate)) == expect  # decode จากไฟล์ทีละก้อน
+
+
+def test_sales_rollups_match_brute_force(store):
+    rng = random.Random(23)
+    for _ in churn(rng):
+        expect = {"days": {}, "months": {}}
+        for car in md.load_all():
+            if car.status == "Yes" and car.sold_on:
+                revenue = round(car.final_price * 100)
+                profit = revenue - round(car.buy_price * 100) if revenue > 0 else 0
+                for table, key in (("days", car.sold_on), ("months", car.sold_on[:7])):
+                    row = expect[table].setdefault(key, [0, 0, 0])
+                    row[0], row[1], row[2] = row[0] + 1, row[1] + revenue, row[2] + profit
+        assert md.storage().sales_rollup() == expect
@@ -0,0 +1,130 @@
+import os
+import fcntl
+import struct
+import threading
+import time
+import pytest
+import function as md
+from conftest import fill, make_car, new_process
+
+
+def test_exclusive_inside_shared_is_rejected(store):
+    fill(1, sold_every=2)
+    with md.locked(shared=True):
+        with pytest.raises(RuntimeError):
+            with md.locked():
+                pass
+        assert md.lock_state["flock"] == md.LOCK_SHARED
+    with md.locked():
+        with md.locked(shared=True):
+            assert md.lock_state["flock"] == md.LOCK_EXCLUSIVE
+
+
+def test_stale_sidecar_rebuilt_without_leaving_shared_lock(store):
+    fill(3, sold_every=2)
+    with md.locked(shared=True):
+        assert md.find_slot("C002") == 1
+        assert md.lock_state["flock"] == md.LOCK_SHARED
+        # process อื่นยังขอ shared lock ได้ระหว่างนี้ = ไม่เคยขยับเป็น exclusive
+        with open(md.FILE_LOCK, "rb") as other:
+            fcntl.flock(other, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        assert md.summary_stats()["total"] == 3
+        assert md.build_state["depth"] == 0
+
+
+def test_build_lock_held_while_building(store):
+    fill(2, sold_every=2)
+    held = []
+
+    def build():
+        with open(md.FILE_BUILD_LOCK, "rb") as other:
+            try:
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                held.append(False)
+            except BlockingIOError:
+                held.append(True)
+        md.build_index()
+
+    md.ensure_fresh(md.index_fresh, build)
+    assert held == [True]
+    assert md.index_fresh()
+
+
+def test_concurrent_writers_share_wal_fsyncs(store, monkeypatch):
+    fill(4, sold_every=2)
+    real_fsync, fsyncs = os.fsync, []
+
+    def slow_fsync(fd):
+        fsyncs.append(fd)
+        time.sleep(0.02)
+        real_fsync(fd)
+
+    monkeypatch.setattr(md.os, "fsync", slow_fsync)
+    n = 12
+    barrier = threading.Barrier(n)
+    slots, errors = [], []
+
+    def writer(i):
+        barrier.wait()
+        try:
+            if i < 8:
+                slots.append(md.append_car(make_car(10 + i)))
+            elif i < 10:
+                # สองงานแตะ slot เดียวกันในรอบเดียวกัน → งานหลังต้องเห็นผลของงานแรก
+                car = make_car(1, sold=True)
+                car.customer_name = f"Buyer {i}"
+                md.update_car_at(0, car)
+            else:
+                md.delete_at(i - 9)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(fsyncs) < n
+    assert sorted(slots) == list(range(4, 12))
+    cars = md.load_all()
+    assert [c.car_id for c in cars[:2]] == ["C001", "C004"]
+    assert sorted(c.car_id for c in cars[2:]) == [f"C{10 + i:03d}" for i in range(8)]
+    assert cars[0].customer_name in ("Buyer 8", "Buyer 9")
+    assert [md.find_slot(f"C{i:03d}") for i in range(1, 5)] == [0, None, None, 3]
+    for slot in slots:
+        assert md.find_slot(md.read_car(slot).car_id) == slot
+    assert md.summary_stats()["total"] == 10
+    assert md.verify_stats()
+    new_process()
+    assert [c.car_id for c in md.load_all()] == [c.car_id for c in cars]
+
+
+def test_bad_job_does_not_fail_its_batch(store):
+    fill(1, sold_every=2)
+    car = make_car(2)
+    car.odometer = 2 ** 40
+    with pytest.raises(struct.error):
+        md.append_car(car)
+    assert md.append_car(make_car(3)) == 1
+    assert [c.car_id for c in md.load_all()] == ["C001", "C003"]
+
+
+def test_report_scan_does_not_block_writers(store):
+    fill(3, sold_every=2)
+    lines = md.iter_report(md.iter_table_not_sold, False, "T", "S", md.NOT_SOLD_FIELDS)
+    head = next(lines)
+    assert md.lock_state["levels"] == []
+    writer = threading.Thread(target=md.append_car, args=(make_car(5),))
+    writer.start()
+    writer.join(5)
+    assert not writer.is_alive()
+    # compact/migrate (เปลี่ยนไฟล์ทั้งชุด) ยังต้องรอ scan จบ
+    with open(md.FILE_SCAN_LOCK, "rb") as other:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    text = "\n".join([head] + list(lines))
+    # รถที่เพิ่มหลัง snapshot ไม่อยู่ใน report นี้
+    assert "C001" in text and "C003" in text and "C005" not in text
+    with open(md.FILE_SCAN_LOCK, "rb") as other:
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
@@ -0,0 +1,103 @@
+import os
+import random
+import bench
+import function as md
+from conftest import make_car, new_process
+
+
+def full(spec):
+    path, table, sold, title, summary_title, fields = spec
+    return "\n".join(md.iter_report(table, sold, title, summary_title, fields))
+
+
+def check(capsys):
+    statuses = []
+    for spec in md.REPORTS:
+        status = md.update_report(*spec)
+        statuses.append(status)
+        expect = full(spec)
+        if status is None:
+            assert expect == "" and not os.path.exists(spec[0])
+            continue
+        assert open(spec[0], encoding="utf-8").read() == expect
+        assert capsys.readouterr().out == expect + "\n"
+    assert not [name for name in os.listdir() if name.endswith(".tmp")]
+    return statuses
+
+
+def test_incremental_report_matches_full_report(store, capsys):
+    for i in range(1, 21):
+        md.append_car(make_car(i, sold=i % 3 == 0))
+    assert check(capsys) == ["generated", "generated"]
+    assert check(capsys) == ["unchanged", "unchanged"]
+    md.append_car(make_car(21, sold=True))
+    # summary ส่วนท้ายเปลี่ยนทุกครั้งที่มีรถเพิ่ม → อีก report ก็เขียนส่วนท้ายใหม่ (ไม่มีแถวใหม่)
+    assert check(capsys) == ["appended", "appended"]
+    md.append_car(make_car(22))
+    assert check(capsys) == ["appended", "appended"]
+    slot = md.find_slot("C004")
+    car = md.read_car(slot)
+    car.status, car.final_price, car.customer_name, car.customer_phone = "Yes", 999.5, "Ann", "0899999999"
+    md.update_car_at(slot, car)
+    assert check(capsys) == ["generated", "generated"]
+    md.delete_at(md.find_slot("C022"))
+    assert check(capsys) == ["generated", "appended"]
+
+
+def test_random_changes_keep_reports_equal(store, capsys):
+    rng = random.Random(3)
+    ids = []
+    for i in range(1, 31):
+        md.append_car(make_car(i, sold=rng.random() < 0.5))
+        ids.append(f"C{i:03d}")
+    check(capsys)
+    for n in range(31, 91):
+        r = rng.random()
+        if r < 0.5:
+            md.append_car(make_car(n, sold=rng.random() < 0.5, brand=rng.choice(["Kia", "สยาม"])))
+            ids.append(f"C{n:03d}")
+        elif r < 0.75:
+            slot = md.find_slot(rng.choice(ids))
+            car = md.read_car(slot)
+            car.status, car.final_price = "Yes", rng.choice([5000.0, 130000.25])
+            md.update_car_at(slot, car)
+        else:
+            cid = rng.choice(ids)
+            ids.remove(cid)
+            md.delete_at(md.find_slot(cid))
+        if rng.random() < 0.4:
+            check(capsys)
+    check(capsys)
+
+
+def test_tampered_report_is_regenerated(store, capsys):
+    for i in range(1, 6):
+        md.append_car(make_car(i, sold=True))
+    check(capsys)
+    with open("report_sold.txt", "a", encoding="utf-8") as f:
+        f.write("tampered")
+    assert check(capsys)[1] == "generated"
+
+
+def run_reports(capsys, workers):
+    # เริ่มจากไม่มี report และไม่มี Inventory Cache → ได้ทางอ่านไฟล์ .dat (ทีละก้อนหรือแบบขนาน)
+    new_process()
+    for path in [spec[0] for spec in md.REPORTS] + [md.FILE_REPORTS]:
+        if os.path.exists(path):
+            os.remove(path)
+    md.REPORT_WORKERS = workers
+    out = {}
+    for spec in md.REPORTS:
+        assert md.update_report(*spec) == "generated"
+        out[spec[0]] = (open(spec[0], encoding="utf-8").read(), capsys.readouterr().out)
+    return out
+
+
+def test_parallel_report_matches_serial_report(store, capsys, monkeypatch):
+    bench.generate(3000)
+    for slot in range(0, 3000, 7):
+        md.delete_at(slot)
+    monkeypatch.setattr(md, "PARALLEL_PART", 256)
+    monkeypatch.setattr(md, "PARALLEL_MIN_RECORDS", 1)
+    serial = run_reports(capsys, 0)
+    assert run_reports(capsys, 3) == serial
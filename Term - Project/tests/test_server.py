@@ -0,0 +1,133 @@
+import asyncio
+import json
+import struct
+import pytest
+import function as md
+import server
+from conftest import make_car
+
+
+@pytest.fixture
+def api(store, monkeypatch):
+    monkeypatch.setattr(server, "cache", {"cars": {}, "stamp": None, "writing": 0, "checked": 0.0})
+    for i in range(1, 5):
+        md.append_car(make_car(i, sold=i % 2 == 0))
+
+    def call(method, target, body=None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        return asyncio.run(server.dispatch(method, target, data))
+    return call
+
+
+def new_row(**fields):
+    row = {"car_id": "C100", "brand": "Honda", "model": "City", "year": "2020", "odometer": "1000",
+           "buy_price": "300000", "sell_price": "350000", "status": "No"}
+    row.update(fields)
+    return row
+
+
+@pytest.mark.parametrize("fields, error", [
+    ({"odometer": "99999999999"}, "Odometer out of range!"),
+    ({"buy_price": "1e300"}, "Buy Price out of range!"),
+    ({"sell_price": "inf"}, "Sell Price must be a number!"),
+    ({"sell_price": "nan"}, "Sell Price must be a number!"),
+    ({"year": "20200"}, "Year out of range!"),
+])
+def test_post_rejects_values_that_do_not_fit_the_record(api, fields, error):
+    assert api("POST", "/cars", new_row(**fields)) == (400, {"error": error})
+    status, body = api("GET", "/cars")
+    assert status == 200 and len(body["cars"]) == 4
+
+
+def test_struct_error_maps_to_bad_request(api, monkeypatch):
+    def append_car(car, unique=False):
+        raise struct.error("argument out of range")
+    monkeypatch.setattr(md, "append_car", append_car)
+    assert api("POST", "/cars", new_row()) == (400, {"error": "argument out of range"})
+
+
+def test_path_car_id_is_normalized(api):
+    status, car = api("GET", "/cars/c0001")
+    assert status == 200 and car["car_id"] == "C001"
+    status, car = api("PATCH", "/cars/C0003", {"final_price": "330000", "customer_name": "Ann", "customer_phone": "0812345678"})
+    assert status == 200 and car["car_id"] == "C003" and car["status"] == "Yes"
+    assert api("DELETE", "/cars/C00004") == (200, {"deleted": "C004"})
+    assert api("GET", "/cars/C004")[0] == 404
+    assert api("GET", "/cars/X1")[0] == 400
+    assert api("DELETE", "/cars/C999") == (404, {"error": "CarID not found!"})
+
+
+def test_post_defaults_dates_like_add(api):
+    status, car = api("POST", "/cars", new_row())
+    assert status == 201 and car["acquired_on"] == md.today() and car["sold_on"] == ""
+    status, car = api("POST", "/cars", new_row(car_id="C101", status="Yes", final_price="340000",
+                                               customer_name="Ann", customer_phone="0812345678"))
+    assert status == 201 and car["acquired_on"] == md.today() and car["sold_on"] == md.today()
+    status, car = api("POST", "/cars", new_row(car_id="C102", acquired_on="2024-05-01"))
+    assert status == 201 and car["acquired_on"] == "2024-05-01"
+    assert api("POST", "/cars", new_row(car_id="C0102")) == (400, {"error": "CarID already exists!"})
+
+
+def test_report_summary_covers_every_car(api):
+    everything = md.summarize(md.load_all())
+    for path, sold in (("/reports/sold", True), ("/reports/not-sold", False)):
+        status, body = api("GET", path)
+        assert status == 200
+        assert {c["status"] for c in body["cars"]} == {"Yes" if sold else "No"}
+        assert body["summary"] == json.loads(json.dumps(everything))
+
+
+def test_concurrent_posts_keep_cache_in_file_order(api):
+    server.load_cache()
+
+    async def posts():
+        rows = [new_row(car_id=f"C{200 + i % 10}") for i in range(20)]
+        return await asyncio.gather(*(server.dispatch("POST", "/cars", json.dumps(row).encode("utf-8")) for row in rows))
+
+    results = asyncio.run(posts())
+    assert sorted(status for status, _ in results) == [201] * 10 + [400] * 10
+    assert {body["error"] for status, body in results if status == 400} == {"CarID already exists!"}
+    # cache ถูกแก้ตามลำดับที่เขียนลงไฟล์ (ไม่ต้องโหลดใหม่)
+    assert server.cache["stamp"] == md.cache_key()
+    status, body = api("GET", "/cars")
+    assert [c["car_id"] for c in body["cars"]] == [c.car_id for c in md.load_all()]
+
+
+@pytest.mark.parametrize("price, error", [
+    ("inf", "Final Price must be a number!"),
+    ("1e300", "Final Price out of range!"),
+    ("-5", "Final Price cannot be negative!"),
+])
+def test_update_sold_car_uses_the_same_price_rules(api, monkeypatch, capsys, price, error):
+    answers = iter(["C002", price, "", ""])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    md.Update()
+    assert f"Error: {error}\n" in capsys.readouterr().out
+    assert md.storage().get_car("C002").final_price == make_car(2, sold=True).final_price
+
+
+def test_get_rechecks_files_at_most_once_per_interval(api, monkeypatch):
+    assert api("GET", "/cars/C001")[1]["status"] == "No"
+    checks = []
+    real_key = md.cache_key
+    monkeypatch.setattr(md, "cache_key", lambda: checks.append(1) or real_key())
+    monkeypatch.setattr(server, "CHECK_INTERVAL", 60)
+    for _ in range(5):
+        assert api("GET", "/cars")[0] == 200
+    assert checks == []
+    # terminal อื่นปิดการขาย C001 (ไม่ผ่าน sidecar ของ process นี้)
+    _, rs, rl = md.pack_car(make_car(1, sold=True))
+    md.write_records([(md.FILE_STATUS, md.slot_offset(md.struct_status, 0), rs),
+                      (md.FILE_SALE, md.slot_offset(md.struct_sale, 0), rl)])
+    assert api("GET", "/cars/C001")[1]["status"] == "No"
+    monkeypatch.setattr(server, "CHECK_INTERVAL", 0)
+    assert api("GET", "/cars/C001")[1]["status"] == "Yes" and checks
+
+
+def test_unexpected_error_maps_to_server_error(api, monkeypatch):
+    def summarize(cars):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(md, "summarize", summarize)
+    assert api("GET", "/summary") == (500, {"error": "Unexpected error: boom"})
+    assert server.REASONS[500] == "Internal Server Error"
+    assert api("GET", "/cars/C001")[0] == 200
@@ -0,0 +1,72 @@
+import csv
+import json
+import function as md
+from conftest import fill, make_car
+
+
+def sale(car_id, final_price="", customer_name="", customer_phone="", sold_on=""):
+    return {"car_id": car_id, "final_price": final_price, "customer_name": customer_name,
+            "customer_phone": customer_phone, "sold_on": sold_on}
+
+
+ROWS = [
+    sale("C001", "340000", "Ann", "0811111111"),
+    sale("C003", "", "Bob", "0822222222"),
+    sale("C999", "1", "Cat", "0833333333"),
+    sale("C002", "500000"),
+    sale("C005", "1", "Dan", "12ab"),
+    sale("c001", sold_on="2024-05-05"),
+    sale("X1"),
+    sale("C004", sold_on="2024-5-5"),
+]
+REASONS = [
+    (3, "Final Price must be a number!"),
+    (4, "CarID not found!"),
+    (6, "Phone must contain digits only!"),
+    (8, "CarID not found!"),
+    (9, "Sold Date must be YYYY-MM-DD!"),
+]
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, md.SALE_FIELDS + ("sold_on",))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_mark_sold_applies_good_rows_and_rejects_bad_ones(store, capsys):
+    fill(5, sold_every=2)
+    md.summary_stats()  # sidecar ที่สดอยู่ต้องถูกแก้ตามไปด้วย
+    write_csv("sales.csv", ROWS)
+    assert md.mark_sold_batch("sales.csv") == (3, 5)
+    assert "Applied 3 rows (2 cars), rejected 5 rows." in capsys.readouterr().out
+    cars = {c.car_id: c for c in md.load_all()}
+    c1, c2 = cars["C001"], cars["C002"]
+    assert (c1.status, c1.final_price, c1.customer_name, c1.customer_phone, c1.sold_on) == (
+        "Yes", 340000.0, "Ann", "0811111111", "2024-05-05")
+    # รถที่ขายแล้ว ช่องว่าง = คงค่าเดิม
+    assert (c2.final_price, c2.customer_name, c2.sold_on) == (500000.0, "Somchai Srisuk", "2024-02-01")
+    assert [cars[cid].status for cid in ("C003", "C004", "C005")] == ["No", "Yes", "No"]
+    assert cars["C004"] == make_car(4, sold=True)
+    assert md.summary_stats() == md.summarize(list(cars.values()))
+    with open("sales_errors.csv", encoding="utf-8", newline="") as f:
+        errors = list(csv.DictReader(f))
+    assert [(int(e["line"]), e["error"]) for e in errors] == REASONS
+    assert [e["car_id"] for e in errors] == ["C003", "C999", "C005", "X1", "C004"]
+
+
+def test_mark_sold_with_only_bad_rows_writes_nothing(store, capsys):
+    fill(5, sold_every=2)
+    stamp = md.data_stamp()
+    with open("sales.jsonl", "w", encoding="utf-8") as f:
+        for r in ROWS[1:3]:
+            f.write(json.dumps(r) + "\n")
+        f.write("oops\n")
+    assert md.mark_sold_batch("sales.jsonl") == (0, 3)
+    assert md.data_stamp() == stamp
+    with open("sales_errors.jsonl", encoding="utf-8") as f:
+        errors = [json.loads(line) for line in f]
+    assert [(e["line"], e["error"]) for e in errors] == [
+        (1, "Final Price must be a number!"), (2, "CarID not found!"), (3, "Invalid JSON!")]
+    assert errors[0]["row"] == ROWS[1]
@@ -0,0 +1,56 @@
+import os
+import function as md
+from conftest import fill, make_car, new_process
+
+
+def test_in_place_write_changes_stamp_with_same_size_and_mtime(store):
+    fill(3)
+    assert [c.status for c in md.load_all()] == ["No", "No", "No"]
+    before = md.data_stamp()
+    times = [os.stat(path).st_mtime_ns for path in md.WAL_FILES]
+    # process อื่นแก้ record เดิม (ขนาดไฟล์เท่าเดิม) ภายใน tick เดียวกันของ mtime
+    _, rs, rl = md.pack_car(make_car(2, sold=True))
+    md.write_records([(md.FILE_STATUS, md.slot_offset(md.struct_status, 1), rs),
+                      (md.FILE_SALE, md.slot_offset(md.struct_sale, 1), rl)])
+    for path, t in zip(md.WAL_FILES, times):
+        os.utime(path, ns=(t, t))
+    assert md.data_stamp()[1:] == before[1:]
+    assert md.data_stamp() != before
+    assert not md.cache_fresh()
+    assert [c.status for c in md.load_all()] == ["No", "Yes", "No"]
+
+
+def test_generation_survives_recovery_and_replace(store):
+    fill(2)
+    generation = md.data_generation()
+    assert generation == 2
+    md.save_all(md.load_all())
+    assert md.data_generation() == generation + 1
+    new_process()
+    with md.locked(shared=True):
+        assert md.data_generation() == generation + 1
+        assert md.header_counts() == [2, 2, 2]
+
+
+def test_inventory_cache_checks_one_header(store, monkeypatch):
+    fill(3)
+    md.load_all()
+    opened = []
+    real_open = open
+
+    def spy_open(path, *args, **kwargs):
+        opened.append(path)
+        return real_open(path, *args, **kwargs)
+    with monkeypatch.context() as m:
+        m.setattr("builtins.open", spy_open)
+        m.setattr(md.os, "stat", None)  # ไม่ stat ไฟล์ .dat ทีละไฟล์
+        assert md.cache_fresh()
+    assert opened == [md.FILE_BASIC]
+    # ไฟล์ชุดอื่นที่ generation บังเอิญเท่ากัน (คัดลอกมาแทนที่) → inode ไม่ตรง
+    generation = md.data_generation()
+    with open(md.FILE_BASIC, "rb") as f:
+        data = f.read()
+    with open(md.FILE_BASIC + ".copy", "wb") as f:
+        f.write(data)
+    os.replace(md.FILE_BASIC + ".copy", md.FILE_BASIC)
+    assert md.data_generation() == generation and not md.cache_fresh()
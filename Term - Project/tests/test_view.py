@@ -0,0 +1,40 @@
+import function as md
+from conftest import make_car
+
+
+def test_view_reports_empty_after_every_car_is_deleted(store, capsys):
+    md.View(4)
+    assert capsys.readouterr().out == "No cars data.\n"
+    for i in range(1, 4):
+        md.append_car(make_car(i))
+    assert md.storage().has_cars()
+    assert not md.os.path.exists(md.FILE_STATS)  # เช็คว่างไม่ต้อง build summary stats
+    assert md.storage().count() == 3
+    for i in range(1, 4):
+        md.delete_at(md.find_slot(f"C{i:03d}"))
+    assert md.count_records() == 3
+    assert md.storage().count() == 0 and not md.storage().has_cars()
+    md.View(4)
+    assert capsys.readouterr().out == "No cars data.\n"
+
+
+def sorted_ids(field, n=None, descending=False):
+    return [c.car_id for c in md.storage().sorted_cars(field, False, descending, n)]
+
+
+def test_oldest_unsold_stock_sorts_by_acquired_date(store, monkeypatch):
+    days = ["2024-03-01", "", "2023-12-31", "2024-01-15", ""]
+    for i, day in enumerate(days, 1):
+        md.append_car(make_car(i, acquired_on=day))
+    md.append_car(make_car(6, sold=True, acquired_on="2020-01-01"))
+    assert md.SORT_PRESETS[1][:2] == ("Oldest Unsold Stock", "acquired_on")
+    # รถที่ไม่รู้วันอยู่ท้ายเสมอ ทั้ง sort ทั้งหมดและ top-n
+    assert sorted_ids("acquired_on") == ["C003", "C004", "C001", "C002", "C005"]
+    assert sorted_ids("acquired_on", descending=True) == ["C001", "C004", "C003", "C002", "C005"]
+    assert sorted_ids("acquired_on", n=4) == ["C003", "C004", "C001", "C002"]
+    assert sorted_ids("acquired_on", n=2, descending=True) == ["C001", "C004"]
+    md.dat_to_sqlite()
+    monkeypatch.setattr(md, "ENGINE", "sqlite")
+    assert sorted_ids("acquired_on") == ["C003", "C004", "C001", "C002", "C005"]
+    assert sorted_ids("acquired_on", descending=True) == ["C001", "C004", "C003", "C002", "C005"]
+    assert sorted_ids("acquired_on", n=4) == ["C003", "C004", "C001", "C002"]
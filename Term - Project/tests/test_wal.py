@@ -0,0 +1,85 @@
+import os
+import sys
+import pytest
+import function as md
+from conftest import fill, make_car, new_process
+
+
+# เช็คลำดับ fsync ผ่าน /proc/self/fd → ใช้ได้เฉพาะ Linux
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs /proc/self/fd")
+
+
+def test_wal_fsync_before_data_files(store, monkeypatch):
+    fill(2, sold_every=2, checkpoint=True)
+    events = []
+    real_fsync, real_open = os.fsync, open
+
+    def fsync(fd):
+        events.append(("fsync", os.path.basename(os.readlink(f"/proc/self/fd/{fd}"))))
+        real_fsync(fd)
+
+    def tracking_open(path, mode="r", *args, **kwargs):
+        if str(path).endswith(".dat") and mode == "r+b":
+            events.append(("write", path))
+        return real_open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(md.os, "fsync", fsync)
+    monkeypatch.setattr(md, "open", tracking_open, raising=False)
+    car = md.read_car(0)
+    car.status, car.final_price = "Yes", 123.0
+    md.update_car_at(0, car)
+    first_write = next(i for i, e in enumerate(events) if e[0] == "write")
+    assert ("fsync", md.FILE_WAL) in events[:first_write]
+
+
+def test_recover_replays_complete_entry_and_drops_truncated_one(store):
+    fill(3, sold_every=2, checkpoint=True)
+    sold = make_car(1, sold=True)
+    _, rs, rl = md.pack_car(sold)
+    rb4, rs4, rl4 = md.pack_car(make_car(4))
+    with md.locked():
+        # ล้มหลัง fsync log แต่ก่อนเขียนไฟล์ .dat ครบ: status ของ slot 0 เขียนไปได้ครึ่ง record
+        md.wal_append([(md.FILE_STATUS, md.slot_offset(md.struct_status, 0), rs),
+                       (md.FILE_SALE, md.slot_offset(md.struct_sale, 0), rl)])
+        with open(md.FILE_STATUS, "r+b") as f:
+            f.seek(md.slot_offset(md.struct_status, 0))
+            f.write(rs[:len(rs) // 2])
+        # entry ถัดไป (เพิ่มรถคันที่ 4) ถึง disk ไม่ครบ
+        md.wal_append([(md.FILE_BASIC, md.slot_offset(md.struct_basic, 3), rb4)] + md.header_writes(4))
+    size = os.path.getsize(md.FILE_WAL)
+    with open(md.FILE_WAL, "r+b") as f:
+        f.truncate(size - 5)
+    new_process()
+    assert md.count_records() == 3
+    with md.locked(shared=True):
+        assert md.read_car(0) == sold
+        assert md.count_records() == 3
+    assert [c.car_id for c in md.load_all()] == ["C001", "C002", "C003"]
+    assert os.path.getsize(md.FILE_WAL) == 0
+
+
+def test_recover_truncates_torn_append(store):
+    fill(2, sold_every=2, checkpoint=True)
+    rb, rs, _ = md.pack_car(make_car(3))
+    # append ที่ล้มก่อนเข้า log: basic กับ status ต่อท้ายไปแล้ว แต่ sale ยังไม่มี
+    for path, data in ((md.FILE_BASIC, rb), (md.FILE_STATUS, rs)):
+        with open(path, "ab") as f:
+            f.write(data)
+    new_process()
+    with md.locked(shared=True):
+        sizes = [os.path.getsize(p) for p in md.WAL_FILES]
+    assert sizes == [md.slot_offset(st, 2) for st in (md.struct_basic, md.struct_status, md.struct_sale)]
+    assert [c.car_id for c in md.load_all()] == ["C001", "C002"]
+
+
+def test_recover_drops_records_beyond_header_count(store):
+    fill(2, sold_every=2, checkpoint=True)
+    # record ครบทั้ง 3 ไฟล์แต่ header ยังเป็น 2 (append ที่ไม่ได้ผ่าน log)
+    for path, data in zip(md.WAL_FILES, md.pack_car(make_car(3))):
+        with open(path, "ab") as f:
+            f.write(data)
+    new_process()
+    with md.locked(shared=True):
+        assert md.count_records() == 2
+        assert md.header_counts() == [2, 2, 2]
+    assert [c.car_id for c in md.load_all()] == ["C001", "C002"]